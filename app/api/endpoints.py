@@ -1,22 +1,156 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel, confloat
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import ClientDisconnect
+from pydantic import BaseModel, confloat, conint
+from typing import Dict, List, Optional, Tuple
 from app.core.sanitization import Sanitizer
 from app.core.similarity import SimilarityCalculator
-from app.config import Config
+from app.core.matrix import SimilarityMatrix
+from app.core.simjoin import SIMJOIN_METRICS, SimilarityJoin
+from app.core.bulk import BulkScorer, NDJSONLine, iter_ndjson_chunks
+from app.core.jobs import JobManager
+from app.core.commentary import COMMENTARY_MODES, CommentaryService
+from app.core.capture import TrafficCapture
+from app.core.bulkhead import PRIORITY_BATCH, PRIORITY_BULK, PRIORITY_INTERACTIVE, Bulkhead, BulkheadRejected, BulkheadSet
+from app.core.deadline import Deadline, DeadlineExceeded
+from app.core.metrics import CPU_BOUND, DEGRADED_TIERS, IO_BOUND, MetricSpec, metric_registry
+from app.core.memory import MemoryProfiler
+from app.core.score_store import ScoreStore, pair_key
+from app.core.structured_logging import logging_service, stage
+from app.api.streaming import DuplexStreamingResponse
+from app.api.wire import FLOAT32, JSON, MSGPACK, WireRoute, encode, negotiate
+from app.config import Config, ConfigSnapshot, changed_settings
+import asyncio
+import json
 import logging
+import secrets
 import numpy as np
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter()
+# WireRoute : corps de requête JSON ou MessagePack
+router = APIRouter(route_class=WireRoute)
 sim_calculator = SimilarityCalculator()
+bulk_scorer = BulkScorer(sim_calculator)
+commentary_service = CommentaryService(sim_calculator.llm_client)
+_job_manager: Optional[JobManager] = None
+# Scores persistés entre redémarrages et partagés entre workers (SCORE_STORE_PATH vide = désactivé)
+score_store: Optional[ScoreStore] = (
+    ScoreStore(Config.SCORE_STORE_PATH, Config.SCORE_STORE_MAX_ENTRIES) if Config.SCORE_STORE_PATH else None
+)
+# Threads et files d'attente séparés : un LLM lent ne bloque pas les metrics CPU
+bulkheads = BulkheadSet({
+    "cpu": Bulkhead("cpu", Config.CPU_POOL_WORKERS, Config.CPU_POOL_QUEUE, Config.CPU_POOL_QUEUE_TIMEOUT_MS / 1000),
+    "llm": Bulkhead("llm", Config.LLM_POOL_WORKERS, Config.LLM_POOL_QUEUE, Config.LLM_POOL_QUEUE_TIMEOUT_MS / 1000),
+})
+# Formes des requêtes enregistrées pour tests/load_test/replay.py (CAPTURE_PATH vide = désactivé)
+traffic_capture: Optional[TrafficCapture] = (
+    TrafficCapture(Config.CAPTURE_PATH, Config.CAPTURE_SAMPLE_RATE, Config.CAPTURE_MAX_BYTES, Config.CAPTURE_HASH_KEY)
+    if Config.CAPTURE_PATH else None
+)
+memory_profiler = MemoryProfiler(Config.MEMORY_MAX_SNAPSHOTS)
+memory_profiler.register("similarity", sim_calculator.memory_usage)
+memory_profiler.register("commentary", commentary_service.memory_usage)
+memory_profiler.register("embeddings", sim_calculator.embeddings.memory_usage)
+memory_profiler.register(
+    "jobs", lambda: _job_manager.memory_usage() if _job_manager is not None else {"jobs": 0, "bytes": 0}
+)
+memory_profiler.register(
+    "score_store", lambda: score_store.stats() if score_store is not None else {"entries": 0, "bytes": 0}
+)
+
+def get_job_manager() -> JobManager:
+    """Job manager, created on first use (loads persisted jobs from JOBS_DIR)"""
+    global _job_manager
+    if _job_manager is None:
+        _job_manager = JobManager(sim_calculator)
+    return _job_manager
+
+def runs_inline(spec: MetricSpec, config: ConfigSnapshot) -> bool:
+    """Cheap CPU metrics run on the event loop; the rest goes to the worker threads"""
+    return spec.kind == CPU_BOUND and spec.cost <= config.INLINE_METRIC_MAX_COST
+
+def bulkhead_for(spec: MetricSpec) -> Bulkhead:
+    """Bulkhead of a metric: "llm" for LLM-backed metrics, "cpu" for the others"""
+    return bulkheads["llm" if spec.kind == IO_BOUND else "cpu"]
+
+def scoring_model(spec: MetricSpec) -> Optional[str]:
+    """Model actually behind a metric's scores, for score store keys (None for model-free metrics).
+    
+    Read from the services rather than the config: EMBEDDING_MODEL only takes effect on restart.
+    """
+    if spec.model_setting == "EMBEDDING_MODEL":
+        return sim_calculator.embeddings.model_name
+    if spec.model_setting == "LLM_MODEL":
+        return sim_calculator.llm_client.model
+    return None
+
+def shutdown_background_workers():
+    commentary_service.shutdown()
+    sim_calculator.embeddings.shutdown()
+    bulkheads.shutdown()
+    if _job_manager is not None:
+        _job_manager.shutdown()
+    if score_store is not None:
+        score_store.close()
+    if traffic_capture is not None:
+        traffic_capture.close()
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Admin endpoints require the X-Admin-Token header; without ADMIN_TOKEN they are disabled"""
+    admin_token = Config.snapshot.ADMIN_TOKEN
+    if not admin_token:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled: ADMIN_TOKEN is not set")
+    if x_admin_token is None or not secrets.compare_digest(x_admin_token.encode(), admin_token.encode()):
+        raise HTTPException(status_code=403, detail="Invalid or missing admin token")
 
 # Modèle Pydantic avec validation étendue
+# metric / threshold : None = valeur de la configuration en cours (rechargeable)
 class SimilarityRequest(BaseModel):
     prompt1: str
     prompt2: str
-    metric: str = Config.DEFAULT_METRIC
-    threshold: confloat(ge=0.0, le=1.0) = Config.SIMILARITY_THRESHOLD
+    metric: Optional[str] = None
+    threshold: Optional[confloat(ge=0.0, le=1.0)] = None
+    commentary: str = "inline"  # none | deferred | inline
+    # Budget de latence en ms (ou en-tête X-Request-Deadline-Ms ; le plus court l'emporte)
+    deadline_ms: Optional[confloat(gt=0.0)] = None
+
+class SimilarityMatrixRequest(BaseModel):
+    texts: List[str]
+    metric: str = "cosine"
+    mode: str = "dense"  # dense | top_k | threshold
+    top_k: Optional[conint(ge=1)] = None
+    threshold: Optional[confloat(gt=0.0, le=1.0)] = None
+
+class SimilarityJoinRequest(BaseModel):
+    texts: List[str]
+    threshold: confloat(gt=0.0, le=1.0)
+    metric: str = "jaccard"  # jaccard | set_cosine
+
+class EmbeddingDocument(BaseModel):
+    id: str
+    text: str
+
+class EmbeddingIndexRequest(BaseModel):
+    documents: List[EmbeddingDocument]
+
+class EmbeddingSearchRequest(BaseModel):
+    query: str
+    k: conint(ge=1, le=1000) = 10
+
+class PromptPair(BaseModel):
+    prompt1: str
+    prompt2: str
+
+class SimilarityBatchRequest(BaseModel):
+    pairs: List[PromptPair]
+    metric: Optional[str] = None
+    threshold: Optional[confloat(ge=0.0, le=1.0)] = None
+
+class JobRequest(BaseModel):
+    pairs: List[PromptPair]
+    metric: Optional[str] = None
+    threshold: Optional[confloat(ge=0.0, le=1.0)] = None
 
 def clean_numpy_types(obj):
     if isinstance(obj, np.integer):
@@ -36,44 +170,110 @@ def clean_numpy_types(obj):
     else:
         return obj
 
+def sanitize_texts(texts: List[str], config: ConfigSnapshot) -> List[str]:
+    """Sanitize a list of texts in one batch; the first rejected text fails the request (400)"""
+    cleaned, errors = Sanitizer.sanitize_inputs(texts, config)
+    error = next((error for error in errors if error is not None), None)
+    if error is not None:
+        logger.warning("Input sanitization failed: %s", error)
+        raise HTTPException(status_code=400, detail=error)
+    return cleaned
+
+async def score_pair(config: ConfigSnapshot, prompt1: str, prompt2: str, metric: str, threshold: float,
+                     deadline: Optional[Deadline] = None, priority: int = PRIORITY_INTERACTIVE,
+                     cleaned: Optional[Tuple[str, str]] = None) -> Tuple[MetricSpec, str, str, float, str]:
+    """Sanitize and score one pair: score store first, then the metric inline or behind its bulkhead.
+    
+    Shared by /similarity-check and the WebSocket endpoint so both behave the
+    same. Returns (spec, p1_clean, p2_clean, score, decided_by). Raises
+    ValueError for rejected input or an unknown metric and BulkheadRejected
+    when the metric's pool is saturated (with a ``deadline``, LLM metrics
+    fall back instead, decided_by "deadline"); a failing computation gives
+    (0.0, "error"). LLM tiers respect ``deadline`` (see SimilarityCalculator.evaluate).
+    ``cleaned``: the prompts already sanitized by a batch (Sanitizer.sanitize_inputs).
+    """
+    if cleaned is not None:
+        p1_clean, p2_clean = cleaned
+    else:
+        with stage("sanitize"):
+            p1_clean = Sanitizer.sanitize_input(prompt1, config)
+            p2_clean = Sanitizer.sanitize_input(prompt2, config)
+    spec = metric_registry.get(metric)
+    
+    # Score déjà calculé (ce worker, un autre, ou avant un redémarrage)
+    store_key = None
+    stored = None
+    if score_store is not None:
+        with stage("score_store"):
+            store_key = pair_key(metric, p1_clean, p2_clean, threshold if spec.threshold_dependent else None,
+                                 scoring_model(spec))
+            stored = score_store.get(store_key)
+    
+    # Calculate similarity - avec gestion d'erreur robuste
+    try:
+        with stage("score"):
+            if stored is not None:
+                similarity_raw, decided_by = stored, "score_store"
+            elif runs_inline(spec, config):
+                similarity_raw, decided_by = sim_calculator.evaluate(
+                    metric, p1_clean, p2_clean, threshold, deadline
+                )
+            else:
+                similarity_raw, decided_by = await bulkhead_for(spec).run(
+                    sim_calculator.evaluate, metric, p1_clean, p2_clean, threshold, deadline,
+                    priority=priority, timeout=deadline.remaining() if deadline is not None else None
+                )
+    except (BulkheadRejected, DeadlineExceeded) as e:
+        # Avec un délai, un metric LLM se dégrade au lieu d'échouer (contrat de deadline_ms)
+        if deadline is None or spec.kind != IO_BOUND or spec.fallback is None:
+            raise
+        logger.warning("%s degraded to %s at the deadline: %s", metric, spec.fallback, str(e))
+        similarity_raw, _ = sim_calculator.evaluate(spec.fallback, p1_clean, p2_clean, threshold)
+        decided_by = "deadline"
+    except Exception as e:
+        logger.error("Similarity calculation failed: %s", str(e))
+        # Valeur par défaut en cas d'erreur
+        similarity_raw = 0.0
+        decided_by = "error"
+    
+    # Les scores de repli ne sont pas gardés : le metric demandé pourra réussir plus tard
+    if store_key is not None and decided_by not in ("score_store", "error") + DEGRADED_TIERS:
+        # Non bloquant : si un autre worker écrit ou compacte, on ne l'attend pas
+        score_store.put(store_key, float(similarity_raw), blocking=False)
+    
+    return spec, p1_clean, p2_clean, float(similarity_raw), decided_by
+
 @router.post("/similarity-check")
-async def similarity_check(request: SimilarityRequest):
+async def similarity_check(request: SimilarityRequest, accept: Optional[str] = Header(None),
+                           x_request_deadline_ms: Optional[str] = Header(None)):
+    media_type = negotiate(accept, (JSON, MSGPACK))
     try:
-        logger.info("Received request: %s vs %s (%s)", 
-                   request.prompt1[:20], request.prompt2[:20], request.metric)
-        
-        # Sanitize inputs
-        try:
-            p1_clean = Sanitizer.sanitize_input(request.prompt1)
-            p2_clean = Sanitizer.sanitize_input(request.prompt2)
-        except ValueError as e:
-            logger.warning("Input sanitization failed: %s", str(e))
-            raise HTTPException(status_code=400, detail=str(e))
+        deadline = Deadline.from_request(x_request_deadline_ms, request.deadline_ms)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # Une seule lecture de la configuration : un rechargement en cours de requête ne la change pas
+    config = Config.snapshot
+    metric = request.metric or config.DEFAULT_METRIC
+    request_threshold = config.SIMILARITY_THRESHOLD if request.threshold is None else request.threshold
+    try:
+        # Pas d'extraits de texte dans les logs : le détail passe en debug
+        logger.debug("Received similarity request (%s, commentary=%s)", metric, request.commentary)
         
-        # Validate metric
-        valid_metrics = ["cosine", "jaccard", "llm", "direct_llm"]
-        if request.metric not in valid_metrics:
-            error_msg = f"Invalid metric: {request.metric}. Valid options: {', '.join(valid_metrics)}"
-            logger.warning(error_msg)
+        if request.commentary not in COMMENTARY_MODES:
+            error_msg = f"Invalid commentary mode: {request.commentary}. Valid options: {', '.join(COMMENTARY_MODES)}"
             raise HTTPException(status_code=400, detail=error_msg)
         
-        # Calculate similarity - avec gestion d'erreur robuste
-        similarity_raw = 0.0
-        
+        # Sanitize inputs, validate metric and score
         try:
-            if request.metric == "cosine":
-                similarity_raw = sim_calculator.cosine_sim(p1_clean, p2_clean)
-            elif request.metric == "jaccard":
-                similarity_raw = sim_calculator.jaccard_sim(p1_clean, p2_clean)
-            elif request.metric == "llm":
-                similarity_raw = sim_calculator.llm_based_sim(p1_clean, p2_clean)
-            elif request.metric == "direct_llm":
-                similarity_raw = sim_calculator.direct_llm_sim(p1_clean, p2_clean)
-            
-        except Exception as e:
-            logger.error("Similarity calculation failed: %s", str(e))
-            # Valeur par défaut en cas d'erreur
-            similarity_raw = 0.0
+            spec, p1_clean, p2_clean, similarity_raw, decided_by = await score_pair(
+                config, request.prompt1, request.prompt2, metric, request_threshold, deadline
+            )
+        except ValueError as e:
+            logger.warning("Invalid similarity request: %s", str(e))
+            raise HTTPException(status_code=400, detail=str(e))
+        if traffic_capture is not None:
+            traffic_capture.record("check", p1_clean, p2_clean, metric, request_threshold, request.commentary,
+                                   deadline.budget_ms if deadline is not None else None)
         
         # Nettoyer et convertir la similarité
         similarity = clean_numpy_types(similarity_raw)
@@ -81,7 +281,7 @@ async def similarity_check(request: SimilarityRequest):
             similarity = float(similarity) if similarity else 0.0
         
         # Nettoyer le threshold
-        threshold = clean_numpy_types(request.threshold)
+        threshold = clean_numpy_types(request_threshold)
         if not isinstance(threshold, (int, float)):
             threshold = float(threshold)
         
@@ -91,66 +291,65 @@ async def similarity_check(request: SimilarityRequest):
         if not isinstance(above_threshold, bool):
             above_threshold = bool(above_threshold)
         
-        logger.info("Similarity calculated: %.4f using %s (threshold: %.2f, above: %s)", 
-                   similarity, request.metric, threshold, above_threshold)
+        logger.info("Similarity calculated", extra={
+            "metric": metric, "score": round(float(similarity), 4), "threshold": float(threshold),
+            "above_threshold": bool(above_threshold), "decided_by": decided_by
+        })
         
-        # Generate LLM commentary ALWAYS (regardless of threshold)
+        # Commentaire LLM selon le mode demandé (inline = comportement historique)
         llm_response = None
+        commentary_id = None
+        commentary_dropped = False
         
-        try:
-            threshold_status = "above threshold (similar texts)" if above_threshold else "below threshold (dissimilar texts)"
-            commentary_prompt = f"""
-            Analyze and provide commentary on this text similarity comparison:
-            
-            Text 1: "{p1_clean}"
-            Text 2: "{p2_clean}"
-            
-            Similarity Analysis:
-            - Method used: {request.metric}
-            - Similarity score: {similarity:.3f}
-            - Threshold: {threshold}
-            - Result: {threshold_status}
-            
-            Please provide a brief, insightful commentary explaining:
-            - What makes these texts similar or different
-            - Key semantic connections or differences
-            - Why the similarity score makes sense for these texts
-            
-            Keep your response concise (2-3 sentences).
-            """
-            
-            raw_response = sim_calculator.llm_client.generate(commentary_prompt)
-            llm_response = Sanitizer.sanitize_output(raw_response) if raw_response else None
-            logger.info("Generated LLM commentary")
-            
-        except Exception as e:
-            llm_response = f"Error generating commentary: {str(e)}"
-            logger.error("LLM commentary generation failed: %s", str(e))
+        if request.commentary == "inline" and deadline is not None and \
+                not deadline.allows(config.COMMENTARY_MIN_BUDGET_MS / 1000):
+            # Budget serré : le commentaire est abandonné avant de dégrader le score
+            commentary_dropped = True
+            logger.info("Inline commentary dropped: %.0f ms left", deadline.remaining_ms())
+        elif request.commentary == "inline":
+            try:
+                with stage("commentary"):
+                    llm_response = await bulkheads["llm"].run(
+                        commentary_service.generate,
+                        p1_clean, p2_clean, metric, similarity, threshold, above_threshold, deadline, config,
+                        timeout=deadline.remaining() if deadline is not None else None
+                    )
+                logger.info("Generated LLM commentary")
+            except (DeadlineExceeded, BulkheadRejected) as e:
+                commentary_dropped = True
+                logger.warning("Inline commentary dropped: %s", str(e))
+            except Exception as e:
+                llm_response = f"Error generating commentary: {str(e)}"
+                logger.error("LLM commentary generation failed: %s", str(e))
+        elif request.commentary == "deferred":
+            commentary_id = commentary_service.submit(
+                p1_clean, p2_clean, metric, similarity, threshold, above_threshold, config
+            )
         
         # Construire la réponse avec nettoyage complet
         response_data = {
             "similarity_score": round(float(similarity), 4),
-            "similarity_metric": str(request.metric),
+            "similarity_metric": str(metric),
             "threshold": round(float(threshold), 4), 
             "above_threshold": bool(above_threshold),
+            "decided_by": decided_by,
+            "degraded": decided_by in DEGRADED_TIERS,
             "llm_response": llm_response,
+            "commentary": request.commentary,
+            "commentary_id": commentary_id,
+            "commentary_dropped": commentary_dropped,
             "explanation": {
-                "metric_description": {
-                    "cosine": "TF-IDF cosine similarity - mathematical text vector comparison",
-                    "jaccard": "Jaccard coefficient - token overlap ratio",
-                    "llm": "LLM-enhanced similarity - combines mathematical and semantic analysis", 
-                    "direct_llm": "Pure LLM assessment - semantic similarity evaluation"
-                }.get(str(request.metric), "Unknown metric")
+                "metric_description": spec.description
             }
         }
         
         # Nettoyage final de TOUTE la réponse
         cleaned_response = clean_numpy_types(response_data)
         
-        return cleaned_response
+        return encode(cleaned_response, media_type)
         
-    except HTTPException:
-        # Re-raise HTTP exceptions as-is
+    except (HTTPException, BulkheadRejected):
+        # Re-raise HTTP exceptions as-is (BulkheadRejected -> 503, see app.main)
         raise
     except Exception as e:
         logger.exception("Unexpected error in similarity check")
@@ -159,28 +358,404 @@ async def similarity_check(request: SimilarityRequest):
             "error": "Internal server error",
             "detail": str(e),
             "similarity_score": 0.0,
-            "similarity_metric": str(request.metric) if hasattr(request, 'metric') else "unknown",
+            "similarity_metric": str(metric),
             "threshold": 0.5,
             "above_threshold": False,
             "llm_response": None
         }
-        return clean_numpy_types(error_response)
+        return encode(clean_numpy_types(error_response), media_type)
+
+def _compute_matrix(request: SimilarityMatrixRequest, texts: List[str], packed: bool = False):
+    """Compute the requested view of the matrix (runs in a worker thread).
+    
+    ``packed``: dense matrix as row-major float32 bytes instead of nested lists.
+    """
+    matrix = SimilarityMatrix(texts, metric=request.metric)
+    if packed:
+        return matrix.dense().astype(np.float32).tobytes()
+    
+    if request.mode == "top_k":
+        neighbors = matrix.top_k(request.top_k)
+        return {"neighbors": [
+            [{"index": j, "score": round(score, 4)} for j, score in row]
+            for row in neighbors
+        ]}
+    
+    if request.mode == "threshold":
+        pairs = matrix.above_threshold(request.threshold)
+        return {"pairs": [
+            {"i": i, "j": j, "score": round(score, 4)} for i, j, score in pairs
+        ]}
+    
+    return {"matrix": np.round(matrix.dense(), 4).tolist()}
+
+@router.get("/commentary/{result_id}")
+async def get_commentary(result_id: str):
+    """Deferred commentary for a similarity-check result (commentary="deferred")"""
+    result = commentary_service.get(result_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"Unknown result ID: {result_id}")
+    return result
+
+@router.post("/similarity-matrix")
+async def similarity_matrix(request: SimilarityMatrixRequest, accept: Optional[str] = Header(None)):
+    """Pairwise similarity for a list of texts (dense, top-k or thresholded)"""
+    media_type = negotiate(accept, (JSON, MSGPACK, FLOAT32) if request.mode == "dense" else (JSON, MSGPACK))
+    if request.metric not in metric_registry.matrix_names():
+        valid = ", ".join(metric_registry.matrix_names())
+        raise HTTPException(status_code=400, detail=f"Invalid metric: {request.metric}. Valid options: {valid}")
+    
+    if request.mode not in ("dense", "top_k", "threshold"):
+        raise HTTPException(status_code=400, detail=f"Invalid mode: {request.mode}. Valid options: dense, top_k, threshold")
+    
+    config = Config.snapshot
+    n_texts = len(request.texts)
+    if n_texts == 0:
+        raise HTTPException(status_code=400, detail="texts must not be empty")
+    if n_texts > config.MATRIX_MAX_TEXTS:
+        raise HTTPException(status_code=400, detail=f"Too many texts: {n_texts} (max {config.MATRIX_MAX_TEXTS})")
+    if request.mode == "dense" and n_texts > config.MATRIX_MAX_DENSE_TEXTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Dense mode is limited to {config.MATRIX_MAX_DENSE_TEXTS} texts, use top_k or threshold mode"
+        )
+    if request.metric in SimilarityMatrix.PAIRWISE_METRICS and n_texts > config.MATRIX_MAX_PAIRWISE_TEXTS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"{request.metric} matrices are limited to {config.MATRIX_MAX_PAIRWISE_TEXTS} texts (scored pair by pair)"
+        )
+    if request.mode == "top_k" and request.top_k is None:
+        raise HTTPException(status_code=400, detail="top_k is required for mode 'top_k'")
+    if request.mode == "threshold" and request.threshold is None:
+        raise HTTPException(status_code=400, detail="threshold is required for mode 'threshold'")
+    
+    texts = sanitize_texts(request.texts, config)
+    
+    logger.info("Computing %s similarity matrix for %d texts (%s)", request.metric, n_texts, request.mode)
+    if media_type == FLOAT32:
+        body = await bulkheads["cpu"].run(_compute_matrix, request, texts, True, priority=PRIORITY_BATCH)
+        return encode(None, FLOAT32, lambda: body, headers={"X-Matrix-Size": str(n_texts)})
+    result = await bulkheads["cpu"].run(_compute_matrix, request, texts, priority=PRIORITY_BATCH)
+    
+    return encode({
+        "similarity_metric": request.metric,
+        "size": n_texts,
+        "mode": request.mode,
+        **result
+    }, media_type)
+
+def _compute_join(request: SimilarityJoinRequest, texts: List[str]) -> dict:
+    """Run the similarity join (in a worker thread)"""
+    join = SimilarityJoin(texts, metric=request.metric)
+    pairs = join.join(request.threshold)
+    return {
+        "pairs": [{"i": i, "j": j, "score": round(score, 4)} for i, j, score in pairs],
+        "stats": join.stats
+    }
+
+@router.post("/similarity-join")
+async def similarity_join(request: SimilarityJoinRequest, accept: Optional[str] = Header(None)):
+    """Pairs of texts whose Jaccard (or set cosine) score reaches the threshold, without scoring every pair"""
+    media_type = negotiate(accept, (JSON, MSGPACK))
+    if request.metric not in SIMJOIN_METRICS:
+        valid = ", ".join(SIMJOIN_METRICS)
+        raise HTTPException(status_code=400, detail=f"Invalid metric: {request.metric}. Valid options: {valid}")
+    
+    config = Config.snapshot
+    n_texts = len(request.texts)
+    if n_texts == 0:
+        raise HTTPException(status_code=400, detail="texts must not be empty")
+    if n_texts > config.MATRIX_MAX_TEXTS:
+        raise HTTPException(status_code=400, detail=f"Too many texts: {n_texts} (max {config.MATRIX_MAX_TEXTS})")
+    
+    texts = sanitize_texts(request.texts, config)
+    
+    logger.info("Computing %s similarity join for %d texts (threshold %.2f)", request.metric, n_texts, request.threshold)
+    result = await bulkheads["cpu"].run(_compute_join, request, texts, priority=PRIORITY_BATCH)
+    
+    return encode({
+        "similarity_metric": request.metric,
+        "size": n_texts,
+        "threshold": request.threshold,
+        **result
+    }, media_type)
+
+@router.post("/embeddings/{corpus}/documents")
+async def index_documents(corpus: str, request: EmbeddingIndexRequest):
+    """Embed documents with EMBEDDING_MODEL and add them to a corpus (same ID = replaced).
+    
+    400 when the corpus or the number of corpora (EMBEDDING_MAX_CORPORA) is full.
+    """
+    if not request.documents:
+        raise HTTPException(status_code=400, detail="documents must not be empty")
+    texts = sanitize_texts([document.text for document in request.documents], Config.snapshot)
+    ids = [document.id for document in request.documents]
+    
+    try:
+        added, size = await bulkheads["cpu"].run(
+            sim_calculator.embeddings.index, corpus, ids, texts, priority=PRIORITY_BATCH
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    logger.info("Indexed %d documents in corpus %s (%d new)", len(ids), corpus, added)
+    return {"corpus": corpus, "added": added, "size": size}
+
+@router.post("/embeddings/{corpus}/search")
+async def search_documents(corpus: str, request: EmbeddingSearchRequest, accept: Optional[str] = Header(None)):
+    """Nearest documents of a corpus to a query (approximate beyond a few thousand documents)"""
+    media_type = negotiate(accept, (JSON, MSGPACK))
+    query = sanitize_texts([request.query], Config.snapshot)[0]
+    try:
+        results = await bulkheads["cpu"].run(sim_calculator.embeddings.search, corpus, query, request.k)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown corpus: {corpus}")
+    return encode({
+        "corpus": corpus,
+        "results": [{"id": doc_id, "score": round(score, 4)} for doc_id, score in results]
+    }, media_type)
+
+@router.delete("/embeddings/{corpus}")
+async def drop_corpus(corpus: str):
+    """Remove a corpus and its index"""
+    if not sim_calculator.embeddings.drop(corpus):
+        raise HTTPException(status_code=404, detail=f"Unknown corpus: {corpus}")
+    return {"corpus": corpus, "dropped": True}
+
+@router.post("/similarity-batch")
+async def similarity_batch(request: SimilarityBatchRequest, accept: Optional[str] = Header(None)):
+    """Score a list of pairs with one metric, in JSON, MessagePack or packed float32.
+    
+    Invalid pairs get an ``error`` (NaN in float32 responses) instead of failing the batch.
+    """
+    media_type = negotiate(accept, (JSON, MSGPACK, FLOAT32))
+    config = Config.snapshot
+    metric = request.metric or config.DEFAULT_METRIC
+    threshold = config.SIMILARITY_THRESHOLD if request.threshold is None else request.threshold
+    if metric not in metric_registry:
+        valid = ", ".join(metric_registry.names())
+        raise HTTPException(status_code=400, detail=f"Invalid metric: {metric}. Valid options: {valid}")
+    if not request.pairs:
+        raise HTTPException(status_code=400, detail="pairs must not be empty")
+    if len(request.pairs) > config.BATCH_MAX_PAIRS:
+        raise HTTPException(status_code=400, detail=f"Too many pairs: {len(request.pairs)} (max {config.BATCH_MAX_PAIRS})")
+    
+    items = [
+        {"prompt1": pair.prompt1, "prompt2": pair.prompt2, "metric": metric, "threshold": threshold}
+        for pair in request.pairs
+    ]
+    results = await bulkhead_for(metric_registry.get(metric)).run(
+        bulk_scorer.score_items, items, config, priority=PRIORITY_BATCH
+    )
+    errors = sum("error" in result for result in results)
+    
+    if media_type == FLOAT32:
+        scores = np.array([result.get("similarity_score", np.nan) for result in results], dtype="<f4")
+        return encode(None, FLOAT32, scores.tobytes, headers={"X-Error-Count": str(errors)})
+    
+    return encode({
+        "similarity_metric": metric,
+        "threshold": round(float(threshold), 4),
+        "count": len(results),
+        "errors": errors,
+        "results": [
+            {"error": result["error"]} if "error" in result else {
+                "similarity_score": result["similarity_score"],
+                "above_threshold": result["above_threshold"],
+                "decided_by": result["decided_by"]
+            }
+            for result in results
+        ]
+    }, media_type)
+
+async def _score_bulk_chunk(chunk: List[NDJSONLine], config: ConfigSnapshot) -> bytes:
+    """Score one NDJSON chunk, each metric's lines on that metric's bulkhead at bulk priority.
+    
+    Lines refused by a saturated bulkhead get an error record instead of ending the stream.
+    """
+    parsed = [bulk_scorer.parse_line(line_no, raw, config) for line_no, raw in chunk]
+    pools: Dict[Bulkhead, List[int]] = {}
+    for position, item in enumerate(parsed):
+        if "error" not in item:
+            metric = item.get("metric", config.DEFAULT_METRIC)
+            # Metric invalide : l'erreur est produite par score_items, sur le pool cpu
+            valid = isinstance(metric, str) and metric in metric_registry
+            bulkhead = bulkhead_for(metric_registry.get(metric)) if valid else bulkheads["cpu"]
+            pools.setdefault(bulkhead, []).append(position)
+    
+    async def score(bulkhead: Bulkhead, positions: List[int]) -> None:
+        items = [parsed[i] for i in positions]
+        try:
+            scored = await bulkhead.run(bulk_scorer.score_items, items, config, priority=PRIORITY_BULK)
+        except BulkheadRejected as e:
+            scored = [{**({"id": item["id"]} if "id" in item else {}), "error": str(e)} for item in items]
+        for i, result in zip(positions, scored):
+            parsed[i] = {"line": chunk[i][0], **result}
+    
+    await asyncio.gather(*(score(bulkhead, positions) for bulkhead, positions in pools.items()))
+    return "".join(json.dumps(result) + "\n" for result in parsed).encode("utf-8")
+
+@router.post("/similarity-bulk")
+async def similarity_bulk(request: Request):
+    """Score a streamed NDJSON body of pairs, streaming NDJSON results back.
+    
+    Each input line is ``{"prompt1", "prompt2", "metric"?, "threshold"?, "id"?}``.
+    Lines are read and scored in chunks of ``BULK_CHUNK_SIZE``; the next chunk is
+    only read once the previous results have been sent to the client. Chunks wait
+    behind interactive and batch work on the metric's bulkhead.
+    """
+    async def results():
+        config = Config.snapshot
+        chunks = iter_ndjson_chunks(request.stream(), config.BULK_CHUNK_SIZE, config.BULK_MAX_LINE_BYTES)
+        scored = 0
+        try:
+            async for chunk in chunks:
+                yield await _score_bulk_chunk(chunk, config)
+                scored += len(chunk)
+        except ClientDisconnect:
+            logger.warning("Client disconnected during bulk scoring after %d lines", scored)
+            return
+        logger.info("Bulk scoring completed: %d lines", scored)
+    
+    return DuplexStreamingResponse(results(), media_type="application/x-ndjson")
+
+@router.post("/jobs", status_code=202)
+async def create_job(request: JobRequest):
+    """Submit a set of pairs to be scored in the background"""
+    config = Config.snapshot
+    metric = request.metric or config.DEFAULT_METRIC
+    threshold = config.SIMILARITY_THRESHOLD if request.threshold is None else request.threshold
+    if metric not in metric_registry:
+        valid = ", ".join(metric_registry.names())
+        raise HTTPException(status_code=400, detail=f"Invalid metric: {metric}. Valid options: {valid}")
+    if not request.pairs:
+        raise HTTPException(status_code=400, detail="pairs must not be empty")
+    if len(request.pairs) > config.JOBS_MAX_PAIRS:
+        raise HTTPException(status_code=400, detail=f"Too many pairs: {len(request.pairs)} (max {config.JOBS_MAX_PAIRS})")
+    
+    pairs = [pair.model_dump() for pair in request.pairs]
+    job = get_job_manager().submit(pairs, metric, threshold)
+    return job.to_dict()
+
+def _get_job_or_404(job_id: str):
+    job = get_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return job
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Job status and progress"""
+    return _get_job_or_404(job_id).to_dict()
+
+@router.get("/jobs/{job_id}/results")
+async def get_job_results(job_id: str, page: int = 1, page_size: int = 100):
+    """One page of results among those already computed"""
+    if page < 1 or not 1 <= page_size <= 1000:
+        raise HTTPException(status_code=400, detail="page must be >= 1 and page_size between 1 and 1000")
+    
+    job = _get_job_or_404(job_id)
+    results = await run_in_threadpool(
+        get_job_manager().results, job_id, (page - 1) * page_size, page_size
+    )
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "page": page,
+        "page_size": page_size,
+        "available": job.processed,
+        "total": job.total,
+        "results": results
+    }
+
+@router.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """Cancel a queued or running job (finished results are kept)"""
+    _get_job_or_404(job_id)
+    return get_job_manager().cancel(job_id).to_dict()
+
+@router.post("/admin/reload-config", dependencies=[Depends(require_admin)])
+async def reload_config():
+    """Re-read the environment and .env file and swap in the new configuration.
+    
+    Requests already running finish with the previous configuration. Settings
+    read once at start-up still need a restart: worker pools and bulkheads
+    (JOBS_*, *_POOL_*), caches and stores (COMMENTARY_* sizes, SCORE_STORE_*,
+    EMBEDDING_* including EMBEDDING_MODEL, CAPTURE_*, MEMORY_MAX_SNAPSHOTS)
+    and PORT.
+    """
+    previous = Config.snapshot
+    try:
+        # Lecture et compilation hors de la boucle d'événements
+        snapshot = await run_in_threadpool(Config.reload)
+    except ValueError as e:
+        logger.warning("Config reload rejected: %s", str(e))
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return {
+        "status": "reloaded",
+        "version": snapshot.version,
+        "changed": changed_settings(previous, snapshot),
+        "issues": Config.validate(snapshot)
+    }
+
+@router.get("/admin/memory", dependencies=[Depends(require_admin)])
+async def memory_report(top: int = 20):
+    """RSS, size of internal caches and, while tracing, top allocations by module"""
+    return await run_in_threadpool(memory_profiler.report, top)
+
+@router.post("/admin/memory/tracing", dependencies=[Depends(require_admin)])
+async def memory_tracing(enabled: bool = True, frames: Optional[int] = None):
+    """Start or stop tracemalloc (slows allocations down while enabled)"""
+    if enabled:
+        memory_profiler.start_tracing(frames or Config.snapshot.MEMORY_TRACE_FRAMES)
+    else:
+        memory_profiler.stop_tracing()
+    return {"tracing": memory_profiler.tracing}
+
+@router.post("/admin/memory/snapshots", dependencies=[Depends(require_admin)])
+async def memory_snapshot(name: str):
+    """Record the current footprint for a later diff"""
+    return await run_in_threadpool(memory_profiler.take_snapshot, name)
+
+@router.get("/admin/memory/diff", dependencies=[Depends(require_admin)])
+async def memory_diff(start: str, end: Optional[str] = None, top: int = 20):
+    """Growth between two snapshots (``end`` omitted = now)"""
+    try:
+        return await run_in_threadpool(memory_profiler.diff, start, end, top)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=f"Unknown memory snapshot: {e.args[0]}")
+
+@router.post("/admin/score-store/compact", dependencies=[Depends(require_admin)])
+async def compact_score_store():
+    """Rebuild the score store file, sized for its current entries"""
+    if score_store is None:
+        raise HTTPException(status_code=404, detail="Score store is disabled (SCORE_STORE_PATH is empty)")
+    return await run_in_threadpool(score_store.compact)
 
 @router.get("/health-detailed")
 async def health_detailed():
     """Health check avec informations détaillées"""
     try:
-        # Test de calcul simple
-        test_calc = SimilarityCalculator()
-        test_score = test_calc.cosine_sim("test", "test")
+        # Test de calcul simple (calculateur partagé : pas de nouveau client LLM à chaque appel)
+        test_score = sim_calculator.cosine_sim("test", "test")
         test_score_clean = clean_numpy_types(test_score)
         
+        config = Config.snapshot
         health_data = {
             "status": "healthy",
-            "port": int(Config.PORT),
+            "port": int(config.PORT),
             "similarity_test": float(test_score_clean),
-            "llm_configured": bool(Config.LLM_API_KEY),
-            "available_metrics": ["cosine", "jaccard", "llm", "direct_llm"]
+            "llm_configured": bool(config.LLM_API_KEY),
+            "config_version": config.version,
+            "llm_cascade": sim_calculator.cascade_summary(),
+            "llm_usage": sim_calculator.llm_client.usage_summary(),
+            "score_store": score_store.stats() if score_store is not None else None,
+            "logging": logging_service.stats(),
+            "bulkheads": bulkheads.snapshot(),
+            "capture": traffic_capture.stats() if traffic_capture is not None else None,
+            "embeddings": sim_calculator.embeddings.stats(),
+            "available_metrics": metric_registry.names(),
+            "metrics": metric_registry.describe()
         }
         
         return clean_numpy_types(health_data)
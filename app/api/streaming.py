@@ -0,0 +1,18 @@
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+class DuplexStreamingResponse(StreamingResponse):
+    """StreamingResponse whose body iterator may still be reading the request.
+
+    The stock StreamingResponse listens for ``http.disconnect`` in parallel,
+    which consumes request body messages. Here the body iterator is the only
+    consumer of ``receive``; a disconnect surfaces as ``ClientDisconnect``
+    from ``request.stream()``. Each chunk is sent before the next one is
+    produced, so a slow client naturally pauses request reading.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.stream_response(send)
+
+        if self.background is not None:
+            await self.background()
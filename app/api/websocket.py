@@ -0,0 +1,190 @@
+import asyncio
+import json
+import logging
+from typing import List, Optional, Tuple
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from app.api import endpoints
+from app.api.endpoints import score_pair
+from app.api.wire import msgpack
+from app.config import Config, ConfigSnapshot
+from app.core.bulkhead import BulkheadRejected
+from app.core.deadline import Deadline
+from app.core.metrics import DEGRADED_TIERS
+from app.core.sanitization import Sanitizer
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# Prompts d'une requête nettoyés par lot : ((p1_clean, p2_clean), None) ou (None, erreur)
+Prepared = Tuple[Optional[Tuple[str, str]], Optional[str]]
+
+def sanitize_frame(batch: list, config: ConfigSnapshot) -> List[Optional[Prepared]]:
+    """Sanitize the prompts of all the queries of a frame in one batch.
+
+    Entries are None for queries without two string prompts (score_query
+    reports them).
+    """
+    positions = [i for i, query in enumerate(batch) if isinstance(query, dict)
+                 and isinstance(query.get("prompt1"), str) and isinstance(query.get("prompt2"), str)]
+    prompts = [prompt for i in positions for prompt in (batch[i]["prompt1"], batch[i]["prompt2"])]
+    cleaned, errors = Sanitizer.sanitize_inputs(prompts, config)
+
+    prepared: List[Optional[Prepared]] = [None] * len(batch)
+    for k, i in enumerate(positions):
+        error = errors[2 * k] or errors[2 * k + 1]
+        prepared[i] = (None, error) if error is not None else ((cleaned[2 * k], cleaned[2 * k + 1]), None)
+    return prepared
+
+async def score_query(query, config: Optional[ConfigSnapshot] = None, prepared: Optional[Prepared] = None) -> dict:
+    """Answer one ``{"id", "prompt1", "prompt2", "metric"?, "threshold"?, "deadline_ms"?}`` query.
+
+    Same sanitization, defaults and scoring as /similarity-check (without
+    commentary); problems are reported in ``error`` instead of raised.
+    ``prepared``: the query's prompts from sanitize_frame.
+    """
+    if not isinstance(query, dict):
+        return {"id": None, "error": "Each query must be an object"}
+
+    result = {"id": query.get("id")}
+    config = config or Config.snapshot
+    prompt1, prompt2 = query.get("prompt1"), query.get("prompt2")
+    metric = query.get("metric") or config.DEFAULT_METRIC
+    threshold = query.get("threshold")
+    deadline_ms = query.get("deadline_ms")
+    if threshold is None:
+        threshold = config.SIMILARITY_THRESHOLD
+
+    if not isinstance(prompt1, str) or not isinstance(prompt2, str):
+        result["error"] = "prompt1 and prompt2 must be strings"
+        return result
+    if not isinstance(metric, str):
+        result["error"] = "metric must be a string"
+        return result
+    if isinstance(threshold, bool) or not isinstance(threshold, (int, float)) or not 0.0 <= threshold <= 1.0:
+        result["error"] = "threshold must be a number between 0 and 1"
+        return result
+    if deadline_ms is not None and (isinstance(deadline_ms, bool) or not isinstance(deadline_ms, (int, float))
+                                    or deadline_ms <= 0):
+        result["error"] = "deadline_ms must be a positive number"
+        return result
+    deadline = Deadline(deadline_ms) if deadline_ms is not None else None
+    cleaned = None
+    if prepared is not None:
+        cleaned, error = prepared
+        if error is not None:
+            result["error"] = error
+            return result
+
+    try:
+        _, p1_clean, p2_clean, similarity, decided_by = await score_pair(
+            config, prompt1, prompt2, metric, float(threshold), deadline, cleaned=cleaned
+        )
+    except (ValueError, BulkheadRejected) as e:
+        result["error"] = str(e)
+        return result
+    if endpoints.traffic_capture is not None:
+        endpoints.traffic_capture.record("ws", p1_clean, p2_clean, metric, float(threshold), None, deadline_ms)
+
+    result.update({
+        "similarity_score": round(similarity, 4),
+        "similarity_metric": metric,
+        "threshold": round(float(threshold), 4),
+        "above_threshold": similarity > threshold,
+        "decided_by": decided_by,
+        "degraded": decided_by in DEGRADED_TIERS
+    })
+    return result
+
+class _Session:
+    """One WebSocket connection: queries run as tasks, answers are sent as they complete"""
+
+    def __init__(self, websocket: WebSocket, max_in_flight: int):
+        self.websocket = websocket
+        self.in_flight = asyncio.Semaphore(max_in_flight)
+        self.send_lock = asyncio.Lock()
+        self.tasks = set()
+
+    async def send(self, message, binary: bool) -> None:
+        async with self.send_lock:
+            if binary:
+                await self.websocket.send_bytes(msgpack.packb(message, use_bin_type=True))
+            else:
+                await self.websocket.send_text(json.dumps(message))
+
+    async def answer(self, query, binary: bool, config: ConfigSnapshot, prepared: Optional[Prepared]) -> None:
+        try:
+            result = await score_query(query, config, prepared)
+        finally:
+            self.in_flight.release()
+        try:
+            await self.send(result, binary)
+        except Exception:
+            # Client parti entre-temps : la boucle de réception s'arrête aussi
+            pass
+
+    async def submit(self, query, binary: bool, config: ConfigSnapshot, prepared: Optional[Prepared]) -> None:
+        # Contre-pression : au-delà de max_in_flight, on arrête de lire le socket
+        await self.in_flight.acquire()
+        task = asyncio.create_task(self.answer(query, binary, config, prepared))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    def decode(self, message: dict):
+        """(payload, binary) for a text (JSON) or binary (MessagePack) frame; raises ValueError"""
+        data: Optional[bytes] = message.get("bytes")
+        if data is not None:
+            if msgpack is None:
+                raise ValueError("Binary frames require the msgpack package")
+            try:
+                return msgpack.unpackb(data, raw=False), True
+            except Exception as e:
+                raise ValueError(f"Invalid MessagePack frame: {str(e)}")
+        try:
+            return json.loads(message.get("text") or ""), False
+        except ValueError as e:
+            raise ValueError(f"Invalid JSON frame: {str(e)}")
+
+    def cancel(self) -> None:
+        for task in list(self.tasks):
+            task.cancel()
+
+@router.websocket("/ws/similarity")
+async def similarity_ws(websocket: WebSocket):
+    """Persistent session for many small similarity queries.
+
+    Each frame holds one query or a list of queries, tagged with a client
+    ``id``. Queries are processed concurrently (up to ``WS_MAX_IN_FLIGHT`` per
+    session) and answered as soon as they complete, possibly out of order.
+    Text frames are JSON; binary frames are MessagePack and answered in kind.
+    """
+    await websocket.accept()
+    session = _Session(websocket, Config.snapshot.WS_MAX_IN_FLIGHT)
+    queries = 0
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+
+            try:
+                payload, binary = session.decode(message)
+            except ValueError as e:
+                await session.send({"id": None, "error": str(e)}, False)
+                continue
+
+            # Une lecture de la configuration par trame
+            config = Config.snapshot
+            batch = payload if isinstance(payload, list) else [payload]
+            if len(batch) > config.WS_MAX_BATCH:
+                await session.send({"id": None, "error": f"Too many queries in one frame (max {config.WS_MAX_BATCH})"},
+                                   binary)
+                continue
+            for query, prepared in zip(batch, sanitize_frame(batch, config)):
+                await session.submit(query, binary, config, prepared)
+            queries += len(batch)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        session.cancel()
+        logger.info("WebSocket session closed after %d queries", queries)
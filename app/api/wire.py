@@ -0,0 +1,115 @@
+from typing import Callable, Optional, Sequence
+from fastapi import HTTPException, Request, Response
+from fastapi.routing import APIRoute
+
+try:
+    import msgpack
+except ImportError:  # Format binaire optionnel : JSON reste disponible
+    msgpack = None
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+# Scores seuls, en float32 little-endian (NaN pour les paires en erreur)
+FLOAT32 = "application/vnd.similarity.float32"
+
+MSGPACK_ALIASES = (MSGPACK, "application/x-msgpack", "application/vnd.msgpack")
+BINARY_TYPES = MSGPACK_ALIASES + (FLOAT32,)
+
+def _media_type(header: Optional[str]) -> str:
+    return (header or "").split(";", 1)[0].strip().lower()
+
+def negotiate(accept: Optional[str], allowed: Sequence[str]) -> str:
+    """Response media type for an ``Accept`` header among ``allowed``.
+
+    JSON when the header is absent, is a wildcard or only lists unknown types
+    (the historical behaviour). If the client only accepts binary types this
+    endpoint cannot produce (or msgpack is not installed), 406.
+    """
+    ranges = []
+    for position, part in enumerate((accept or "").split(",")):
+        media_type, _, params = part.partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if media_type.strip() and quality > 0:
+            ranges.append((-quality, position, media_type.strip().lower()))
+
+    rejected = None
+    for _, _, media_type in sorted(ranges):
+        if media_type in MSGPACK_ALIASES:
+            media_type = MSGPACK
+        if media_type in allowed and (media_type != MSGPACK or msgpack is not None):
+            return media_type
+        if media_type in ("*/*", "application/*", JSON):
+            return JSON
+        if media_type in BINARY_TYPES and rejected is None:
+            rejected = media_type
+
+    if rejected is not None:
+        reason = "msgpack is not installed" if rejected == MSGPACK else "not available for this endpoint"
+        raise HTTPException(status_code=406, detail=f"Cannot produce {rejected}: {reason}")
+    return JSON
+
+def encode(payload, media_type: str, packed: Optional[Callable[[], bytes]] = None, headers: Optional[dict] = None):
+    """Response for ``payload`` in ``media_type``.
+
+    JSON returns the payload itself so FastAPI serializes it as before;
+    ``packed`` builds the float32 body when that format was negotiated.
+    """
+    if media_type == MSGPACK:
+        return Response(msgpack.packb(payload, use_bin_type=True), media_type=MSGPACK, headers=headers)
+    if media_type == FLOAT32:
+        return Response(packed(), media_type=FLOAT32, headers=headers)
+    return payload
+
+class _DecodedRequest(Request):
+    """Request whose MessagePack body was already decoded; FastAPI reads it through json()"""
+
+    def __init__(self, scope, receive, body: bytes, data):
+        super().__init__(scope, receive)
+        self._raw_body = body
+        self._decoded = data
+
+    async def body(self) -> bytes:
+        return self._raw_body
+
+    async def json(self):
+        return self._decoded
+
+class WireRoute(APIRoute):
+    """Route accepting MessagePack request bodies in addition to JSON.
+
+    The body is decoded once and handed to FastAPI as if it were parsed JSON,
+    so the same Pydantic models validate both formats.
+    """
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        if self.body_field is None:
+            # Pas de modèle de corps (ex. flux NDJSON) : corps laissé intact
+            return handler
+
+        async def route_handler(request: Request) -> Response:
+            if _media_type(request.headers.get("content-type")) in MSGPACK_ALIASES:
+                request = await _decode_msgpack(request)
+            return await handler(request)
+
+        return route_handler
+
+async def _decode_msgpack(request: Request) -> Request:
+    if msgpack is None:
+        raise HTTPException(status_code=415, detail="MessagePack bodies require the msgpack package")
+    body = await request.body()
+    try:
+        data = msgpack.unpackb(body, raw=False)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Invalid MessagePack body: {str(e)}")
+
+    headers = [(name, value) for name, value in request.scope["headers"] if name != b"content-type"]
+    headers.append((b"content-type", JSON.encode()))
+    return _DecodedRequest({**request.scope, "headers": headers}, request.receive, body, data)
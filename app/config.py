@@ -1,53 +1,374 @@
+import bisect
+import itertools
 import os
-from dotenv import load_dotenv
-from typing import List
+import re
+import threading
+import time
+import weakref
+from dotenv import dotenv_values, find_dotenv, load_dotenv
+from typing import Callable, List, Mapping, Optional
 import logging
 
-load_dotenv()
+# Variables définies par le processus lui-même : elles priment sur le fichier .env,
+# au démarrage (load_dotenv sans override) comme lors d'un rechargement
+_PROCESS_ENV_KEYS = frozenset(os.environ)
+ENV_FILE = find_dotenv() or os.path.abspath(".env")
+load_dotenv(ENV_FILE)
 
 logger = logging.getLogger(__name__)
 
+MISSING_API_KEY_ISSUE = "LLM_API_KEY is not set - LLM features will be disabled"
+
+# Séparateur des textes concaténés par BlacklistMatcher.find_many
+BATCH_SEPARATOR = "\x00"
+
+class BlacklistMatcher:
+    """Blacklist compiled into a single regex: one scan of the text instead of one per word"""
+    
+    def __init__(self, words):
+        self.words = tuple(word for word in words if word)
+        # Les mots les plus longs d'abord pour que l'alternance ne s'arrête pas sur un préfixe
+        alternatives = sorted(self.words, key=len, reverse=True)
+        self._pattern = re.compile("|".join(map(re.escape, alternatives))) if self.words else None
+    
+    def find(self, text: str) -> Optional[str]:
+        """First blacklisted word (in blacklist order) contained in ``text``, or None"""
+        if self._pattern is None or self._pattern.search(text) is None:
+            return None
+        return next(word for word in self.words if word in text)
+    
+    def find_many(self, texts: List[str]) -> List[Optional[str]]:
+        """``find`` for many texts, scanning their concatenation once per blacklisted word.
+        
+        Plain substring search (str.find) over one large string is several
+        times faster than the alternation regex, which cannot skip ahead.
+        """
+        found: List[Optional[str]] = [None] * len(texts)
+        if not self.words or not texts:
+            return found
+        if any(BATCH_SEPARATOR in word for word in self.words):
+            return [self.find(text) for text in texts]
+        # Début de chaque texte dans la concaténation, pour rattacher les occurrences
+        starts = list(itertools.accumulate((len(text) + 1 for text in texts[:-1]), initial=0))
+        joined = BATCH_SEPARATOR.join(texts)
+        hits = set()
+        for word in self.words:
+            position = joined.find(word)
+            while position != -1:
+                i = bisect.bisect_right(starts, position) - 1
+                hits.add(i)
+                if i + 1 == len(texts):
+                    break
+                position = joined.find(word, starts[i + 1])
+        for i in hits:
+            # Mot du texte dans l'ordre de la liste noire, comme find()
+            found[i] = self.find(texts[i])
+        return found
+
+class ConfigSnapshot:
+    """Immutable set of settings read from one environment.
+    
+    Code that needs a consistent view for a whole request takes
+    ``Config.snapshot`` once and reads everything from it.
+    """
+    
+    def __init__(self, env: Mapping[str, str], version: int = 1):
+        # Service configuration
+        self.PORT = int(env.get("PORT", 8003))
+        self.SIMILARITY_THRESHOLD = float(env.get("SIMILARITY_THRESHOLD", 0.7))
+        self.DEFAULT_METRIC = env.get("DEFAULT_METRIC", "cosine")
+        self.MAX_INPUT_LENGTH = int(env.get("MAX_INPUT_LENGTH", 1000))
+        self.BLACKLIST = tuple(word.strip() for word in env.get("BLACKLIST", "").split(",") if word.strip())
+        
+        # LLM configuration (UPDATED for OpenAI v1.x)
+        self.LLM_API_KEY = env.get("LLM_API_KEY")
+        self.LLM_MODEL = env.get("LLM_MODEL", "gpt-3.5-turbo")  # Updated default model
+        # Serveur compatible OpenAI (proxy, modèle local, stub de test) ; vide = API OpenAI
+        self.LLM_BASE_URL = env.get("LLM_BASE_URL") or None
+        self.LLM_MAX_TOKENS = int(env.get("LLM_MAX_TOKENS", 150))
+        self.LLM_TEMPERATURE = float(env.get("LLM_TEMPERATURE", 0.7))
+        # Budget (en tokens estimés) pour les deux textes insérés dans un prompt
+        self.LLM_PROMPT_TOKEN_BUDGET = int(env.get("LLM_PROMPT_TOKEN_BUDGET", 512))
+        # Metric "llm" : écart au seuil en dessous duquel on interroge le LLM
+        self.LLM_CASCADE_MARGIN = float(env.get("LLM_CASCADE_MARGIN", 0.15))
+        # Délais par requête : budget minimal restant pour tenter un appel LLM,
+        # et pour générer le commentaire inline (abandonné en premier)
+        self.LLM_MIN_BUDGET_MS = float(env.get("LLM_MIN_BUDGET_MS", 500))
+        self.COMMENTARY_MIN_BUDGET_MS = float(env.get("COMMENTARY_MIN_BUDGET_MS", 2000))
+        
+        # Deferred commentary
+        self.COMMENTARY_CACHE_SIZE = int(env.get("COMMENTARY_CACHE_SIZE", 1000))
+        self.COMMENTARY_MAX_RESULTS = int(env.get("COMMENTARY_MAX_RESULTS", 10000))
+        self.COMMENTARY_WORKERS = int(env.get("COMMENTARY_WORKERS", 4))
+        self.COMMENTARY_SCORE_BUCKET = float(env.get("COMMENTARY_SCORE_BUCKET", 0.05))
+        
+        # Embedding configuration ("hashing" = encodeur local déterministe, sans modèle)
+        self.EMBEDDING_MODEL = env.get("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+        self.EMBEDDING_CACHE_SIZE = int(env.get("EMBEDDING_CACHE_SIZE", 10000))
+        # Regroupement des textes de requêtes concurrentes en un appel au modèle
+        self.EMBEDDING_BATCH_SIZE = int(env.get("EMBEDDING_BATCH_SIZE", 64))
+        self.EMBEDDING_BATCH_WAIT_MS = float(env.get("EMBEDDING_BATCH_WAIT_MS", 2.0))
+        self.EMBEDDING_INDEX_MAX_DOCS = int(env.get("EMBEDDING_INDEX_MAX_DOCS", 100000))
+        self.EMBEDDING_MAX_CORPORA = int(env.get("EMBEDDING_MAX_CORPORA", 10))
+        
+        # Bulkheads : threads, file d'attente et attente maximale par classe de travail
+        self.CPU_POOL_WORKERS = int(env.get("CPU_POOL_WORKERS", 8))
+        self.CPU_POOL_QUEUE = int(env.get("CPU_POOL_QUEUE", 200))
+        self.CPU_POOL_QUEUE_TIMEOUT_MS = float(env.get("CPU_POOL_QUEUE_TIMEOUT_MS", 2000))
+        self.LLM_POOL_WORKERS = int(env.get("LLM_POOL_WORKERS", 16))
+        self.LLM_POOL_QUEUE = int(env.get("LLM_POOL_QUEUE", 100))
+        self.LLM_POOL_QUEUE_TIMEOUT_MS = float(env.get("LLM_POOL_QUEUE_TIMEOUT_MS", 5000))
+        
+        # Capture des formes de requêtes pour rejeu (CAPTURE_PATH vide = désactivée)
+        self.CAPTURE_PATH = env.get("CAPTURE_PATH", "")
+        self.CAPTURE_SAMPLE_RATE = float(env.get("CAPTURE_SAMPLE_RATE", 1.0))
+        self.CAPTURE_MAX_BYTES = int(env.get("CAPTURE_MAX_BYTES", 100 * 1024 * 1024))
+        self.CAPTURE_HASH_KEY = env.get("CAPTURE_HASH_KEY", "")
+        
+        # Logs JSON asynchrones : niveau, part des requêtes journalisées en info, taille de la file
+        self.LOG_LEVEL = env.get("LOG_LEVEL", "INFO").upper()
+        self.LOG_SAMPLE_RATE = float(env.get("LOG_SAMPLE_RATE", 1.0))
+        self.LOG_QUEUE_SIZE = int(env.get("LOG_QUEUE_SIZE", 10000))
+        
+        # Rate limiting
+        self.MAX_REQUESTS_PER_MINUTE = int(env.get("MAX_REQUESTS_PER_MINUTE", 60))
+        
+        # Metrics whose registry cost is at most this run on the event loop, others in worker threads
+        self.INLINE_METRIC_MAX_COST = float(env.get("INLINE_METRIC_MAX_COST", 1.0))
+        
+        # Similarity matrix
+        self.MATRIX_BLOCK_SIZE = int(env.get("MATRIX_BLOCK_SIZE", 256))
+        self.MATRIX_MAX_TEXTS = int(env.get("MATRIX_MAX_TEXTS", 50000))
+        self.MATRIX_MAX_DENSE_TEXTS = int(env.get("MATRIX_MAX_DENSE_TEXTS", 2000))
+        # levenshtein / jaro_winkler : une comparaison Python par paire, N²/2 appels
+        self.MATRIX_MAX_PAIRWISE_TEXTS = int(env.get("MATRIX_MAX_PAIRWISE_TEXTS", 300))
+        
+        # Pair-list batch endpoint (JSON, MessagePack or float32 responses)
+        self.BATCH_MAX_PAIRS = int(env.get("BATCH_MAX_PAIRS", 10000))
+        # Session WebSocket : requêtes traitées en parallèle, requêtes par trame
+        self.WS_MAX_IN_FLIGHT = int(env.get("WS_MAX_IN_FLIGHT", 64))
+        self.WS_MAX_BATCH = int(env.get("WS_MAX_BATCH", 1000))
+        
+        # Bulk NDJSON scoring
+        self.BULK_CHUNK_SIZE = int(env.get("BULK_CHUNK_SIZE", 100))
+        self.BULK_MAX_LINE_BYTES = int(env.get("BULK_MAX_LINE_BYTES", 65536))
+        
+        # Administration (hot reload) - sans ADMIN_TOKEN, les endpoints admin sont désactivés
+        self.ADMIN_TOKEN = env.get("ADMIN_TOKEN")
+        # Intervalle de surveillance du fichier .env en secondes (0 = désactivé)
+        self.CONFIG_WATCH_INTERVAL = float(env.get("CONFIG_WATCH_INTERVAL", 5.0))
+        
+        # Persistent pair-score store (fichier mmap partagé entre workers, vide = désactivé)
+        self.SCORE_STORE_PATH = env.get("SCORE_STORE_PATH", "")
+        self.SCORE_STORE_MAX_ENTRIES = int(env.get("SCORE_STORE_MAX_ENTRIES", 1000000))
+        
+        # Memory profiling (tracemalloc) - ralentit chaque allocation, désactivé par défaut
+        self.MEMORY_PROFILING = env.get("MEMORY_PROFILING", "false").lower() in ("1", "true", "yes")
+        self.MEMORY_TRACE_FRAMES = int(env.get("MEMORY_TRACE_FRAMES", 25))
+        self.MEMORY_MAX_SNAPSHOTS = int(env.get("MEMORY_MAX_SNAPSHOTS", 5))
+        
+        # Background jobs
+        self.JOBS_DIR = env.get("JOBS_DIR", "data/jobs")
+        self.JOBS_MAX_WORKERS = int(env.get("JOBS_MAX_WORKERS", 4))
+        self.JOBS_CHUNK_SIZE = int(env.get("JOBS_CHUNK_SIZE", 50))
+        self.JOBS_MAX_PAIRS = int(env.get("JOBS_MAX_PAIRS", 100000))
+        self.JOBS_LLM_CONCURRENCY = int(env.get("JOBS_LLM_CONCURRENCY", 2))
+        self.JOBS_CPU_CONCURRENCY = int(env.get("JOBS_CPU_CONCURRENCY", 4))
+        # Rétention des jobs terminés (métadonnées en mémoire, résultats sur disque)
+        self.JOBS_RESULT_TTL_S = float(env.get("JOBS_RESULT_TTL_S", 86400))
+        self.JOBS_MAX_FINISHED = int(env.get("JOBS_MAX_FINISHED", 1000))
+        
+        # Dérivés
+        self.BLACKLIST_MATCHER = BlacklistMatcher(self.BLACKLIST)
+        self.version = version
+        self.loaded_at = time.time()
+        self._frozen = True
+    
+    def __setattr__(self, name, value):
+        if self.__dict__.get("_frozen"):
+            raise AttributeError("ConfigSnapshot is immutable, use Config.reload()")
+        object.__setattr__(self, name, value)
+    
+    def __delattr__(self, name):
+        raise AttributeError("ConfigSnapshot is immutable, use Config.reload()")
+    
+    def settings(self) -> dict:
+        """Public settings (upper-case names) of this snapshot"""
+        return {name: value for name, value in self.__dict__.items() if name.isupper()}
+
+def read_environment(overrides: Optional[Mapping[str, str]] = None) -> dict:
+    """Current .env file values, overridden by the process environment then ``overrides``"""
+    env = {key: value for key, value in dotenv_values(ENV_FILE).items() if value is not None} \
+        if os.path.exists(ENV_FILE) else {}
+    env.update((key, value) for key, value in os.environ.items() if key in _PROCESS_ENV_KEYS)
+    env.update(overrides or {})
+    return env
+
+def changed_settings(old: ConfigSnapshot, new: ConfigSnapshot) -> List[str]:
+    """Names of the settings whose value differs between two snapshots"""
+    return [name for name, value in new.settings().items() if getattr(old, name, None) != value]
+
 class Config:
-    # Service configuration
-    PORT = int(os.getenv("PORT", 8003))
-    SIMILARITY_THRESHOLD = float(os.getenv("SIMILARITY_THRESHOLD", 0.7))
-    DEFAULT_METRIC = os.getenv("DEFAULT_METRIC", "cosine")
-    MAX_INPUT_LENGTH = int(os.getenv("MAX_INPUT_LENGTH", 1000))
-    BLACKLIST = [word.strip() for word in os.getenv("BLACKLIST", "").split(",") if word.strip()]
+    """Current configuration.
     
-    # LLM configuration (UPDATED for OpenAI v1.x)
-    LLM_API_KEY = os.getenv("LLM_API_KEY")
-    LLM_MODEL = os.getenv("LLM_MODEL", "gpt-3.5-turbo")  # Updated default model
-    LLM_MAX_TOKENS = int(os.getenv("LLM_MAX_TOKENS", 150))
-    LLM_TEMPERATURE = float(os.getenv("LLM_TEMPERATURE", 0.7))
+    ``Config.snapshot`` is the active ConfigSnapshot; its settings are also
+    mirrored as class attributes (``Config.PORT``, ...). ``reload()`` builds a
+    new snapshot and swaps it in with a single assignment, so requests holding
+    the previous snapshot finish with it. The mirrored attributes are updated
+    one by one after the swap: only start-up code reads them, request code
+    reads ``Config.snapshot``.
+    """
+    snapshot: ConfigSnapshot = None
+    _reload_lock = threading.Lock()
+    _listeners: list = []
     
-    # Embedding configuration
-    EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+    @classmethod
+    def _apply(cls, snapshot: ConfigSnapshot):
+        cls.snapshot = snapshot
+        for name, value in snapshot.settings().items():
+            setattr(cls, name, value)
     
-    # Rate limiting
-    MAX_REQUESTS_PER_MINUTE = int(os.getenv("MAX_REQUESTS_PER_MINUTE", 60))
+    @classmethod
+    def subscribe(cls, callback: Callable[[ConfigSnapshot], None]):
+        """Call ``callback(snapshot)`` after each reload (held by weak reference)"""
+        ref = weakref.WeakMethod(callback) if hasattr(callback, "__self__") else weakref.ref(callback)
+        cls._listeners.append(ref)
     
     @classmethod
-    def validate(cls) -> List[str]:
-        """Validate configuration and return list of issues"""
+    def reload(cls, overrides: Optional[Mapping[str, str]] = None) -> ConfigSnapshot:
+        """Re-read the environment and .env file and swap in the new snapshot.
+        
+        Raises ValueError (keeping the current snapshot) if a value cannot be
+        parsed or fails validation. A missing LLM_API_KEY is only a warning.
+        """
+        with cls._reload_lock:
+            try:
+                snapshot = ConfigSnapshot(read_environment(overrides), cls.snapshot.version + 1)
+            except (TypeError, ValueError) as e:
+                raise ValueError(f"Invalid configuration: {str(e)}")
+            
+            issues = [issue for issue in cls.validate(snapshot) if issue != MISSING_API_KEY_ISSUE]
+            if issues:
+                raise ValueError(f"Invalid configuration: {'; '.join(issues)}")
+            
+            previous = cls.snapshot
+            cls._apply(snapshot)
+            
+            alive = []
+            for ref in cls._listeners:
+                callback = ref()
+                if callback is None:
+                    continue
+                alive.append(ref)
+                try:
+                    callback(snapshot)
+                except Exception as e:
+                    logger.error("Config reload listener failed: %s", str(e))
+            cls._listeners[:] = alive
+        
+        # Noms seulement : les valeurs peuvent être sensibles (clé API)
+        logger.info("Configuration reloaded (version %d), changed: %s",
+                    snapshot.version, ", ".join(changed_settings(previous, snapshot)) or "nothing")
+        return snapshot
+    
+    @classmethod
+    def validate(cls, snapshot: Optional[ConfigSnapshot] = None) -> List[str]:
+        """Validate configuration (the current snapshot by default) and return list of issues"""
+        config = snapshot or cls.snapshot
         issues = []
         
-        if not cls.LLM_API_KEY:
-            issues.append("LLM_API_KEY is not set - LLM features will be disabled")
+        if not config.LLM_API_KEY:
+            issues.append(MISSING_API_KEY_ISSUE)
         
-        if cls.SIMILARITY_THRESHOLD < 0 or cls.SIMILARITY_THRESHOLD > 1:
+        if config.SIMILARITY_THRESHOLD < 0 or config.SIMILARITY_THRESHOLD > 1:
             issues.append("SIMILARITY_THRESHOLD must be between 0 and 1")
         
-        valid_metrics = ["cosine", "jaccard", "llm", "direct_llm"]
-        if cls.DEFAULT_METRIC not in valid_metrics:
+        # Import local : le registre vit dans app.core, qui importe lui-même Config
+        from app.core.metrics import metric_registry
+        valid_metrics = metric_registry.names()
+        if config.DEFAULT_METRIC not in valid_metrics:
             issues.append(f"DEFAULT_METRIC must be one of: {valid_metrics}")
         
-        if cls.MAX_INPUT_LENGTH < 1:
+        if config.MAX_INPUT_LENGTH < 1:
             issues.append("MAX_INPUT_LENGTH must be positive")
         
-        if cls.LLM_MAX_TOKENS < 1:
+        if config.LLM_MAX_TOKENS < 1:
             issues.append("LLM_MAX_TOKENS must be positive")
         
+        if config.LLM_PROMPT_TOKEN_BUDGET < 16:
+            issues.append("LLM_PROMPT_TOKEN_BUDGET must be at least 16")
+        
+        if config.LLM_CASCADE_MARGIN < 0 or config.LLM_CASCADE_MARGIN > 1:
+            issues.append("LLM_CASCADE_MARGIN must be between 0 and 1")
+        
+        if config.CPU_POOL_WORKERS < 1 or config.LLM_POOL_WORKERS < 1:
+            issues.append("CPU_POOL_WORKERS and LLM_POOL_WORKERS must be positive")
+        
+        if config.CPU_POOL_QUEUE < 0 or config.LLM_POOL_QUEUE < 0:
+            issues.append("CPU_POOL_QUEUE and LLM_POOL_QUEUE must not be negative")
+        
+        if config.CPU_POOL_QUEUE_TIMEOUT_MS < 0 or config.LLM_POOL_QUEUE_TIMEOUT_MS < 0:
+            issues.append("CPU_POOL_QUEUE_TIMEOUT_MS and LLM_POOL_QUEUE_TIMEOUT_MS must not be negative")
+        
+        if config.CAPTURE_SAMPLE_RATE < 0 or config.CAPTURE_SAMPLE_RATE > 1:
+            issues.append("CAPTURE_SAMPLE_RATE must be between 0 and 1")
+        
+        if config.CAPTURE_MAX_BYTES < 1:
+            issues.append("CAPTURE_MAX_BYTES must be positive")
+        
+        if config.LOG_LEVEL not in ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"):
+            issues.append("LOG_LEVEL must be DEBUG, INFO, WARNING, ERROR or CRITICAL")
+        
+        if config.LOG_SAMPLE_RATE < 0 or config.LOG_SAMPLE_RATE > 1:
+            issues.append("LOG_SAMPLE_RATE must be between 0 and 1")
+        
+        if config.LOG_QUEUE_SIZE < 1:
+            issues.append("LOG_QUEUE_SIZE must be positive")
+        
+        if config.LLM_MIN_BUDGET_MS < 0 or config.COMMENTARY_MIN_BUDGET_MS < 0:
+            issues.append("LLM_MIN_BUDGET_MS and COMMENTARY_MIN_BUDGET_MS must not be negative")
+        
+        if config.COMMENTARY_SCORE_BUCKET <= 0 or config.COMMENTARY_SCORE_BUCKET > 1:
+            issues.append("COMMENTARY_SCORE_BUCKET must be in (0, 1]")
+        
+        if config.MATRIX_BLOCK_SIZE < 1:
+            issues.append("MATRIX_BLOCK_SIZE must be positive")
+        
+        if config.MATRIX_MAX_PAIRWISE_TEXTS < 1:
+            issues.append("MATRIX_MAX_PAIRWISE_TEXTS must be positive")
+        
+        if (config.EMBEDDING_CACHE_SIZE < 1 or config.EMBEDDING_BATCH_SIZE < 1 or config.EMBEDDING_INDEX_MAX_DOCS < 1
+                or config.EMBEDDING_MAX_CORPORA < 1):
+            issues.append("EMBEDDING_CACHE_SIZE, EMBEDDING_BATCH_SIZE, EMBEDDING_INDEX_MAX_DOCS "
+                          "and EMBEDDING_MAX_CORPORA must be positive")
+        
+        if config.EMBEDDING_BATCH_WAIT_MS < 0:
+            issues.append("EMBEDDING_BATCH_WAIT_MS must not be negative")
+        
+        if config.BATCH_MAX_PAIRS < 1:
+            issues.append("BATCH_MAX_PAIRS must be positive")
+        
+        if config.WS_MAX_IN_FLIGHT < 1 or config.WS_MAX_BATCH < 1:
+            issues.append("WS_MAX_IN_FLIGHT and WS_MAX_BATCH must be positive")
+        
+        if config.BULK_CHUNK_SIZE < 1:
+            issues.append("BULK_CHUNK_SIZE must be positive")
+        
+        if config.JOBS_MAX_WORKERS < 1 or config.JOBS_LLM_CONCURRENCY < 1 or config.JOBS_CPU_CONCURRENCY < 1:
+            issues.append("JOBS_MAX_WORKERS and JOBS_*_CONCURRENCY must be positive")
+        
+        if config.JOBS_RESULT_TTL_S <= 0 or config.JOBS_MAX_FINISHED < 1:
+            issues.append("JOBS_RESULT_TTL_S and JOBS_MAX_FINISHED must be positive")
+        
+        if config.SCORE_STORE_MAX_ENTRIES < 1:
+            issues.append("SCORE_STORE_MAX_ENTRIES must be positive")
+        
+        if config.MEMORY_TRACE_FRAMES < 1 or config.MEMORY_MAX_SNAPSHOTS < 1:
+            issues.append("MEMORY_TRACE_FRAMES and MEMORY_MAX_SNAPSHOTS must be positive")
+        
+        if config.CONFIG_WATCH_INTERVAL < 0:
+            issues.append("CONFIG_WATCH_INTERVAL must be positive or 0")
+        
         return issues
     
     @classmethod
@@ -65,6 +386,55 @@ class Config:
         logger.info(f"BLACKLIST_ITEMS: {len(cls.BLACKLIST)}")
         logger.info("=" * 45)
 
+class ConfigWatcher:
+    """Reloads the configuration when the .env file changes (mtime polling)"""
+    
+    def __init__(self, path: str = ENV_FILE, interval: Optional[float] = None):
+        self.path = path
+        self.interval = Config.CONFIG_WATCH_INTERVAL if interval is None else interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._mtime = self._read_mtime()
+    
+    def _read_mtime(self) -> Optional[float]:
+        try:
+            return os.stat(self.path).st_mtime
+        except OSError:
+            return None
+    
+    def check(self) -> bool:
+        """Reload if the file changed since the last check; True if a reload happened"""
+        mtime = self._read_mtime()
+        if mtime == self._mtime:
+            return False
+        self._mtime = mtime
+        try:
+            Config.reload()
+        except ValueError as e:
+            # On garde l'ancienne configuration jusqu'à la prochaine modification du fichier
+            logger.error("Config reload from %s rejected: %s", self.path, str(e))
+            return False
+        return True
+    
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+    
+    def start(self):
+        if self.interval <= 0 or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="config-watcher", daemon=True)
+        self._thread.start()
+        logger.info("Watching %s for configuration changes every %.1fs", self.path, self.interval)
+    
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+            self._thread = None
+
+Config._apply(ConfigSnapshot(read_environment()))
+
 # Validate configuration on module load
 config_issues = Config.validate()
 if config_issues:
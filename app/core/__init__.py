@@ -1,4 +1,5 @@
 # Fichier vide ou avec :
 from .similarity import SimilarityCalculator
 from .llm_proxy import LLMClient
-from .sanitization import Sanitizer
\ No newline at end of file
+from .sanitization import Sanitizer
+from .matrix import SimilarityMatrix
\ No newline at end of file
@@ -0,0 +1,179 @@
+import json
+import logging
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from app.config import Config, ConfigSnapshot
+from app.core.metrics import metric_registry
+from app.core.sanitization import Sanitizer
+from app.core.similarity import SimilarityCalculator
+
+logger = logging.getLogger(__name__)
+
+# (numéro de ligne, contenu brut) - contenu None si la ligne dépasse la taille maximale
+NDJSONLine = Tuple[int, Optional[bytes]]
+
+async def iter_ndjson_chunks(
+    stream: AsyncIterator[bytes],
+    chunk_size: int,
+    max_line_bytes: int
+) -> AsyncIterator[List[NDJSONLine]]:
+    """Split a byte stream into chunks of at most ``chunk_size`` NDJSON lines.
+
+    Only the current partial line and the current chunk are buffered, so memory
+    stays bounded whatever the stream length. Oversized lines are discarded and
+    reported with a ``None`` payload; blank lines are skipped.
+    """
+    buffer = bytearray()
+    overflow = False
+    line_no = 0
+    chunk: List[NDJSONLine] = []
+
+    def close_line(piece: bytes) -> None:
+        nonlocal overflow, line_no
+        line_no += 1
+        if overflow or len(buffer) + len(piece) > max_line_bytes:
+            chunk.append((line_no, None))
+        else:
+            buffer.extend(piece)
+            if buffer.strip():
+                chunk.append((line_no, bytes(buffer)))
+        buffer.clear()
+        overflow = False
+
+    async for data in stream:
+        start = 0
+        while True:
+            end = data.find(b"\n", start)
+            if end < 0:
+                break
+            close_line(data[start:end])
+            start = end + 1
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+
+        rest = data[start:]
+        if not overflow and len(buffer) + len(rest) > max_line_bytes:
+            # Ligne trop longue : on arrête de la bufferiser jusqu'au prochain saut de ligne
+            overflow = True
+            buffer.clear()
+        elif not overflow:
+            buffer.extend(rest)
+
+    if buffer.strip() or overflow:
+        close_line(b"")
+    if chunk:
+        yield chunk
+
+class BulkScorer:
+    """Score NDJSON pair lines with the regular similarity metrics.
+
+    Items are validated and sanitized one by one, then scored in groups of
+    the same metric and threshold so batchable metrics go through their
+    batch kernel. ``config``: the snapshot the request started with (default:
+    the current one, read once per call).
+    """
+
+    def __init__(self, calculator: SimilarityCalculator):
+        self.calculator = calculator
+
+    def parse_line(self, line_no: int, raw: Optional[bytes], config: Optional[ConfigSnapshot] = None) -> dict:
+        """Decode one NDJSON line into an item, or an error record with ``error`` set"""
+        if raw is None:
+            return {"line": line_no, "error": f"Line exceeds {(config or Config.snapshot).BULK_MAX_LINE_BYTES} bytes"}
+
+        try:
+            item = json.loads(raw)
+        except ValueError as e:
+            return {"line": line_no, "error": f"Invalid JSON: {str(e)}"}
+        if not isinstance(item, dict):
+            return {"line": line_no, "error": "Each line must be a JSON object"}
+        return item
+
+    def score_line(self, line_no: int, raw: Optional[bytes], config: Optional[ConfigSnapshot] = None) -> dict:
+        """Score one line, returning a result or an error record (never raises)"""
+        return self.score_lines([(line_no, raw)], config)[0]
+
+    def score_lines(self, lines: List[NDJSONLine], config: Optional[ConfigSnapshot] = None) -> List[dict]:
+        config = config or Config.snapshot
+        parsed = [self.parse_line(line_no, raw, config) for line_no, raw in lines]
+        positions = [i for i, item in enumerate(parsed) if "error" not in item]
+        scored = self.score_items([parsed[i] for i in positions], config)
+
+        results = [item if "error" in item else None for item in parsed]
+        for i, result in zip(positions, scored):
+            results[i] = {"line": lines[i][0], **result}
+        return results
+
+    def score_item(self, item: dict, config: Optional[ConfigSnapshot] = None) -> dict:
+        """Validate, sanitize and score one ``{"prompt1", "prompt2", ...}`` item"""
+        return self.score_items([item], config)[0]
+
+    def score_items(self, items: List[dict], config: Optional[ConfigSnapshot] = None) -> List[dict]:
+        """Score many items; invalid ones get an ``error`` instead of a score"""
+        config = config or Config.snapshot
+        results = []
+        valid: List[Tuple[int, str, float]] = []
+        prompts: List[str] = []
+        groups: Dict[Tuple[str, float], List[Tuple[int, str, str]]] = {}
+
+        for position, item in enumerate(items):
+            result, prepared = self._prepare(item, config)
+            results.append(result)
+            if prepared is not None:
+                metric, threshold, prompt1, prompt2 = prepared
+                valid.append((position, metric, threshold))
+                prompts += (prompt1, prompt2)
+
+        # Nettoyage de tous les textes du lot en une passe (prompt1, prompt2, prompt1, ...)
+        cleaned, errors = Sanitizer.sanitize_inputs(prompts, config)
+        for k, (position, metric, threshold) in enumerate(valid):
+            error = errors[2 * k] or errors[2 * k + 1]
+            if error is not None:
+                results[position]["error"] = error
+                continue
+            groups.setdefault((metric, threshold), []).append((position, cleaned[2 * k], cleaned[2 * k + 1]))
+
+        for (metric, threshold), group in groups.items():
+            pairs = [(p1_clean, p2_clean) for _, p1_clean, p2_clean in group]
+            try:
+                scored = self.calculator.evaluate_batch(metric, pairs, threshold)
+            except Exception as e:
+                logger.error("Bulk similarity calculation failed: %s", str(e))
+                scored = [(0.0, "error")] * len(pairs)
+
+            for (position, _, _), (similarity, decided_by) in zip(group, scored):
+                similarity = float(similarity)
+                results[position].update({
+                    "similarity_score": round(similarity, 4),
+                    "similarity_metric": metric,
+                    "threshold": round(float(threshold), 4),
+                    "above_threshold": similarity > threshold,
+                    "decided_by": decided_by
+                })
+        return results
+
+    def _prepare(self, item: dict, config: ConfigSnapshot) -> Tuple[dict, Optional[Tuple[str, float, str, str]]]:
+        """(result skeleton, (metric, threshold, prompt1, prompt2) or None if invalid), before sanitization"""
+        result = {}
+        if "id" in item:
+            result["id"] = item["id"]
+
+        prompt1, prompt2 = item.get("prompt1"), item.get("prompt2")
+        metric = item.get("metric", config.DEFAULT_METRIC)
+        threshold = item.get("threshold", config.SIMILARITY_THRESHOLD)
+
+        if not isinstance(prompt1, str) or not isinstance(prompt2, str):
+            result["error"] = "prompt1 and prompt2 must be strings"
+            return result, None
+        if not isinstance(metric, str) or metric not in metric_registry:
+            result["error"] = f"Invalid metric: {metric}. Valid options: {', '.join(metric_registry.names())}"
+            return result, None
+        if isinstance(threshold, bool) or not isinstance(threshold, (int, float)) or not 0.0 <= threshold <= 1.0:
+            result["error"] = "threshold must be a number between 0 and 1"
+            return result, None
+
+        return result, (metric, float(threshold), prompt1, prompt2)
+
+    def score_chunk(self, lines: List[NDJSONLine], config: Optional[ConfigSnapshot] = None) -> bytes:
+        """Score a chunk of lines and encode the results as NDJSON"""
+        return "".join(json.dumps(result) + "\n" for result in self.score_lines(lines, config)).encode("utf-8")
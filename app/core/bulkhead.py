@@ -0,0 +1,177 @@
+import asyncio
+import contextvars
+import functools
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Priorités d'admission : la plus petite passe en premier
+PRIORITY_INTERACTIVE = 0   # similarity-check, WebSocket
+PRIORITY_BATCH = 1         # batch, matrice
+PRIORITY_BULK = 2          # flux NDJSON similarity-bulk
+
+class BulkheadRejected(Exception):
+    """Work refused by a bulkhead: queue full or queue timeout"""
+
+    def __init__(self, pool: str, reason: str, retry_after: float = 1.0):
+        super().__init__(f"{pool} pool saturated: {reason}")
+        self.pool = pool
+        self.reason = reason
+        self.retry_after = retry_after
+
+class Bulkhead:
+    """Admission queue and dedicated worker threads for one class of work.
+
+    At most ``max_concurrency`` calls run at once, on the bulkhead's own
+    executor; the next ``max_queue`` wait in priority order (FIFO within a
+    priority) for at most ``queue_timeout`` seconds. Beyond that, work is
+    rejected at once instead of piling up, so a slow dependency behind one
+    bulkhead cannot take the threads or the latency budget of another.
+    """
+
+    def __init__(self, name: str, max_concurrency: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix=f"bulkhead-{name}")
+
+        self.active = 0
+        self._waiters: List[list] = []  # [priority, seq, future, granted]
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self.stats = {"admitted": 0, "rejected_full": 0, "rejected_timeout": 0, "completed": 0,
+                      "failed": 0, "queue_wait_ms_total": 0.0, "queue_wait_ms_max": 0.0}
+
+    async def run(self, fn: Callable, *args, priority: int = PRIORITY_INTERACTIVE,
+                  timeout: Optional[float] = None):
+        """Run ``fn(*args)`` on the bulkhead's threads once admitted.
+
+        ``timeout`` caps the queue wait below ``queue_timeout`` (e.g. the
+        request deadline). Raises BulkheadRejected if not admitted in time.
+        Context variables (request ID, stage timings) follow the call.
+        """
+        queue_timeout = self.queue_timeout if timeout is None else min(timeout, self.queue_timeout)
+        waited = await self._acquire(priority, queue_timeout)
+        self._record_admission(waited)
+        try:
+            loop = asyncio.get_running_loop()
+            call = functools.partial(contextvars.copy_context().run, fn, *args)
+            result = await loop.run_in_executor(self.executor, call)
+        except BaseException:
+            self._count("failed")
+            raise
+        finally:
+            self._release()
+        self._count("completed")
+        return result
+
+    async def _acquire(self, priority: int, timeout: float) -> float:
+        """Take a slot, waiting in the queue if needed; returns the wait in seconds"""
+        with self._lock:
+            if self.active < self.max_concurrency and not self._waiters:
+                self.active += 1
+                return 0.0
+            if len(self._waiters) >= self.max_queue:
+                self.stats["rejected_full"] += 1
+                raise BulkheadRejected(self.name, "queue full")
+            waiter = asyncio.get_running_loop().create_future()
+            entry = [priority, next(self._seq), waiter, False]
+            heapq.heappush(self._waiters, entry)
+
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                granted = entry[3]
+                if not granted:
+                    self._waiters.remove(entry)
+                    heapq.heapify(self._waiters)
+                    self.stats["rejected_timeout"] += 1
+            if granted:
+                # Créneau attribué juste à l'échéance : on le prend quand même
+                return time.perf_counter() - start
+            raise BulkheadRejected(self.name, f"no slot within {timeout * 1000:.0f} ms")
+        except asyncio.CancelledError:
+            with self._lock:
+                granted = entry[3]
+                if not granted:
+                    self._waiters.remove(entry)
+                    heapq.heapify(self._waiters)
+            if granted:
+                # Annulé après avoir reçu un créneau : on le rend
+                self._release()
+            raise
+        return time.perf_counter() - start
+
+    def _release(self) -> None:
+        """Hand the slot to the next waiter (the slot stays taken) or free it"""
+        with self._lock:
+            if self._waiters:
+                entry = heapq.heappop(self._waiters)
+                entry[3] = True
+                # Le waiter peut appartenir à une autre boucle d'événements
+                entry[2].get_loop().call_soon_threadsafe(_grant, entry[2])
+            else:
+                self.active -= 1
+
+    def _record_admission(self, waited: float) -> None:
+        waited_ms = waited * 1000
+        with self._lock:
+            self.stats["admitted"] += 1
+            self.stats["queue_wait_ms_total"] += waited_ms
+            self.stats["queue_wait_ms_max"] = max(self.stats["queue_wait_ms_max"], waited_ms)
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self.stats[key] += 1
+
+    def snapshot(self) -> dict:
+        """Saturation metrics: occupancy, queue length, rejections and queue waits"""
+        with self._lock:
+            stats = dict(self.stats)
+            active, queued = self.active, len(self._waiters)
+        admitted = stats.pop("admitted")
+        total_wait = stats.pop("queue_wait_ms_total")
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "queue_timeout_ms": round(self.queue_timeout * 1000),
+            "active": active,
+            "queued": queued,
+            "saturation": round(active / self.max_concurrency, 4),
+            "admitted": admitted,
+            **stats,
+            "queue_wait_ms_avg": round(total_wait / admitted, 3) if admitted else 0.0,
+            "queue_wait_ms_max": round(stats["queue_wait_ms_max"], 3)
+        }
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+def _grant(waiter: asyncio.Future) -> None:
+    if not waiter.done():
+        waiter.set_result(True)
+
+class BulkheadSet:
+    """The service's bulkheads by name ("cpu", "llm")"""
+
+    def __init__(self, bulkheads: Dict[str, Bulkhead]):
+        self.bulkheads = bulkheads
+
+    def __getitem__(self, name: str) -> Bulkhead:
+        return self.bulkheads[name]
+
+    def snapshot(self) -> Dict[str, dict]:
+        return {name: bulkhead.snapshot() for name, bulkhead in self.bulkheads.items()}
+
+    def shutdown(self) -> None:
+        for bulkhead in self.bulkheads.values():
+            bulkhead.shutdown()
@@ -0,0 +1,107 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+CAPTURE_FORMAT = "similarity-capture"
+CAPTURE_VERSION = 1
+
+def text_shape(text: str, key: bytes) -> dict:
+    """Hash, length and word count of a text: enough to replay it without keeping it"""
+    digest = hashlib.blake2b(text.encode("utf-8"), digest_size=8, key=key).hexdigest()
+    return {"h": digest, "n": len(text), "w": len(text.split())}
+
+class TrafficCapture:
+    """Opt-in recording of request shapes for replay (tests/load_test/replay.py).
+
+    Each scored request becomes one compact NDJSON line: arrival offset,
+    endpoint, metric, threshold, commentary mode, deadline and, for each text, a keyed
+    hash, its length and word count. Texts themselves are never written;
+    identical texts share a hash, so cache-hit patterns survive. Hashes are
+    keyed with ``hash_key`` (random per process when empty). Records are
+    queued and written by a background thread; when the queue is full or the
+    file reached ``max_bytes``, records are dropped.
+    """
+
+    def __init__(self, path: str, sample_rate: float = 1.0, max_bytes: int = 100 * 1024 * 1024,
+                 hash_key: str = "", queue_size: int = 10000):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.max_bytes = max_bytes
+        self.key = hashlib.blake2b((hash_key or os.urandom(16).hex()).encode("utf-8"), digest_size=32).digest()
+        self.queue: queue.Queue = queue.Queue(queue_size)
+        self.recorded = 0
+        self.dropped = 0
+        self.bytes_written = 0
+        self.started = time.monotonic()
+        self._stopped = False
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        opener = gzip.open if path.endswith(".gz") else open
+        self._file = opener(path, "at", encoding="utf-8")
+        self._file.write(json.dumps({
+            "format": CAPTURE_FORMAT, "version": CAPTURE_VERSION, "started_at": time.time(), "pid": os.getpid()
+        }) + "\n")
+        self._thread = threading.Thread(target=self._write_loop, name="traffic-capture", daemon=True)
+        self._thread.start()
+        logger.info("Capturing traffic shapes to %s (sample rate %.2f)", path, sample_rate)
+
+    def record(self, endpoint: str, text1: str, text2: str, metric: str, threshold: float,
+               commentary: Optional[str] = None, deadline_ms: Optional[float] = None) -> None:
+        """Queue one request shape (sampled); never blocks the request"""
+        if self._stopped or (self.sample_rate < 1.0 and random.random() >= self.sample_rate):
+            return
+        # Horodatage pris ici, le hachage et la sérialisation se font dans le thread d'écriture
+        item = (round(time.monotonic() - self.started, 4), endpoint, text1, text2, metric, threshold,
+                commentary, deadline_ms)
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+
+    def _write_loop(self) -> None:
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            offset, endpoint, text1, text2, metric, threshold, commentary, deadline_ms = item
+            line = {"t": offset, "e": endpoint, "m": metric, "th": threshold,
+                    "p1": text_shape(text1, self.key), "p2": text_shape(text2, self.key)}
+            if commentary is not None:
+                line["c"] = commentary
+            if deadline_ms is not None:
+                line["d"] = deadline_ms
+            data = json.dumps(line, separators=(",", ":")) + "\n"
+            try:
+                self._file.write(data)
+            except (OSError, ValueError) as e:
+                self._stopped = True
+                logger.error("Traffic capture write failed, capture stopped: %s", str(e))
+                break
+            self.recorded += 1
+            self.bytes_written += len(data)
+            if self.bytes_written >= self.max_bytes:
+                self._stopped = True
+                logger.warning("Traffic capture %s reached %d bytes, capture stopped", self.path, self.max_bytes)
+                break
+        self._file.flush()
+
+    def stats(self) -> dict:
+        return {"path": self.path, "recorded": self.recorded, "dropped": self.dropped,
+                "bytes": self.bytes_written, "queued": self.queue.qsize(), "stopped": self._stopped}
+
+    def close(self) -> None:
+        """Write what is queued and close the file"""
+        if self._thread.is_alive():
+            self.queue.put(None)
+            self._thread.join(timeout=5)
+        self._file.close()
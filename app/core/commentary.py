@@ -0,0 +1,152 @@
+import hashlib
+import logging
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from app.config import Config, ConfigSnapshot
+from app.core.deadline import Deadline
+from app.core.llm_proxy import LLMClient
+from app.core.memory import sizeof
+from app.core.prompt_budget import fit_pair
+from app.core.sanitization import Sanitizer
+
+logger = logging.getLogger(__name__)
+
+COMMENTARY_MODES = ("none", "deferred", "inline")
+
+def build_commentary_prompt(text1: str, text2: str, metric: str, similarity: float,
+                            threshold: float, above_threshold: bool,
+                            config: Optional[ConfigSnapshot] = None) -> str:
+    """Prompt asking the LLM to comment on a similarity result.
+
+    Texts are shortened to fit ``LLM_PROMPT_TOKEN_BUDGET`` tokens together.
+    """
+    config = config or Config.snapshot
+    text1, text2 = fit_pair(text1, text2, config.LLM_PROMPT_TOKEN_BUDGET)
+    threshold_status = "above threshold" if above_threshold else "below threshold"
+    return (
+        "In 2-3 sentences, explain what makes these texts similar or different "
+        "and why the score fits.\n"
+        f'Text 1: "{text1}"\n'
+        f'Text 2: "{text2}"\n'
+        f"Method: {metric} | Score: {similarity:.3f} | Threshold: {threshold} | {threshold_status}"
+    )
+
+class CommentaryService:
+    """Generates LLM commentary in the background and caches it.
+
+    Commentary is cached by (texts, metric, score bucket, threshold side): two
+    results whose scores fall in the same ``COMMENTARY_SCORE_BUCKET`` share one
+    LLM call. Identical requests made while generation is in flight share the
+    pending call too. Result IDs map to a cache key, so several IDs may point
+    at the same commentary.
+    """
+
+    def __init__(self, llm_client: LLMClient, cache_size: Optional[int] = None,
+                 max_results: Optional[int] = None, max_workers: Optional[int] = None):
+        self.llm_client = llm_client
+        self.cache_size = cache_size or Config.COMMENTARY_CACHE_SIZE
+        self.max_results = max_results or Config.COMMENTARY_MAX_RESULTS
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers or Config.COMMENTARY_WORKERS,
+            thread_name_prefix="commentary"
+        )
+        self.cache: "OrderedDict[str, str]" = OrderedDict()
+        self.failures: "OrderedDict[str, str]" = OrderedDict()
+        self.pending = set()
+        self.results: "OrderedDict[str, str]" = OrderedDict()  # result_id -> cache key
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def cache_key(text1: str, text2: str, metric: str, similarity: float, above_threshold: bool,
+                  config: Optional[ConfigSnapshot] = None) -> str:
+        bucket = int(similarity / (config or Config.snapshot).COMMENTARY_SCORE_BUCKET)
+        digest = hashlib.sha256(f"{text1}\x00{text2}".encode("utf-8")).hexdigest()
+        return f"{digest}:{metric}:{bucket}:{int(above_threshold)}"
+
+    def generate(self, text1: str, text2: str, metric: str, similarity: float,
+                 threshold: float, above_threshold: bool, deadline: Optional[Deadline] = None,
+                 config: Optional[ConfigSnapshot] = None) -> Optional[str]:
+        """Inline commentary (uncached), error messages returned as text.
+        
+        Raises DeadlineExceeded when ``deadline`` cuts the LLM call short.
+        """
+        config = config or Config.snapshot
+        prompt = build_commentary_prompt(text1, text2, metric, similarity, threshold, above_threshold, config)
+        raw_response = self.llm_client.generate(prompt, deadline)
+        return Sanitizer.sanitize_output(raw_response, config) if raw_response else None
+
+    def submit(self, text1: str, text2: str, metric: str, similarity: float,
+               threshold: float, above_threshold: bool, config: Optional[ConfigSnapshot] = None) -> str:
+        """Schedule commentary generation (unless cached) and return a result ID"""
+        config = config or Config.snapshot
+        key = self.cache_key(text1, text2, metric, similarity, above_threshold, config)
+        result_id = uuid.uuid4().hex
+
+        with self._lock:
+            self.results[result_id] = key
+            while len(self.results) > self.max_results:
+                self.results.popitem(last=False)
+
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                return result_id
+            if key in self.pending:
+                return result_id
+            self.pending.add(key)
+            self.failures.pop(key, None)
+
+        prompt = build_commentary_prompt(text1, text2, metric, similarity, threshold, above_threshold, config)
+        self.executor.submit(self._run, key, prompt)
+        return result_id
+
+    def _run(self, key: str, prompt: str) -> None:
+        try:
+            commentary = Sanitizer.sanitize_output(self.llm_client.complete(prompt))
+        except Exception as e:
+            logger.error("Deferred commentary generation failed: %s", str(e))
+            with self._lock:
+                self.pending.discard(key)
+                self.failures[key] = str(e)
+                while len(self.failures) > self.cache_size:
+                    self.failures.popitem(last=False)
+            return
+
+        with self._lock:
+            self.pending.discard(key)
+            self.cache[key] = commentary
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+
+    def get(self, result_id: str) -> Optional[dict]:
+        """Status of a deferred commentary, or None for an unknown result ID"""
+        with self._lock:
+            key = self.results.get(result_id)
+            if key is None:
+                return None
+            if key in self.cache:
+                return {"result_id": result_id, "status": "ready", "commentary": self.cache[key]}
+            if key in self.pending:
+                return {"result_id": result_id, "status": "pending", "commentary": None}
+            if key in self.failures:
+                return {"result_id": result_id, "status": "failed", "commentary": None,
+                        "error": self.failures[key]}
+        # Commentaire évincé du cache entre-temps
+        return {"result_id": result_id, "status": "expired", "commentary": None}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"cached": len(self.cache), "pending": len(self.pending), "results": len(self.results)}
+
+    def memory_usage(self) -> dict:
+        with self._lock:
+            return {
+                "cached": len(self.cache),
+                "results": len(self.results),
+                "bytes": sizeof(self.cache) + sizeof(self.failures) + sizeof(self.results)
+            }
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
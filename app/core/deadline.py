@@ -0,0 +1,59 @@
+import time
+from typing import Callable, Optional
+
+# En-tête client : budget de latence restant, en millisecondes
+DEADLINE_HEADER = "X-Request-Deadline-Ms"
+
+class DeadlineExceeded(Exception):
+    """The remaining budget cannot cover (or did not cover) an operation"""
+
+class Deadline:
+    """Latency budget of one request, on the monotonic clock.
+
+    Created when the request arrives and passed down to the code that may
+    block (LLM calls), which checks ``allows()`` before starting and bounds
+    its wait with ``remaining()``.
+    """
+
+    def __init__(self, budget_ms: float, clock: Callable[[], float] = time.monotonic):
+        self.budget_ms = budget_ms
+        self._clock = clock
+        self.expires_at = clock() + budget_ms / 1000
+
+    @classmethod
+    def from_request(cls, header: Optional[str], field: Optional[float]) -> Optional["Deadline"]:
+        """Deadline from the header and/or body field (the tighter one), None if neither is set.
+
+        Raises ValueError for a header that is not a positive number.
+        """
+        budgets = [] if field is None else [float(field)]
+        if header is not None:
+            try:
+                budgets.append(float(header))
+            except ValueError:
+                raise ValueError(f"{DEADLINE_HEADER} must be a number of milliseconds")
+            if not budgets[-1] > 0:
+                raise ValueError(f"{DEADLINE_HEADER} must be positive")
+        return cls(min(budgets)) if budgets else None
+
+    def remaining(self) -> float:
+        """Seconds left (0.0 once expired)"""
+        return max(0.0, self.expires_at - self._clock())
+
+    def remaining_ms(self) -> float:
+        return self.remaining() * 1000
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() == 0.0
+
+    def allows(self, seconds: float) -> bool:
+        """Whether at least ``seconds`` are left"""
+        return self.remaining() >= seconds
+
+    def check(self, seconds: float = 0.0, what: str = "operation") -> float:
+        """Remaining seconds; raises DeadlineExceeded if fewer than ``seconds`` (or none) are left"""
+        remaining = self.remaining()
+        if remaining <= 0.0 or remaining < seconds:
+            raise DeadlineExceeded(f"{remaining * 1000:.0f} ms left, not enough for {what}")
+        return remaining
@@ -0,0 +1,109 @@
+from typing import Dict, Optional
+
+def levenshtein_distance(a: str, b: str, max_distance: Optional[int] = None) -> int:
+    """Levenshtein distance with the bit-parallel algorithm of Myers (Hyyrö's formulation).
+
+    The shorter string is encoded as bit vectors (Python ints, so any length
+    works) and each character of the longer string updates a whole column of
+    the DP matrix in a few word operations: O(ceil(m / w) * n) instead of O(m * n).
+
+    With ``max_distance``, the computation stops as soon as the distance is
+    known to exceed it and returns ``max_distance + 1``.
+    """
+    if a == b:
+        return 0
+    if len(a) > len(b):
+        a, b = b, a
+    m, n = len(a), len(b)
+
+    if max_distance is not None and n - m > max_distance:
+        return max_distance + 1
+    if m == 0:
+        return n
+
+    # Masque de bits des positions de chaque caractère dans le motif
+    peq: Dict[str, int] = {}
+    for i, char in enumerate(a):
+        peq[char] = peq.get(char, 0) | (1 << i)
+
+    full = (1 << m) - 1
+    last = 1 << (m - 1)
+    pv, mv = full, 0
+    score = m
+
+    for j, char in enumerate(b):
+        eq = peq.get(char, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | (~(xh | pv) & full)
+        mh = pv & xh
+
+        if ph & last:
+            score += 1
+        elif mh & last:
+            score -= 1
+
+        # Chaque colonne restante peut réduire la distance d'au plus 1
+        if max_distance is not None and score - (n - j - 1) > max_distance:
+            return max_distance + 1
+
+        ph = ((ph << 1) | 1) & full
+        mh = (mh << 1) & full
+        pv = mh | (~(xv | ph) & full)
+        mv = ph & xv
+
+    return score
+
+def levenshtein_similarity(a: str, b: str, min_similarity: Optional[float] = None) -> float:
+    """1 - distance / max(len) in [0, 1].
+
+    With ``min_similarity``, pairs that cannot reach it stop early and get an
+    upper bound of their score (still below ``min_similarity``).
+    """
+    longest = max(len(a), len(b))
+    if longest == 0:
+        return 0.0
+
+    max_distance = None
+    if min_similarity is not None:
+        max_distance = int((1.0 - min_similarity) * longest + 1e-9)
+    distance = levenshtein_distance(a, b, max_distance)
+    return 1.0 - distance / longest
+
+def jaro_similarity(a: str, b: str) -> float:
+    """Jaro similarity: matching characters within a window, penalised by transpositions"""
+    if not a or not b:
+        return 0.0
+    if a == b:
+        return 1.0
+
+    window = max(0, max(len(a), len(b)) // 2 - 1)
+    b_matched = [False] * len(b)
+    a_matches = []
+
+    for i, char in enumerate(a):
+        lo, hi = max(0, i - window), min(len(b), i + window + 1)
+        for j in range(lo, hi):
+            if not b_matched[j] and b[j] == char:
+                b_matched[j] = True
+                a_matches.append(char)
+                break
+
+    matches = len(a_matches)
+    if matches == 0:
+        return 0.0
+
+    b_matches = [char for char, matched in zip(b, b_matched) if matched]
+    transpositions = sum(x != y for x, y in zip(a_matches, b_matches)) / 2
+
+    return (matches / len(a) + matches / len(b) + (matches - transpositions) / matches) / 3
+
+def jaro_winkler_similarity(a: str, b: str, prefix_scale: float = 0.1, max_prefix: int = 4) -> float:
+    """Jaro similarity boosted by the length of the common prefix (up to ``max_prefix``)"""
+    jaro = jaro_similarity(a, b)
+    prefix = 0
+    for x, y in zip(a[:max_prefix], b[:max_prefix]):
+        if x != y:
+            break
+        prefix += 1
+    return jaro + prefix * prefix_scale * (1.0 - jaro)
@@ -0,0 +1,455 @@
+import hashlib
+import logging
+import math
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from app.config import Config
+
+try:
+    from sentence_transformers import SentenceTransformer
+except ImportError:  # Modèle local optionnel : l'encodeur par hachage reste disponible
+    SentenceTransformer = None
+
+logger = logging.getLogger(__name__)
+
+HASHING_MODEL = "hashing"
+
+def text_key(text: str) -> bytes:
+    """Cache key of a text"""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """L2-normalize rows in place (zero rows stay zero)"""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+class Encoder(ABC):
+    """Turns texts into L2-normalized float32 vectors, one row per text"""
+
+    name = "encoder"
+    dimension = 0
+
+    @abstractmethod
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        """Vectors of ``texts``, shape (len(texts), dimension)"""
+
+class HashingEncoder(Encoder):
+    """Deterministic local encoder: signed feature hashing of words and character trigrams.
+
+    Needs no model and gives the same vectors in every process (tests,
+    fallback). It captures shared words and word forms, not meaning.
+    """
+
+    TOKEN_PATTERN = re.compile(r"\w+")
+
+    def __init__(self, dimension: int = 256):
+        self.dimension = dimension
+        self.name = f"{HASHING_MODEL}-{dimension}"
+
+    def _features(self, text: str) -> List[str]:
+        features = []
+        for word in self.TOKEN_PATTERN.findall(text.lower()):
+            features.append(word)
+            padded = f" {word} "
+            features.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+        return features
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        matrix = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            features = self._features(text)
+            if not features:
+                continue
+            hashes = np.array([int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(),
+                                              "little") for feature in features], dtype=np.uint64)
+            signs = np.where(hashes >> np.uint64(63), -1.0, 1.0).astype(np.float32)
+            np.add.at(matrix[row], (hashes % np.uint64(self.dimension)).astype(np.intp), signs)
+        return normalize_rows(matrix)
+
+class SentenceTransformerEncoder(Encoder):
+    """Local sentence-embedding model (sentence-transformers, optional dependency)"""
+
+    def __init__(self, model_name: str):
+        if SentenceTransformer is None:
+            raise RuntimeError("sentence-transformers is not installed")
+        self.model = SentenceTransformer(model_name)
+        self.dimension = self.model.get_sentence_embedding_dimension()
+        self.name = model_name
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        vectors = self.model.encode(list(texts), batch_size=max(1, len(texts)), normalize_embeddings=True,
+                                    convert_to_numpy=True, show_progress_bar=False)
+        return np.ascontiguousarray(vectors, dtype=np.float32)
+
+def create_encoder(model_name: str) -> Encoder:
+    """Encoder for EMBEDDING_MODEL: "hashing" (or "hashing-<dimension>") or a sentence-transformers model.
+
+    Without sentence-transformers installed, falls back to the hashing
+    encoder with a warning.
+    """
+    if model_name == HASHING_MODEL or model_name.startswith(f"{HASHING_MODEL}-"):
+        dimension = model_name[len(HASHING_MODEL) + 1:]
+        return HashingEncoder(int(dimension)) if dimension else HashingEncoder()
+    if SentenceTransformer is None:
+        logger.warning("sentence-transformers is not installed, %s replaced by the hashing encoder", model_name)
+        return HashingEncoder()
+    logger.info("Loading embedding model %s", model_name)
+    return SentenceTransformerEncoder(model_name)
+
+class VectorCache:
+    """Bounded LRU of vectors by text hash (read-only float32 arrays)"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.vectors: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get_many(self, keys: Sequence[bytes]) -> List[Optional[np.ndarray]]:
+        found = []
+        with self._lock:
+            for key in keys:
+                vector = self.vectors.get(key)
+                if vector is not None:
+                    self.vectors.move_to_end(key)
+                found.append(vector)
+            hits = sum(vector is not None for vector in found)
+            self.hits += hits
+            self.misses += len(found) - hits
+        return found
+
+    def put_many(self, keys: Sequence[bytes], vectors: np.ndarray) -> None:
+        with self._lock:
+            for key, vector in zip(keys, vectors):
+                vector = vector.copy()
+                vector.flags.writeable = False
+                self.vectors[key] = vector
+                self.vectors.move_to_end(key)
+            while len(self.vectors) > self.max_entries:
+                self.vectors.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = len(self.vectors)
+            vector_bytes = sum(vector.nbytes for vector in self.vectors.values())
+            lookups = self.hits + self.misses
+            return {"entries": entries, "max_entries": self.max_entries, "hits": self.hits, "misses": self.misses,
+                    "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0, "bytes": vector_bytes}
+
+class BatchingEncoder:
+    """Coalesces encode calls from concurrent requests into model batches.
+
+    Callers (worker threads, never the event loop) queue their texts and
+    wait. One thread takes what is queued, waits up to ``max_wait`` seconds
+    for more while the batch holds fewer than ``max_batch`` texts, and
+    encodes everything in one model call. Calls that already fill a batch
+    are encoded directly.
+    """
+
+    def __init__(self, encoder: Encoder, max_batch: int, max_wait: float):
+        self.encoder = encoder
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._pending: List[Tuple[Sequence[str], Future]] = []
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+        self.stats = {"calls": 0, "batches": 0, "texts": 0}
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.encoder.dimension), dtype=np.float32)
+        if len(texts) >= self.max_batch:
+            with self._condition:
+                self.stats["calls"] += 1
+                self.stats["batches"] += 1
+                self.stats["texts"] += len(texts)
+            return self.encoder.encode(texts)
+
+        future: Future = Future()
+        with self._condition:
+            if self._stopped:
+                raise RuntimeError("Embedding encoder is shut down")
+            self.stats["calls"] += 1
+            self._pending.append((texts, future))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                self._thread.start()
+            self._condition.notify()
+        return future.result()
+
+    def _next_batch(self) -> List[Tuple[Sequence[str], Future]]:
+        with self._condition:
+            while not self._pending and not self._stopped:
+                self._condition.wait()
+            if self._stopped:
+                return []
+            # Attente courte pour regrouper les appels concurrents
+            deadline = time.monotonic() + self.max_wait
+            while sum(len(texts) for texts, _ in self._pending) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._condition.wait(remaining):
+                    break
+            batch, size = [], 0
+            while self._pending and (not batch or size + len(self._pending[0][0]) <= self.max_batch):
+                texts, future = self._pending.pop(0)
+                batch.append((texts, future))
+                size += len(texts)
+            self.stats["batches"] += 1
+            self.stats["texts"] += size
+            return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                return
+            try:
+                vectors = self.encoder.encode([text for texts, _ in batch for text in texts])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            start = 0
+            for texts, future in batch:
+                future.set_result(vectors[start:start + len(texts)])
+                start += len(texts)
+
+    def snapshot(self) -> dict:
+        with self._condition:
+            stats = dict(self.stats)
+        stats["avg_batch_texts"] = round(stats["texts"] / stats["batches"], 2) if stats["batches"] else 0.0
+        return stats
+
+    def shutdown(self) -> None:
+        with self._condition:
+            self._stopped = True
+            pending, self._pending = self._pending, []
+            self._condition.notify_all()
+        for _, future in pending:
+            future.set_exception(RuntimeError("Embedding encoder is shut down"))
+
+class VectorIndex:
+    """Approximate nearest-neighbour index over normalized vectors (inverted file, NumPy only).
+
+    Small indexes are searched exactly. From ``exact_max`` vectors on,
+    spherical k-means splits them into about sqrt(n) clusters; a query is
+    compared with the centroids and only the vectors of the ``nprobe`` closest
+    clusters are scored. Clusters are retrained when the index doubles.
+    """
+
+    def __init__(self, dimension: int, max_size: int, exact_max: int = 2048, nprobe: int = 8,
+                 iterations: int = 10, seed: int = 0):
+        self.dimension = dimension
+        self.max_size = max_size
+        self.exact_max = exact_max
+        self.nprobe = nprobe
+        self.iterations = iterations
+        self.seed = seed
+        self.ids: List[str] = []
+        self.positions: Dict[str, int] = {}
+        self.vectors = np.zeros((0, dimension), dtype=np.float32)
+        self.size = 0
+        self.centroids: Optional[np.ndarray] = None
+        self.assignments = np.zeros(0, dtype=np.int32)
+        self.trained_size = 0
+        self._lock = threading.RLock()
+
+    def add(self, ids: Sequence[str], vectors: np.ndarray) -> int:
+        """Add or replace vectors by ID; returns the number of new IDs. Raises ValueError when full."""
+        with self._lock:
+            new_ids = [doc_id for doc_id in dict.fromkeys(ids) if doc_id not in self.positions]
+            if self.size + len(new_ids) > self.max_size:
+                raise ValueError(f"Index is limited to {self.max_size} documents")
+            self._reserve(self.size + len(new_ids))
+            rows = []
+            for doc_id in ids:
+                position = self.positions.get(doc_id)
+                if position is None:
+                    position = self.positions[doc_id] = self.size
+                    self.ids.append(doc_id)
+                    self.size += 1
+                rows.append(position)
+            rows = np.array(rows, dtype=np.intp)
+            self.vectors[rows] = vectors
+            if self.size >= self.exact_max and (self.centroids is None or self.size >= 2 * self.trained_size):
+                self._train()
+            elif self.centroids is not None:
+                self.assignments[rows] = np.argmax(vectors @ self.centroids.T, axis=1)
+            return len(new_ids)
+
+    def _reserve(self, size: int) -> None:
+        capacity = len(self.vectors)
+        if size <= capacity:
+            return
+        capacity = max(size, 2 * capacity, 64)
+        vectors = np.zeros((capacity, self.dimension), dtype=np.float32)
+        vectors[:self.size] = self.vectors[:self.size]
+        assignments = np.zeros(capacity, dtype=np.int32)
+        assignments[:self.size] = self.assignments[:self.size]
+        self.vectors, self.assignments = vectors, assignments
+
+    def _train(self) -> None:
+        """Spherical k-means on (a sample of) the indexed vectors"""
+        vectors = self.vectors[:self.size]
+        n_clusters = max(1, int(math.sqrt(self.size)))
+        rng = np.random.default_rng(self.seed)
+        sample = vectors[rng.choice(self.size, min(self.size, 256 * n_clusters), replace=False)]
+        centroids = sample[rng.choice(len(sample), n_clusters, replace=False)].copy()
+        for _ in range(self.iterations):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            empty = ~sums.any(axis=1)
+            # Cluster vide : on garde l'ancien centroïde
+            sums[empty] = centroids[empty]
+            centroids = normalize_rows(sums)
+        self.centroids = centroids
+        self.assignments[:self.size] = np.argmax(vectors @ centroids.T, axis=1)
+        self.trained_size = self.size
+        logger.info("Vector index trained: %d vectors, %d clusters", self.size, n_clusters)
+
+    def search(self, query: np.ndarray, k: int, nprobe: Optional[int] = None) -> List[Tuple[str, float]]:
+        """Best ``k`` (id, cosine) for a normalized query vector, highest first"""
+        with self._lock:
+            if self.size == 0:
+                return []
+            vectors = self.vectors[:self.size]
+            if self.centroids is None:
+                candidates = np.arange(self.size)
+            else:
+                probe = min(nprobe or self.nprobe, len(self.centroids))
+                closest = np.argpartition(-(self.centroids @ query), probe - 1)[:probe]
+                candidates = np.flatnonzero(np.isin(self.assignments[:self.size], closest))
+            scores = vectors[candidates] @ query
+            if len(scores) > k:
+                best = np.argpartition(-scores, k - 1)[:k]
+                candidates, scores = candidates[best], scores[best]
+            order = np.argsort(-scores, kind="stable")
+            return [(self.ids[candidates[i]], float(scores[i])) for i in order]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"documents": self.size, "clusters": 0 if self.centroids is None else len(self.centroids),
+                    "bytes": int(self.vectors.nbytes + self.assignments.nbytes)}
+
+class EmbeddingService:
+    """Vectors for texts (model behind a batching encoder and an LRU cache) and named corpus indexes.
+
+    The encoder is created on first use, so loading a model does not slow
+    down startup or services that never use embeddings.
+    """
+
+    def __init__(self, model_name: Optional[str] = None, cache_size: Optional[int] = None,
+                 batch_size: Optional[int] = None, batch_wait_ms: Optional[float] = None,
+                 index_max_docs: Optional[int] = None, max_corpora: Optional[int] = None):
+        config = Config.snapshot
+        self.model_name = model_name or config.EMBEDDING_MODEL
+        self.cache = VectorCache(cache_size or config.EMBEDDING_CACHE_SIZE)
+        self.batch_size = batch_size or config.EMBEDDING_BATCH_SIZE
+        self.batch_wait = (config.EMBEDDING_BATCH_WAIT_MS if batch_wait_ms is None else batch_wait_ms) / 1000
+        self.index_max_docs = index_max_docs or config.EMBEDDING_INDEX_MAX_DOCS
+        self.max_corpora = max_corpora or config.EMBEDDING_MAX_CORPORA
+        self.corpora: Dict[str, VectorIndex] = {}
+        self._batcher: Optional[BatchingEncoder] = None
+        self._lock = threading.Lock()
+
+    @property
+    def batcher(self) -> BatchingEncoder:
+        with self._lock:
+            if self._batcher is None:
+                self._batcher = BatchingEncoder(create_encoder(self.model_name), self.batch_size, self.batch_wait)
+            return self._batcher
+
+    def vectors(self, texts: Sequence[str]) -> np.ndarray:
+        """Normalized float32 vectors of ``texts`` (cached ones are not encoded again)"""
+        keys = [text_key(text) for text in texts]
+        cached = self.cache.get_many(keys)
+        missing = {}
+        for key, text, vector in zip(keys, texts, cached):
+            if vector is None:
+                missing.setdefault(key, text)
+        batcher = self.batcher
+        matrix = np.empty((len(texts), batcher.encoder.dimension), dtype=np.float32)
+        if missing:
+            encoded = batcher.encode(list(missing.values()))
+            self.cache.put_many(list(missing), encoded)
+            fresh = dict(zip(missing, encoded))
+            cached = [vector if vector is not None else fresh[key] for key, vector in zip(keys, cached)]
+        for row, vector in enumerate(cached):
+            matrix[row] = vector
+        return matrix
+
+    def similarity(self, text1: str, text2: str) -> float:
+        """Cosine of the two embeddings, clipped to [0, 1] like the other metrics"""
+        return self.similarity_batch([(text1, text2)])[0]
+
+    def similarity_batch(self, pairs: Sequence[Tuple[str, str]]) -> List[float]:
+        vectors = self.vectors([text for pair in pairs for text in pair])
+        scores = []
+        for i, (text1, text2) in enumerate(pairs):
+            score = float(np.dot(vectors[2 * i], vectors[2 * i + 1]))
+            # Textes identiques : 1.0 exactement (le produit float32 peut donner 0.99999994)
+            scores.append(1.0 if text1 == text2 and score > 0 else min(1.0, max(0.0, score)))
+        return scores
+
+    def index(self, corpus: str, ids: Sequence[str], texts: Sequence[str]) -> Tuple[int, int]:
+        """Add documents to ``corpus`` (created on first use); returns (new documents, corpus size).
+
+        Raises ValueError when the corpus or the number of corpora is full.
+        """
+        # Vérifié avant l'encodage, puis de nouveau à la création (requêtes concurrentes)
+        self._check_room(corpus, ids)
+        vectors = self.vectors(texts)
+        with self._lock:
+            index = self.corpora.get(corpus)
+            if index is None:
+                self._check_room(corpus, ids)
+                index = self.corpora[corpus] = VectorIndex(vectors.shape[1], self.index_max_docs)
+        added = index.add(ids, vectors)
+        return added, index.size
+
+    def _check_room(self, corpus: str, ids: Sequence[str]) -> None:
+        index = self.corpora.get(corpus)
+        if index is None and len(self.corpora) >= self.max_corpora:
+            raise ValueError(f"Limited to {self.max_corpora} corpora")
+        size = index.size if index is not None else 0
+        new_ids = {doc_id for doc_id in ids if index is None or doc_id not in index.positions}
+        if size + len(new_ids) > self.index_max_docs:
+            raise ValueError(f"Index is limited to {self.index_max_docs} documents")
+
+    def search(self, corpus: str, query: str, k: int) -> List[Tuple[str, float]]:
+        """Nearest documents of ``corpus`` to ``query``; raises KeyError for unknown corpora"""
+        index = self.corpora[corpus]
+        return index.search(self.vectors([query])[0], k)
+
+    def drop(self, corpus: str) -> bool:
+        with self._lock:
+            return self.corpora.pop(corpus, None) is not None
+
+    def stats(self) -> dict:
+        return {
+            "model": self.model_name,
+            "encoder": self._batcher.encoder.name if self._batcher is not None else None,
+            "cache": self.cache.stats(),
+            "batching": self._batcher.snapshot() if self._batcher is not None else None,
+            "corpora": {name: index.stats() for name, index in list(self.corpora.items())}
+        }
+
+    def memory_usage(self) -> dict:
+        cache_bytes = self.cache.stats()["bytes"]
+        index_bytes = sum(index.stats()["bytes"] for index in list(self.corpora.values()))
+        return {"cached_vectors": len(self.cache.vectors), "indexed_documents":
+                sum(index.size for index in list(self.corpora.values())), "bytes": cache_bytes + index_bytes}
+
+    def shutdown(self) -> None:
+        if self._batcher is not None:
+            self._batcher.shutdown()
@@ -0,0 +1,269 @@
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from itertools import islice
+from typing import Dict, List, Optional
+from app.config import Config
+from app.core.bulk import BulkScorer
+from app.core.memory import sizeof
+from app.core.metrics import CPU_BOUND, IO_BOUND, metric_registry
+from app.core.similarity import SimilarityCalculator
+
+logger = logging.getLogger(__name__)
+
+# Statuts terminaux : le job ne sera plus modifié
+FINAL_STATUSES = ("completed", "failed", "cancelled", "interrupted")
+
+@dataclass
+class Job:
+    id: str
+    metric: str
+    threshold: float
+    total: int
+    status: str = "queued"
+    processed: int = 0
+    errors: int = 0
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+    cancel_requested: bool = False
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data.pop("cancel_requested")
+        data["progress"] = round(self.processed / self.total, 4) if self.total else 1.0
+        return data
+
+class JobManager:
+    """Runs large similarity workloads in the background and keeps results on disk.
+
+    Each job is processed by a worker of a bounded thread pool, chunk by chunk.
+    Jobs wait in one queue per metric kind (registry ``kind``) and are handed
+    to the pool only while their kind has a free slot, so queued LLM jobs never
+    hold a worker and cheap jobs keep running when the LLM slots are full.
+    Job metadata and results are written under ``storage_dir/<job_id>/`` and
+    reloaded on start-up. Finished jobs are deleted ``result_ttl`` seconds
+    after they end, and beyond the ``max_finished`` most recent ones (checked
+    on submit and on poll).
+    """
+
+    def __init__(
+        self,
+        calculator: SimilarityCalculator,
+        storage_dir: Optional[str] = None,
+        max_workers: Optional[int] = None,
+        chunk_size: Optional[int] = None,
+        result_ttl: Optional[float] = None,
+        max_finished: Optional[int] = None
+    ):
+        self.scorer = BulkScorer(calculator)
+        self.storage_dir = storage_dir or Config.JOBS_DIR
+        self.chunk_size = chunk_size or Config.JOBS_CHUNK_SIZE
+        self.result_ttl = result_ttl or Config.JOBS_RESULT_TTL_S
+        self.max_finished = max_finished or Config.JOBS_MAX_FINISHED
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers or Config.JOBS_MAX_WORKERS,
+            thread_name_prefix="similarity-job"
+        )
+        # Admission par type de metric (I/O = appels LLM) : un job n'obtient un worker
+        # que si son type a une place libre, sinon il attend dans la file de son type
+        self.kind_slots = {IO_BOUND: Config.JOBS_LLM_CONCURRENCY, CPU_BOUND: Config.JOBS_CPU_CONCURRENCY}
+        self.running = {kind: 0 for kind in self.kind_slots}
+        self.pending = {kind: deque() for kind in self.kind_slots}
+        self.jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._stopping = False
+
+        os.makedirs(self.storage_dir, exist_ok=True)
+        self._load()
+        self._evict()
+
+    def _job_dir(self, job_id: str) -> str:
+        return os.path.join(self.storage_dir, job_id)
+
+    def _results_path(self, job_id: str) -> str:
+        return os.path.join(self._job_dir(job_id), "results.jsonl")
+
+    def _persist(self, job: Job) -> None:
+        """Write job metadata atomically (tmp file + rename)"""
+        path = os.path.join(self._job_dir(job.id), "job.json")
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(asdict(job), f)
+        os.replace(tmp_path, path)
+
+    def _load(self) -> None:
+        """Reload jobs from disk; jobs that were still running are marked interrupted"""
+        for job_id in os.listdir(self.storage_dir):
+            path = os.path.join(self._job_dir(job_id), "job.json")
+            if not os.path.isfile(path):
+                continue
+            try:
+                with open(path) as f:
+                    job = Job(**json.load(f))
+            except (OSError, ValueError, TypeError) as e:
+                logger.error("Could not load job %s: %s", job_id, str(e))
+                continue
+
+            if job.status not in FINAL_STATUSES:
+                job.status = "interrupted"
+                job.finished_at = time.time()
+                job.error = "Service restarted before the job finished"
+                self._persist(job)
+            self.jobs[job.id] = job
+
+        if self.jobs:
+            logger.info("Loaded %d jobs from %s", len(self.jobs), self.storage_dir)
+
+    def submit(self, pairs: List[dict], metric: str, threshold: float) -> Job:
+        """Register a job and queue it for the worker pool"""
+        kind = metric_registry.get(metric).kind
+
+        self._evict()
+        job = Job(id=uuid.uuid4().hex, metric=metric, threshold=threshold, total=len(pairs))
+        os.makedirs(self._job_dir(job.id))
+        open(self._results_path(job.id), "w").close()
+        self._persist(job)
+
+        with self._lock:
+            self.jobs[job.id] = job
+            self.pending[kind].append((job, pairs))
+        self._dispatch()
+        logger.info("Job %s queued: %d pairs (%s)", job.id, job.total, metric)
+        return job
+
+    def _dispatch(self) -> None:
+        """Hand queued jobs to the pool while their kind has a free slot"""
+        with self._lock:
+            for kind, queue in self.pending.items():
+                while queue and self.running[kind] < self.kind_slots[kind] and not self._stopping:
+                    job, pairs = queue.popleft()
+                    if job.cancel_requested:
+                        continue
+                    self.running[kind] += 1
+                    self.executor.submit(self._run_admitted, kind, job, pairs)
+
+    def _run_admitted(self, kind: str, job: Job, pairs: List[dict]) -> None:
+        try:
+            self._run(job, pairs)
+        finally:
+            with self._lock:
+                self.running[kind] -= 1
+            self._dispatch()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        self._evict()
+        return self.jobs.get(job_id)
+
+    def _evict(self) -> None:
+        """Delete finished jobs older than ``result_ttl`` or beyond the ``max_finished`` most recent"""
+        expires = time.time() - self.result_ttl
+        with self._lock:
+            # finished_at est posé en dernier : un job en train de se terminer n'est pas retenu
+            finished = sorted(
+                (job for job in self.jobs.values() if job.status in FINAL_STATUSES and job.finished_at),
+                key=lambda job: job.finished_at, reverse=True
+            )
+            evicted = [job for rank, job in enumerate(finished)
+                       if rank >= self.max_finished or job.finished_at < expires]
+            for job in evicted:
+                del self.jobs[job.id]
+        for job in evicted:
+            shutil.rmtree(self._job_dir(job.id), ignore_errors=True)
+        if evicted:
+            logger.info("Evicted %d finished jobs", len(evicted))
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Request cancellation; the worker stops after its current chunk"""
+        job = self.jobs.get(job_id)
+        if job is None or job.status in FINAL_STATUSES:
+            return job
+
+        with self._lock:
+            job.cancel_requested = True
+            if job.status == "queued":
+                job.status = "cancelled"
+                job.finished_at = time.time()
+        self._persist(job)
+        return job
+
+    def results(self, job_id: str, offset: int, limit: int) -> List[dict]:
+        """Results [offset, offset + limit) among those already written"""
+        job = self.jobs.get(job_id)
+        if job is None:
+            return []
+
+        stop = min(offset + limit, job.processed)
+        if offset >= stop:
+            return []
+        with open(self._results_path(job_id)) as f:
+            return [json.loads(line) for line in islice(f, offset, stop)]
+
+    def _run(self, job: Job, pairs: List[dict]) -> None:
+        with self._lock:
+            if job.cancel_requested:
+                return
+            job.status = "running"
+            job.started_at = time.time()
+        self._persist(job)
+
+        try:
+            with open(self._results_path(job.id), "a") as out:
+                for start in range(0, job.total, self.chunk_size):
+                    if job.cancel_requested or self._stopping:
+                        break
+
+                    chunk = pairs[start:start + self.chunk_size]
+                    results = self._score_chunk(start, chunk, job)
+
+                    out.write("".join(json.dumps(result) + "\n" for result in results))
+                    out.flush()
+                    with self._lock:
+                        job.processed += len(results)
+                        job.errors += sum(1 for result in results if "error" in result)
+                    self._persist(job)
+
+            if job.cancel_requested:
+                job.status = "cancelled"
+            elif self._stopping and job.processed < job.total:
+                job.status = "interrupted"
+                job.error = "Service stopped before the job finished"
+            else:
+                job.status = "completed"
+        except Exception as e:
+            logger.exception("Job %s failed", job.id)
+            job.status = "failed"
+            job.error = str(e)
+
+        job.finished_at = time.time()
+        self._persist(job)
+        logger.info("Job %s %s: %d/%d pairs", job.id, job.status, job.processed, job.total)
+
+    def _score_chunk(self, start: int, chunk: List[dict], job: Job) -> List[dict]:
+        items = [
+            {"prompt1": pair.get("prompt1"), "prompt2": pair.get("prompt2"),
+             "metric": job.metric, "threshold": job.threshold}
+            for pair in chunk
+        ]
+        return [{"index": start + i, **result} for i, result in enumerate(self.scorer.score_items(items))]
+
+    def memory_usage(self) -> dict:
+        """Job metadata kept in memory (results stay on disk)"""
+        with self._lock:
+            return {"jobs": len(self.jobs), "bytes": sizeof(self.jobs)}
+
+    def shutdown(self) -> None:
+        """Stop the pool; running jobs are interrupted at their next chunk"""
+        self._stopping = True
+        with self._lock:
+            for queue in self.pending.values():
+                queue.clear()
+        self.executor.shutdown(wait=False, cancel_futures=True)
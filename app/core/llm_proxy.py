@@ -1,86 +1,146 @@
 import os
 from openai import OpenAI
-from app.config import Config
+from app.config import Config, ConfigSnapshot
 import logging
 import json
+import re
+import threading
+from typing import Optional
+from app.core.deadline import Deadline, DeadlineExceeded
+from app.core.prompt_budget import count_tokens, fit_pair
 
 # Configuration du logging
 logger = logging.getLogger(__name__)
 
 class LLMClient:
     def __init__(self):
+        self.api_key = None
+        self.base_url = None
+        self.client = None
         try:
-            # Nouvelle API OpenAI v1.x - pas d'arguments 'proxies' ou autres
-            if Config.LLM_API_KEY:
-                self.client = OpenAI(api_key=Config.LLM_API_KEY)
-            else:
-                self.client = None
-                
-            self.model = Config.LLM_MODEL
-            self.max_tokens = Config.LLM_MAX_TOKENS
+            self.reconfigure(Config.snapshot)
             logger.info("LLMClient initialized with model: %s", self.model)
         except Exception as e:
             logger.error("Error initializing LLMClient: %s", str(e))
             self.client = None
             self.model = "gpt-3.5-turbo"
             self.max_tokens = 150
+            self.prompt_budget = 512
+            self.min_budget = 0.5
+        
+        # Consommation de tokens cumulée (usage rapporté par l'API, sinon estimé)
+        self.usage = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0}
+        self._usage_lock = threading.Lock()
+        # Suit les rechargements de configuration (Config.reload)
+        Config.subscribe(self.reconfigure)
+    
+    def reconfigure(self, config: ConfigSnapshot) -> None:
+        """Apply LLM settings from a config snapshot; the OpenAI client is rebuilt only if the key or URL changed"""
+        if config.LLM_API_KEY != self.api_key or config.LLM_BASE_URL != self.base_url:
+            # Nouvelle API OpenAI v1.x - pas d'arguments 'proxies' ou autres
+            self.client = (
+                OpenAI(api_key=config.LLM_API_KEY, base_url=config.LLM_BASE_URL) if config.LLM_API_KEY else None
+            )
+            self.api_key = config.LLM_API_KEY
+            self.base_url = config.LLM_BASE_URL
+        self.model = config.LLM_MODEL
+        self.max_tokens = config.LLM_MAX_TOKENS
+        self.prompt_budget = config.LLM_PROMPT_TOKEN_BUDGET
+        self.min_budget = config.LLM_MIN_BUDGET_MS / 1000
     
-    def generate(self, prompt: str) -> str:
-        """Generate text from prompt using new OpenAI API"""
+    def generate(self, prompt: str, deadline: Optional[Deadline] = None) -> str:
+        """Generate text from prompt using new OpenAI API (DeadlineExceeded is raised, not returned)"""
         if not self.client:
             error_msg = "LLM service not configured. Please set LLM_API_KEY in .env file."
             logger.warning(error_msg)
             return error_msg
             
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=self.max_tokens,
-                temperature=0.7
-            )
-            return response.choices[0].message.content.strip()
+            return self.complete(prompt, deadline)
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             error_msg = f"Error generating response: {str(e)}"
             logger.error(error_msg)
             return error_msg
     
-    def similarity(self, text1: str, text2: str) -> float:
-        """Direct similarity assessment using LLM with structured output"""
-        prompt = f"""
-        Compare these two texts and provide a similarity score between 0 and 1.
+    def complete(self, prompt: str, deadline: Optional[Deadline] = None) -> str:
+        """Like generate, but raises instead of returning an error message.
         
-        Text 1: "{text1}"
-        Text 2: "{text2}"
+        With a ``deadline``, the call is not attempted when less than
+        ``LLM_MIN_BUDGET_MS`` remain, and is cut off (without retries) when the
+        deadline passes; both raise DeadlineExceeded.
+        """
+        # Une seule lecture par appel : un rechargement concurrent ne mélange pas deux configurations
+        client, model, max_tokens = self.client, self.model, self.max_tokens
+        if not client:
+            raise RuntimeError("LLM service not configured")
+        if deadline is not None:
+            timeout = deadline.check(self.min_budget, "an LLM call")
+            client = client.with_options(timeout=timeout, max_retries=0)
         
-        Respond with a JSON object in this exact format:
-        {{"similarity_score": 0.X, "reasoning": "brief explanation"}}
+        try:
+            response = client.chat.completions.create(
+                model=model,
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=max_tokens,
+                temperature=0.7
+            )
+        except Exception as e:
+            if deadline is not None and deadline.expired:
+                raise DeadlineExceeded(f"LLM call cut off at the request deadline: {str(e)}")
+            raise
+        content = response.choices[0].message.content.strip()
+        
+        usage = getattr(response, "usage", None)
+        prompt_tokens = getattr(usage, "prompt_tokens", None) or count_tokens(prompt)
+        completion_tokens = getattr(usage, "completion_tokens", None) or count_tokens(content)
+        self._record_usage(prompt_tokens, completion_tokens)
+        return content
+    
+    def _record_usage(self, prompt_tokens: int, completion_tokens: int) -> None:
+        logger.debug("LLM call: %d prompt tokens, %d completion tokens", prompt_tokens, completion_tokens)
+        with self._usage_lock:
+            self.usage["calls"] += 1
+            self.usage["prompt_tokens"] += prompt_tokens
+            self.usage["completion_tokens"] += completion_tokens
+    
+    def usage_summary(self) -> dict:
+        """Cumulated token usage with per-call averages"""
+        with self._usage_lock:
+            usage = dict(self.usage)
+        calls = usage["calls"]
+        usage["avg_prompt_tokens"] = round(usage["prompt_tokens"] / calls, 1) if calls else 0.0
+        usage["avg_completion_tokens"] = round(usage["completion_tokens"] / calls, 1) if calls else 0.0
+        return usage
+    
+    def similarity(self, text1: str, text2: str, deadline: Optional[Deadline] = None) -> float:
+        """Direct similarity assessment using LLM with structured output.
         
-        The similarity_score must be a decimal number between 0.0 and 1.0.
+        Raises when the call fails or the reply holds no score, so callers can
+        fall back instead of taking an error message for a score.
         """
+        text1, text2 = fit_pair(text1, text2, self.prompt_budget)
+        prompt = (
+            'Rate the similarity of these texts from 0 to 1. Reply only with JSON '
+            '{"similarity_score": <0-1>, "reasoning": "<short>"}.\n'
+            f'Text 1: "{text1}"\n'
+            f'Text 2: "{text2}"'
+        )
         
+        response = self.complete(prompt, deadline)
+        # Try to parse JSON response
         try:
-            response = self.generate(prompt)
-            # Try to parse JSON response
-            try:
-                result = json.loads(response)
-                if isinstance(result, dict):
-                    score = float(result.get("similarity_score", 0.0))
-                else:
-                    score = float(result) if result else 0.0
-                # Ensure score is within valid range
-                return max(0.0, min(1.0, score))
-            except (json.JSONDecodeError, KeyError, TypeError, ValueError):
-                # Fallback: try to extract number from response
-                import re
-                numbers = re.findall(r'0\.\d+|1\.0+|0\.0+', response)
-                if numbers:
-                    try:
-                        return float(numbers[0])
-                    except ValueError:
-                        return 0.0
-                return 0.0
-                
-        except Exception as e:
-            logger.error("Error in similarity assessment: %s", str(e))
-            return 0.0
+            result = json.loads(response)
+            if isinstance(result, dict):
+                score = float(result["similarity_score"])
+            else:
+                score = float(result)
+        except (json.JSONDecodeError, KeyError, TypeError, ValueError):
+            # Fallback: try to extract number from response
+            numbers = re.findall(r'0\.\d+|1\.0+|0\.0+', response)
+            if not numbers:
+                raise ValueError(f"No similarity score in LLM response: {response[:100]}")
+            score = float(numbers[0])
+        # Ensure score is within valid range
+        return max(0.0, min(1.0, score))
@@ -0,0 +1,189 @@
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import TfidfVectorizer, CountVectorizer
+from typing import Iterator, List, Optional, Tuple
+import logging
+from app.config import Config
+from app.core.metrics import metric_registry
+from app.core.similarity import TFIDF_PARAMS
+from app.core.edit_distance import jaro_winkler_similarity, levenshtein_similarity
+from app.core.tokenization import word_tokens
+
+logger = logging.getLogger(__name__)
+
+class SimilarityMatrix:
+    """Pairwise similarity over a list of texts, computed block by block.
+
+    Texts are vectorized once into a sparse matrix, then each block of rows is
+    multiplied against the whole corpus. Only one block of scores is alive at a
+    time, so peak memory is bounded by ``block_size * len(texts)`` cells.
+    Edit-distance metrics have no vector form: they are scored pair by pair
+    on the upper triangle only (both are symmetric) and mirrored, so callers
+    must keep their input small (``MATRIX_MAX_PAIRWISE_TEXTS``).
+    """
+
+    # Metrics flagged ``matrix`` in the registry without a sparse vector form
+    PAIRWISE_METRICS = ("levenshtein", "jaro_winkler")
+
+    def __init__(self, texts: List[str], metric: str = "cosine", block_size: Optional[int] = None):
+        if metric not in metric_registry.matrix_names():
+            raise ValueError(f"Unsupported matrix metric: {metric}")
+
+        self.texts = texts
+        self.metric = metric
+        self.size = len(texts)
+        self.block_size = max(1, block_size or Config.snapshot.MATRIX_BLOCK_SIZE)
+
+        if metric in self.PAIRWISE_METRICS:
+            # Même normalisation que SimilarityCalculator.levenshtein_sim / jaro_winkler_sim
+            self.normalized = [text.strip().lower() for text in texts]
+        elif metric == "cosine":
+            self.vectors = self._tfidf_vectors()
+            self.identical = self._identity_vectors()
+        else:
+            self.vectors = self._token_vectors()
+            self.token_counts = np.asarray(self.vectors.sum(axis=1)).ravel()
+
+    def _tfidf_vectors(self) -> sp.csr_matrix:
+        """TF-IDF vectors (L2-normalized) fitted on the whole corpus"""
+        try:
+            return TfidfVectorizer(**TFIDF_PARAMS).fit_transform(self.texts).tocsr()
+        except ValueError:
+            # Vocabulaire vide (uniquement des mots vides) - tous les scores sont nuls
+            return sp.csr_matrix((self.size, 0), dtype=np.float64)
+
+    def _identity_vectors(self) -> sp.csr_matrix:
+        """One-hot of distinct non-empty texts, so identical texts score 1.0 like cosine_sim"""
+        ids = {}
+        rows, cols = [], []
+        for i, text in enumerate(self.texts):
+            key = text.strip()
+            if key:
+                rows.append(i)
+                cols.append(ids.setdefault(key, len(ids)))
+        data = np.ones(len(rows), dtype=np.float64)
+        return sp.csr_matrix((data, (rows, cols)), shape=(self.size, max(len(ids), 1)))
+
+    def _token_vectors(self) -> sp.csr_matrix:
+        """Binary token incidence matrix, tokenized like jaccard_sim"""
+        vectorizer = CountVectorizer(
+            tokenizer=word_tokens,
+            token_pattern=None,
+            lowercase=False,
+            binary=True
+        )
+        try:
+            return vectorizer.fit_transform(self.texts).tocsr().astype(np.float64)
+        except ValueError:
+            return sp.csr_matrix((self.size, 0), dtype=np.float64)
+
+    def iter_blocks(self, min_score: Optional[float] = None,
+                    upper_only: bool = False) -> Iterator[Tuple[int, sp.csr_matrix]]:
+        """Yield (first_row, sparse score block) for consecutive row blocks.
+
+        ``min_score`` and ``upper_only`` (only columns j > i) let pairwise metrics
+        skip work; vector metrics always return complete blocks.
+        """
+        if self.metric in self.PAIRWISE_METRICS:
+            blocks = [
+                (start, self._pairwise_block(start, min(start + self.block_size, self.size), min_score))
+                for start in range(0, self.size, self.block_size)
+            ]
+            if upper_only:
+                yield from blocks
+                return
+            # Triangle supérieur + sa transposée ; la diagonale vaut 1 pour les textes non vides
+            upper = sp.vstack([block for _, block in blocks]).tocsr() if blocks \
+                else sp.csr_matrix((0, 0), dtype=np.float64)
+            diagonal = sp.diags([1.0 if text else 0.0 for text in self.normalized], format="csr")
+            full = (upper + upper.T + diagonal).tocsr()
+            full.eliminate_zeros()
+            for start, _ in blocks:
+                yield start, full[start:start + self.block_size]
+            return
+
+        vectors_t = self.vectors.T.tocsc()
+        for start in range(0, self.size, self.block_size):
+            stop = min(start + self.block_size, self.size)
+            block = (self.vectors[start:stop] @ vectors_t).tocsr()
+
+            if self.metric == "cosine":
+                same = (self.identical[start:stop] @ self.identical.T).tocsr()
+                block = block.maximum(same)
+                np.clip(block.data, 0.0, 1.0, out=block.data)
+            else:
+                block = self._jaccard_block(block, start)
+
+            block.eliminate_zeros()
+            yield start, block
+
+    def _pairwise_block(self, start: int, stop: int, min_score: Optional[float]) -> sp.csr_matrix:
+        """Score rows [start, stop) against the columns j > i, keeping non-zero scores >= min_score"""
+        rows, cols, data = [], [], []
+        for i in range(start, stop):
+            a = self.normalized[i]
+            if not a:
+                continue
+            for j in range(i + 1, self.size):
+                b = self.normalized[j]
+                if not b:
+                    continue
+                if self.metric == "levenshtein":
+                    score = levenshtein_similarity(a, b, min_score)
+                else:
+                    score = jaro_winkler_similarity(a, b)
+                if score > 0 and (min_score is None or score >= min_score):
+                    rows.append(i - start)
+                    cols.append(j)
+                    data.append(score)
+        return sp.csr_matrix((data, (rows, cols)), shape=(stop - start, self.size), dtype=np.float64)
+
+    def _jaccard_block(self, intersections: sp.csr_matrix, start: int) -> sp.csr_matrix:
+        """Turn intersection counts into |A ∩ B| / |A ∪ B| on the non-zero entries"""
+        block = intersections.tocoo()
+        unions = self.token_counts[start + block.row] + self.token_counts[block.col] - block.data
+        scores = np.divide(block.data, unions, out=np.zeros_like(block.data), where=unions > 0)
+        return sp.csr_matrix((scores, (block.row, block.col)), shape=block.shape)
+
+    def dense(self) -> np.ndarray:
+        """Full N×N matrix - only sensible for small inputs"""
+        matrix = np.zeros((self.size, self.size), dtype=np.float64)
+        for start, block in self.iter_blocks():
+            matrix[start:start + block.shape[0]] = block.toarray()
+        return matrix
+
+    def top_k(self, k: int) -> List[List[Tuple[int, float]]]:
+        """Best k neighbours (excluding self) for each row, highest score first"""
+        neighbors = []
+        for start, block in self.iter_blocks():
+            for r in range(block.shape[0]):
+                row = start + r
+                lo, hi = block.indptr[r], block.indptr[r + 1]
+                cols = block.indices[lo:hi]
+                scores = block.data[lo:hi]
+
+                keep = cols != row
+                cols, scores = cols[keep], scores[keep]
+                if len(scores) > k:
+                    best = np.argpartition(-scores, k - 1)[:k]
+                    cols, scores = cols[best], scores[best]
+
+                order = np.lexsort((cols, -scores))
+                neighbors.append([(int(cols[i]), float(scores[i])) for i in order])
+        return neighbors
+
+    def above_threshold(self, threshold: float) -> List[Tuple[int, int, float]]:
+        """All pairs i < j with score >= threshold (threshold must be > 0)"""
+        if threshold <= 0:
+            raise ValueError("threshold must be strictly positive")
+
+        pairs = []
+        for start, block in self.iter_blocks(min_score=threshold, upper_only=True):
+            block = block.tocoo()
+            rows = block.row + start
+            keep = (block.col > rows) & (block.data >= threshold)
+            pairs.extend(
+                (int(i), int(j), float(s))
+                for i, j, s in zip(rows[keep], block.col[keep], block.data[keep])
+            )
+        return pairs
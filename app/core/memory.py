@@ -0,0 +1,223 @@
+import gc
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Racine du dépôt : les fichiers situés dessous sont rapportés sous leur nom de module (app.core.xxx)
+_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+_APP_PREFIX = os.path.join(_ROOT, "app") + os.sep
+
+def rss_bytes() -> Optional[int]:
+    """Current resident set size (Linux /proc), or None if unavailable"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+def peak_rss_bytes() -> Optional[int]:
+    """Peak resident set size since the process started"""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss est en Ko sous Linux, en octets sous macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+def sizeof(obj, _seen: Optional[set] = None) -> int:
+    """Approximate deep size of ``obj`` in bytes.
+
+    Follows dicts, lists, tuples, sets and instance attributes (numpy arrays
+    report the buffer they own). Shared objects are counted once.
+    """
+    seen = _seen if _seen is not None else set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(sizeof(key, seen) + sizeof(value, seen) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(sizeof(item, seen) for item in obj)
+    elif hasattr(obj, "__dict__") and not isinstance(obj, type):
+        size += sizeof(vars(obj), seen)
+    return size
+
+def module_of(filename: str) -> str:
+    """Module name for a source file: app.core.similarity, sklearn, <frozen>, ..."""
+    if filename.startswith(_APP_PREFIX):
+        relative = os.path.relpath(filename, _ROOT)
+        module = os.path.splitext(relative)[0].replace(os.sep, ".")
+        return module[:-len(".__init__")] if module.endswith(".__init__") else module
+    for marker in ("site-packages" + os.sep, "dist-packages" + os.sep):
+        if marker in filename:
+            package = filename.split(marker, 1)[1].split(os.sep, 1)[0]
+            return os.path.splitext(package)[0]
+    if filename.startswith("<"):
+        return filename
+    return "<stdlib>" if filename.startswith(sys.prefix) or filename.startswith(sys.base_prefix) else "<other>"
+
+def _owner(traceback: tracemalloc.Traceback) -> str:
+    """Innermost app.* frame of an allocation, so sklearn allocations made for
+    app.core.similarity are charged to it; otherwise the innermost frame's module"""
+    frames = list(traceback)
+    for frame in reversed(frames):
+        if frame.filename.startswith(_APP_PREFIX):
+            return module_of(frame.filename)
+    return module_of(frames[-1].filename) if frames else "<unknown>"
+
+def group_by_module(snapshot: tracemalloc.Snapshot) -> Dict[str, dict]:
+    """{module: {"size": bytes, "count": blocks}} for the live allocations of a snapshot"""
+    modules: Dict[str, dict] = {}
+    for stat in snapshot.statistics("traceback"):
+        entry = modules.setdefault(_owner(stat.traceback), {"size": 0, "count": 0})
+        entry["size"] += stat.size
+        entry["count"] += stat.count
+    return modules
+
+def _top(rows: List[dict], key: str, top_n: int) -> List[dict]:
+    return sorted(rows, key=lambda row: abs(row[key]), reverse=True)[:top_n]
+
+class MemoryProfiler:
+    """Memory footprint of the service: RSS, registered components and,
+    while tracing is on, tracemalloc allocations grouped by module.
+
+    Nothing runs between calls: RSS and component sizes are measured on
+    demand, and tracemalloc (which slows every allocation) is only active
+    between ``start_tracing()`` and ``stop_tracing()``.
+    """
+
+    def __init__(self, max_snapshots: int = 5):
+        self.max_snapshots = max_snapshots
+        self.components: "OrderedDict[str, Callable[[], dict]]" = OrderedDict()
+        self.snapshots: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def register(self, name: str, usage: Callable[[], dict]) -> None:
+        """``usage()`` returns a dict of sizes for one component (ideally with a ``bytes`` key)"""
+        self.components[name] = usage
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start_tracing(self, frames: int = 25) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+            logger.info("tracemalloc started (%d frames)", frames)
+
+    def stop_tracing(self) -> None:
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+            logger.info("tracemalloc stopped")
+        # Les snapshots tracemalloc ne sont plus comparables à un traçage futur
+        with self._lock:
+            for snapshot in self.snapshots.values():
+                snapshot.pop("modules", None)
+
+    def component_usage(self) -> Dict[str, dict]:
+        usage = {}
+        for name, measure in self.components.items():
+            try:
+                usage[name] = measure()
+            except Exception as e:
+                usage[name] = {"error": str(e)}
+        return usage
+
+    def _measure(self) -> dict:
+        measure = {
+            "taken_at": time.time(),
+            "rss_bytes": rss_bytes(),
+            "components": self.component_usage()
+        }
+        if tracemalloc.is_tracing():
+            # Sans les allocations du profileur lui-même (snapshots conservés, mesures)
+            snapshot = tracemalloc.take_snapshot().filter_traces([
+                tracemalloc.Filter(False, __file__, all_frames=True),
+                tracemalloc.Filter(False, tracemalloc.__file__)
+            ])
+            measure["modules"] = group_by_module(snapshot)
+        return measure
+
+    def report(self, top_n: int = 20) -> dict:
+        """Current footprint; ``top_modules`` only while tracing"""
+        measure = self._measure()
+        report = {
+            "rss_bytes": measure["rss_bytes"],
+            "peak_rss_bytes": peak_rss_bytes(),
+            "python": {"gc_objects": len(gc.get_objects()), "threads": threading.active_count()},
+            "components": measure["components"],
+            "tracing": "modules" in measure,
+            "snapshots": list(self.snapshots)
+        }
+        if "modules" in measure:
+            traced, _ = tracemalloc.get_traced_memory()
+            report["traced_bytes"] = traced
+            rows = [{"module": module, **entry} for module, entry in measure["modules"].items()]
+            report["top_modules"] = _top(rows, "size", top_n)
+        return report
+
+    def take_snapshot(self, name: str) -> dict:
+        """Record the current footprint under ``name`` (oldest snapshots are dropped)"""
+        measure = self._measure()
+        with self._lock:
+            self.snapshots.pop(name, None)
+            self.snapshots[name] = measure
+            while len(self.snapshots) > self.max_snapshots:
+                self.snapshots.popitem(last=False)
+        return {"name": name, "taken_at": measure["taken_at"], "rss_bytes": measure["rss_bytes"],
+                "tracing": "modules" in measure}
+
+    def diff(self, start: str, end: Optional[str] = None, top_n: int = 20) -> dict:
+        """Growth between snapshot ``start`` and snapshot ``end`` (now if omitted).
+
+        Raises KeyError for unknown snapshot names.
+        """
+        with self._lock:
+            before = self.snapshots[start]
+            after = self.snapshots[end] if end else None
+        if after is None:
+            after = self._measure()
+
+        rss_diff = None
+        if before["rss_bytes"] is not None and after["rss_bytes"] is not None:
+            rss_diff = after["rss_bytes"] - before["rss_bytes"]
+
+        components = {}
+        for name, usage in after["components"].items():
+            previous = before["components"].get(name, {})
+            components[name] = {
+                key: value - previous.get(key, 0)
+                for key, value in usage.items()
+                if isinstance(value, (int, float)) and not isinstance(value, bool)
+            }
+
+        result = {
+            "start": start,
+            "end": end or "now",
+            "elapsed_seconds": round(after["taken_at"] - before["taken_at"], 3),
+            "rss_diff_bytes": rss_diff,
+            "components": components
+        }
+        if "modules" in before and "modules" in after:
+            rows = []
+            for module in before["modules"].keys() | after["modules"].keys():
+                old = before["modules"].get(module, {"size": 0, "count": 0})
+                new = after["modules"].get(module, {"size": 0, "count": 0})
+                rows.append({
+                    "module": module,
+                    "size_diff": new["size"] - old["size"],
+                    "count_diff": new["count"] - old["count"],
+                    "size": new["size"]
+                })
+            result["top_modules"] = _top([row for row in rows if row["size_diff"]], "size_diff", top_n)
+        return result
@@ -0,0 +1,155 @@
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+# (score, decided_by)
+MetricResult = Tuple[float, str]
+
+# scorer(calculator, text1, text2, threshold, deadline) -> (score, decided_by)
+Scorer = Callable[..., MetricResult]
+# batch_kernel(calculator, pairs, threshold) -> [(score, decided_by), ...]
+BatchKernel = Callable[..., List[MetricResult]]
+
+CPU_BOUND = "cpu"
+IO_BOUND = "io"
+
+# decided_by des scores qui ne viennent pas du metric demandé (LLM en échec, délai trop court)
+DEGRADED_TIERS = ("fallback", "deadline")
+
+@dataclass(frozen=True)
+class MetricSpec:
+    """What a metric is and how it should be scheduled.
+
+    ``cost`` is relative to one TF-IDF cosine on short texts (1.0).
+    ``batch_kernel`` scores many pairs in one call with the exact same
+    results as ``scorer``. ``matrix`` means SimilarityMatrix supports it.
+    ``fallback`` is the metric used when this one fails.
+    ``threshold_dependent`` means the score itself depends on the threshold.
+    ``model_setting`` names the setting holding the model behind the scores.
+    IO-bound scorers honour the request ``deadline`` (None = no limit).
+    """
+    name: str
+    description: str
+    scorer: Scorer
+    kind: str = CPU_BOUND
+    cost: float = 1.0
+    batch_kernel: Optional[BatchKernel] = None
+    matrix: bool = False
+    fallback: Optional[str] = None
+    threshold_dependent: bool = False
+    model_setting: Optional[str] = None
+
+    @property
+    def batchable(self) -> bool:
+        return self.batch_kernel is not None
+
+    def describe(self) -> dict:
+        return {
+            "description": self.description,
+            "kind": self.kind,
+            "cost": self.cost,
+            "batch_kernel": self.batchable,
+            "matrix": self.matrix,
+            "fallback": self.fallback,
+            "threshold_dependent": self.threshold_dependent
+        }
+
+class MetricRegistry:
+    """Metrics known to the service, in registration order"""
+
+    def __init__(self):
+        self._specs: Dict[str, MetricSpec] = {}
+
+    def register(self, spec: MetricSpec) -> MetricSpec:
+        if spec.kind not in (CPU_BOUND, IO_BOUND):
+            raise ValueError(f"Unknown metric kind: {spec.kind}")
+        self._specs[spec.name] = spec
+        return spec
+
+    def get(self, name: str) -> MetricSpec:
+        """Spec for ``name``; raises ValueError for unknown metrics"""
+        spec = self._specs.get(name)
+        if spec is None:
+            raise ValueError(f"Invalid metric: {name}. Valid options: {', '.join(self._specs)}")
+        return spec
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._specs
+
+    def names(self) -> List[str]:
+        return list(self._specs)
+
+    def matrix_names(self) -> List[str]:
+        return [name for name, spec in self._specs.items() if spec.matrix]
+
+    def describe(self) -> Dict[str, dict]:
+        return {name: spec.describe() for name, spec in self._specs.items()}
+
+metric_registry = MetricRegistry()
+
+# Les scorers passent par l'instance de SimilarityCalculator : ce module ne
+# dépend pas de app.core.similarity (importé par app.config pour la validation).
+metric_registry.register(MetricSpec(
+    name="cosine",
+    description="TF-IDF cosine similarity - mathematical text vector comparison",
+    scorer=lambda calc, text1, text2, threshold=None, deadline=None: (calc.cosine_sim(text1, text2), "cosine"),
+    cost=1.0,
+    batch_kernel=lambda calc, pairs, threshold=None: [(score, "cosine") for score in calc.cosine_sim_batch(pairs)],
+    matrix=True
+))
+metric_registry.register(MetricSpec(
+    name="jaccard",
+    description="Jaccard coefficient - token overlap ratio",
+    scorer=lambda calc, text1, text2, threshold=None, deadline=None: (calc.jaccard_sim(text1, text2), "jaccard"),
+    cost=0.5,
+    matrix=True
+))
+metric_registry.register(MetricSpec(
+    name="llm",
+    description="LLM-enhanced similarity - lexical scores first, LLM only near the threshold",
+    scorer=lambda calc, text1, text2, threshold=None, deadline=None: calc.llm_cascade_sim(
+        text1, text2, threshold, deadline
+    ),
+    kind=IO_BOUND,
+    cost=200.0,
+    fallback="cosine",
+    threshold_dependent=True,
+    model_setting="LLM_MODEL"
+))
+metric_registry.register(MetricSpec(
+    name="direct_llm",
+    description="Pure LLM assessment - semantic similarity evaluation",
+    scorer=lambda calc, text1, text2, threshold=None, deadline=None: calc.direct_llm_result(text1, text2, deadline),
+    kind=IO_BOUND,
+    cost=500.0,
+    fallback="cosine",
+    model_setting="LLM_MODEL"
+))
+metric_registry.register(MetricSpec(
+    name="levenshtein",
+    description="Normalized Levenshtein distance - character edits between short strings",
+    scorer=lambda calc, text1, text2, threshold=None, deadline=None: (
+        calc.levenshtein_sim(text1, text2), "levenshtein"
+    ),
+    cost=0.5,
+    matrix=True
+))
+metric_registry.register(MetricSpec(
+    name="jaro_winkler",
+    description="Jaro-Winkler - character matches with a common-prefix bonus, for names and titles",
+    scorer=lambda calc, text1, text2, threshold=None, deadline=None: (
+        calc.jaro_winkler_sim(text1, text2), "jaro_winkler"
+    ),
+    cost=0.5,
+    matrix=True
+))
+metric_registry.register(MetricSpec(
+    name="embedding",
+    description="Embedding cosine similarity - sentence vectors from EMBEDDING_MODEL, no LLM call",
+    scorer=lambda calc, text1, text2, threshold=None, deadline=None: (calc.embedding_sim(text1, text2), "embedding"),
+    cost=20.0,
+    batch_kernel=lambda calc, pairs, threshold=None: [
+        (score, "embedding") for score in calc.embedding_sim_batch(pairs)
+    ],
+    fallback="cosine",
+    model_setting="EMBEDDING_MODEL"
+))
@@ -0,0 +1,83 @@
+import math
+import re
+from collections import Counter
+from typing import List, Tuple
+
+# Mots et ponctuation, comme un tokenizer BPE les découpe grossièrement
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+_WORD_RE = re.compile(r"\w+")
+
+# Longueur moyenne d'un token BPE en caractères pour les mots longs
+CHARS_PER_TOKEN = 4
+
+def _token_cost(token: str) -> int:
+    if token[0].isalnum() or token[0] == "_":
+        return math.ceil(len(token) / CHARS_PER_TOKEN)
+    return 1
+
+def count_tokens(text: str) -> int:
+    """Offline estimate of the number of LLM tokens in ``text``.
+
+    Each punctuation mark counts as one token and each word as one token per
+    started group of ``CHARS_PER_TOKEN`` characters. This tracks BPE token
+    counts closely enough for budgeting without a tokenizer download.
+    """
+    return sum(_token_cost(token) for token in _TOKEN_RE.findall(text))
+
+def _truncate_tokens(text: str, budget: int) -> str:
+    """Keep the leading tokens of ``text`` that fit in ``budget``"""
+    used = 0
+    end = 0
+    for match in _TOKEN_RE.finditer(text):
+        cost = _token_cost(match.group())
+        if used + cost > budget:
+            break
+        used += cost
+        end = match.end()
+    return text[:end].rstrip() + " ..."
+
+def fit_to_budget(text: str, budget: int) -> str:
+    """Shorten ``text`` to about ``budget`` tokens with a cheap extractive summary.
+
+    Sentences are scored by the average frequency of their words in the whole
+    text (the first sentence gets a bonus) and the best ones that fit are kept
+    in their original order. If not even one sentence fits, the text is cut.
+    """
+    if budget <= 0:
+        return ""
+    if count_tokens(text) <= budget:
+        return text
+
+    sentences = [s for s in _SENTENCE_RE.split(text.strip()) if s]
+    if len(sentences) > 1:
+        frequencies = Counter(word.lower() for word in _WORD_RE.findall(text))
+        scored: List[Tuple[float, int, str, int]] = []
+        for index, sentence in enumerate(sentences):
+            words = [word.lower() for word in _WORD_RE.findall(sentence)]
+            score = sum(frequencies[word] for word in words) / len(words) if words else 0.0
+            if index == 0:
+                score *= 1.5
+            scored.append((score, index, sentence, count_tokens(sentence)))
+
+        kept, used = [], 0
+        for score, index, sentence, cost in sorted(scored, key=lambda item: (-item[0], item[1])):
+            if used + cost <= budget:
+                kept.append((index, sentence))
+                used += cost
+        if kept:
+            return " ".join(sentence for _, sentence in sorted(kept))
+
+    return _truncate_tokens(text, budget)
+
+def fit_pair(text1: str, text2: str, budget: int) -> Tuple[str, str]:
+    """Share ``budget`` between two texts; a short text leaves its unused share to the other"""
+    half = budget // 2
+    tokens1, tokens2 = count_tokens(text1), count_tokens(text2)
+    if tokens1 + tokens2 <= budget:
+        return text1, text2
+    if tokens1 <= half:
+        return text1, fit_to_budget(text2, budget - tokens1)
+    if tokens2 <= half:
+        return fit_to_budget(text1, budget - tokens2), text2
+    return fit_to_budget(text1, half), fit_to_budget(text2, budget - half)
@@ -1,38 +1,96 @@
 import re
 import html
-from app.config import Config
+from typing import List, Optional, Tuple
+from app.config import Config, ConfigSnapshot
+
+# Motifs compilés une fois, partagés par les versions unitaires et par lots
+HTML_TAG_PATTERN = re.compile(r'<[^>]*>')
+CONTROL_CHARS_PATTERN = re.compile(r'[\x00-\x1F\x7F]')
+
+def _needs_escape(text: str) -> bool:
+    """Whether html.escape would change ``text`` (otherwise escaping is a useless copy)"""
+    return "&" in text or "<" in text or ">" in text or '"' in text or "'" in text
 
 class Sanitizer:
     @staticmethod
-    def sanitize_input(text: str) -> str:
-        """Sanitize user input"""
+    def sanitize_input(text: str, config: Optional[ConfigSnapshot] = None) -> str:
+        """Sanitize user input (with ``config``, the snapshot the request started with)"""
+        config = config or Config.snapshot
         # Check length
-        if len(text) > Config.MAX_INPUT_LENGTH:
-            raise ValueError(f"Input exceeds maximum length of {Config.MAX_INPUT_LENGTH} characters")
+        if len(text) > config.MAX_INPUT_LENGTH:
+            raise ValueError(f"Input exceeds maximum length of {config.MAX_INPUT_LENGTH} characters")
         
         # Remove HTML tags
-        cleaned = re.sub(r'<[^>]*>', '', text)
+        cleaned = HTML_TAG_PATTERN.sub('', text)
         
         # Escape special characters
         cleaned = html.escape(cleaned)
         
         # Check for blacklisted words
-        lower_text = cleaned.lower()
-        for forbidden in Config.BLACKLIST:
-            if forbidden and forbidden in lower_text:
-                raise ValueError(f"Forbidden content detected: {forbidden}")
+        forbidden = config.BLACKLIST_MATCHER.find(cleaned.lower())
+        if forbidden:
+            raise ValueError(f"Forbidden content detected: {forbidden}")
                 
         return cleaned.strip()
     
     @staticmethod
-    def sanitize_output(text: str) -> str:
+    def sanitize_inputs(texts: List[str],
+                        config: Optional[ConfigSnapshot] = None) -> Tuple[List[Optional[str]], List[Optional[str]]]:
+        """``sanitize_input`` for many texts, without raising.
+        
+        Returns (cleaned, errors), two lists aligned with ``texts``: for each
+        text either the cleaned text or the error message ``sanitize_input``
+        would have raised. Texts without ``<`` or special characters skip the
+        tag removal and escaping, and the blacklist is checked with one scan
+        of all the texts.
+        """
+        config = config or Config.snapshot
+        max_length = config.MAX_INPUT_LENGTH
+        cleaned: List[Optional[str]] = [None] * len(texts)
+        errors: List[Optional[str]] = [None] * len(texts)
+        
+        escaped: List[str] = []
+        positions: List[int] = []
+        for i, text in enumerate(texts):
+            if len(text) > max_length:
+                errors[i] = f"Input exceeds maximum length of {max_length} characters"
+                continue
+            if "<" in text:
+                text = HTML_TAG_PATTERN.sub('', text)
+            if _needs_escape(text):
+                text = html.escape(text)
+            escaped.append(text)
+            positions.append(i)
+        
+        forbidden = config.BLACKLIST_MATCHER.find_many([text.lower() for text in escaped])
+        for i, text, word in zip(positions, escaped, forbidden):
+            if word:
+                errors[i] = f"Forbidden content detected: {word}"
+            else:
+                cleaned[i] = text.strip()
+        return cleaned, errors
+    
+    @staticmethod
+    def sanitize_output(text: str, config: Optional[ConfigSnapshot] = None) -> str:
         """Sanitize LLM output"""
+        config = config or Config.snapshot
         # Basic cleaning
-        cleaned = re.sub(r'[\x00-\x1F\x7F]', '', text)  # Remove control characters
+        cleaned = CONTROL_CHARS_PATTERN.sub('', text)  # Remove control characters
         
         # Truncate to safe length
-        max_length = Config.MAX_INPUT_LENGTH * 2
+        max_length = config.MAX_INPUT_LENGTH * 2
         if len(cleaned) > max_length:
             cleaned = cleaned[:max_length] + "... [TRUNCATED]"
             
-        return cleaned
\ No newline at end of file
+        return cleaned
+    
+    @staticmethod
+    def sanitize_outputs(texts: List[str], config: Optional[ConfigSnapshot] = None) -> List[str]:
+        """``sanitize_output`` for many texts (output sanitization cannot fail)"""
+        config = config or Config.snapshot
+        max_length = config.MAX_INPUT_LENGTH * 2
+        results = [CONTROL_CHARS_PATTERN.sub('', text) for text in texts]
+        for i, cleaned in enumerate(results):
+            if len(cleaned) > max_length:
+                results[i] = cleaned[:max_length] + "... [TRUNCATED]"
+        return results
@@ -0,0 +1,251 @@
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import threading
+from contextlib import contextmanager
+from typing import Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows : verrou limité au processus courant
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# En-tête : magic, version, retired, slots, count (complété à HEADER_SIZE octets)
+MAGIC = b"SIMSTORE"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<8sIIQQ")
+HEADER_SIZE = 64
+RETIRED_OFFSET = 12
+COUNT_OFFSET = 24
+
+# Enregistrement : clé blake2b de 16 octets puis score float64 ; clé nulle = case vide
+KEY_SIZE = 16
+SCORE = struct.Struct("<d")
+RECORD_SIZE = KEY_SIZE + SCORE.size
+EMPTY_KEY = bytes(KEY_SIZE)
+
+MIN_SLOTS = 1024
+MAX_LOAD = 0.7
+
+def pair_key(metric: str, text1: str, text2: str, threshold: Optional[float] = None,
+             model: Optional[str] = None) -> bytes:
+    """16-byte key of a scored pair (``threshold`` only for threshold-dependent metrics,
+    ``model`` for model-backed ones, so a model change does not serve stale scores)"""
+    digest = hashlib.blake2b(digest_size=KEY_SIZE)
+    for part in (metric, text1, text2, None if threshold is None else repr(float(threshold)), model):
+        # Longueur avant chaque partie : aucun contenu de texte ne peut déplacer une frontière
+        data = b"" if part is None else part.encode("utf-8")
+        digest.update(struct.pack("<q", -1 if part is None else len(data)))
+        digest.update(data)
+    key = digest.digest()
+    # La clé nulle marque les cases vides
+    return key if key != EMPTY_KEY else b"\x01" + key[1:]
+
+def _slots_for(entries: int) -> int:
+    slots = MIN_SLOTS
+    while entries > slots * MAX_LOAD:
+        slots *= 2
+    return slots
+
+def _home(key: bytes, slots: int) -> int:
+    return int.from_bytes(key[:8], "little") & (slots - 1)
+
+class ScoreStore:
+    """Pair scores persisted in a memory-mapped open-addressing hash table.
+
+    The file is a 64-byte header followed by ``slots`` fixed 24-byte records
+    (key, score) probed linearly, so any process mapping it can look a pair up
+    by reading a few records in place. Writers serialize on ``<path>.lock``
+    (flock + a thread lock) and only fill empty slots or overwrite a score.
+
+    Growing or compacting writes a new file, replaces the old one with it and
+    flags the old one as retired in its header; readers notice the flag and remap.
+    Once the table holds ``max_entries`` pairs, new pairs are not stored.
+    """
+
+    def __init__(self, path: str, max_entries: int = 1000000):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_slots = _slots_for(max_entries)
+        self._thread_lock = threading.Lock()
+        self._growing = False
+        self._full_logged = False
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._lock_fd = os.open(path + ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+        with self._locked():
+            if not os.path.exists(path) or os.path.getsize(path) < HEADER_SIZE:
+                self._write_table(path, MIN_SLOTS, [])
+            self._map()
+
+    # --- Verrouillage et mapping -------------------------------------------
+
+    @contextmanager
+    def _locked(self, blocking: bool = True):
+        """Exclusive writer lock across threads and processes; yields False if not acquired"""
+        if not self._thread_lock.acquire(blocking):
+            yield False
+            return
+        try:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(self._lock_fd, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+                except BlockingIOError:
+                    yield False
+                    return
+            try:
+                yield True
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+        finally:
+            self._thread_lock.release()
+
+    def _map(self) -> None:
+        with open(self.path, "r+b") as f:
+            mm = mmap.mmap(f.fileno(), 0)
+        magic, version, _, slots, _ = HEADER.unpack_from(mm, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"Not a score store file: {self.path}")
+        # Un seul attribut : mapping et taille changent ensemble. L'ancien mapping
+        # n'est pas fermé, un lecteur peut encore l'utiliser.
+        self._table = (mm, slots)
+
+    def _current(self) -> Tuple[mmap.mmap, int]:
+        table = self._table
+        if table[0][RETIRED_OFFSET]:
+            self._map()
+            table = self._table
+        return table
+
+    @staticmethod
+    def _write_table(path: str, slots: int, records) -> int:
+        """Write a new table file at ``path`` from (key, score) pairs; returns the entry count"""
+        table = bytearray(HEADER_SIZE + slots * RECORD_SIZE)
+        count = 0
+        for key, score in records:
+            slot = _home(key, slots)
+            while True:
+                offset = HEADER_SIZE + slot * RECORD_SIZE
+                current = table[offset:offset + KEY_SIZE]
+                if current == EMPTY_KEY or current == key:
+                    count += current == EMPTY_KEY
+                    table[offset:offset + KEY_SIZE] = key
+                    SCORE.pack_into(table, offset + KEY_SIZE, score)
+                    break
+                slot = (slot + 1) & (slots - 1)
+        HEADER.pack_into(table, 0, MAGIC, FORMAT_VERSION, 0, slots, count)
+
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(table)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        return count
+
+    # --- Lecture / écriture --------------------------------------------------
+
+    def _find(self, mm: mmap.mmap, slots: int, key: bytes) -> int:
+        """Offset of ``key``'s record, or of the empty slot where it would go"""
+        slot = _home(key, slots)
+        while True:
+            offset = HEADER_SIZE + slot * RECORD_SIZE
+            current = mm[offset:offset + KEY_SIZE]
+            if current == key or current == EMPTY_KEY:
+                return offset
+            slot = (slot + 1) & (slots - 1)
+
+    def get(self, key: bytes) -> Optional[float]:
+        mm, slots = self._current()
+        offset = self._find(mm, slots, key)
+        if mm[offset:offset + KEY_SIZE] != key:
+            return None
+        return SCORE.unpack_from(mm, offset + KEY_SIZE)[0]
+
+    def put(self, key: bytes, score: float, blocking: bool = True) -> bool:
+        """Store a score; False if it was not written (lock busy, or store full)"""
+        with self._locked(blocking) as acquired:
+            if not acquired:
+                return False
+            mm, slots = self._current()
+            offset = self._find(mm, slots, key)
+            is_new = mm[offset:offset + KEY_SIZE] == EMPTY_KEY
+            count = struct.unpack_from("<Q", mm, COUNT_OFFSET)[0]
+
+            if is_new and count + 1 > slots * MAX_LOAD:
+                if slots < self.max_slots:
+                    self._grow_in_background(slots * 2)
+                elif not self._full_logged:
+                    logger.warning("Score store %s is full (%d pairs), new pairs are not stored", self.path, count)
+                    self._full_logged = True
+                return False
+
+            # Score avant la clé : un lecteur qui voit la clé voit aussi le score
+            SCORE.pack_into(mm, offset + KEY_SIZE, score)
+            mm[offset:offset + KEY_SIZE] = key
+            if is_new:
+                struct.pack_into("<Q", mm, COUNT_OFFSET, count + 1)
+            return True
+
+    # --- Croissance et compaction -------------------------------------------
+
+    def _records(self, mm: mmap.mmap, slots: int):
+        for slot in range(slots):
+            offset = HEADER_SIZE + slot * RECORD_SIZE
+            key = mm[offset:offset + KEY_SIZE]
+            if key != EMPTY_KEY:
+                yield key, SCORE.unpack_from(mm, offset + KEY_SIZE)[0]
+
+    def compact(self, slots: Optional[int] = None) -> dict:
+        """Rebuild the table into a new file, sized for its entries unless ``slots`` is given.
+
+        Probe chains are shortened and the file shrinks or grows as needed.
+        Writers wait during the rebuild; readers keep using the old mapping
+        until the new file is in place.
+        """
+        with self._locked():
+            mm, old_slots = self._current()
+            count = struct.unpack_from("<Q", mm, COUNT_OFFSET)[0]
+            new_slots = max(min(slots or 0, self.max_slots), _slots_for(count))
+            count = self._write_table(self.path, new_slots, self._records(mm, old_slots))
+
+            # Les autres processus remappent en voyant ce drapeau dans l'ancien fichier
+            mm[RETIRED_OFFSET] = 1
+            self._map()
+        logger.info("Score store %s rebuilt: %d pairs in %d slots", self.path, count, new_slots)
+        return self.stats()
+
+    def _grow_in_background(self, slots: int) -> None:
+        if self._growing:
+            return
+        self._growing = True
+
+        def grow():
+            try:
+                self.compact(slots)
+            except Exception as e:
+                logger.error("Score store growth failed: %s", str(e))
+            finally:
+                self._growing = False
+
+        threading.Thread(target=grow, name="score-store-grow", daemon=True).start()
+
+    def stats(self) -> dict:
+        mm, slots = self._current()
+        count = struct.unpack_from("<Q", mm, COUNT_OFFSET)[0]
+        return {
+            "path": self.path,
+            "entries": count,
+            "slots": slots,
+            "load": round(count / slots, 4),
+            "bytes": len(mm)
+        }
+
+    def close(self) -> None:
+        os.close(self._lock_fd)
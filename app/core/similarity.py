@@ -1,22 +1,79 @@
 import numpy as np
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
-from nltk.tokenize import word_tokenize
+from collections import Counter
+from typing import List, Optional, Tuple
 import logging
+import math
+import threading
+from app.config import Config, ConfigSnapshot
 from app.core.llm_proxy import LLMClient
+from app.core.deadline import Deadline, DeadlineExceeded
+from app.core.metrics import metric_registry
+from app.core.edit_distance import jaro_winkler_similarity, levenshtein_similarity
+from app.core.tokenization import word_tokens
+from app.core.embeddings import EmbeddingService
+from app.core.memory import sizeof
 
 logger = logging.getLogger(__name__)
 
+# Paramètres TF-IDF partagés avec le calcul matriciel (app.core.matrix)
+TFIDF_PARAMS = {
+    "ngram_range": (1, 2),     # Unigrams et bigrams
+    "min_df": 1,               # Minimum document frequency
+    "max_features": 5000,      # Limite du vocabulaire
+    "stop_words": "english",   # Supprime les mots vides
+}
+
+# IDF lissé de sklearn sur 2 documents : ln((1 + 2) / (1 + df)) + 1
+IDF_IN_BOTH = 1.0
+IDF_IN_ONE = math.log(1.5) + 1.0
+
 class SimilarityCalculator:
     def __init__(self):
         self.llm_client = LLMClient()
+        # Vecteurs d'embedding (modèle chargé au premier usage), cache et index de corpus
+        self.embeddings = EmbeddingService()
         # Amélioration du TF-IDF pour capturer plus de similarités
-        self.tfidf_vectorizer = TfidfVectorizer(
-            ngram_range=(1, 2),  # Unigrams et bigrams
-            min_df=1,           # Minimum document frequency
-            max_features=5000,  # Limite du vocabulaire
-            stop_words='english'  # Supprime les mots vides
-        )
+        self.tfidf_vectorizer = TfidfVectorizer(**TFIDF_PARAMS)
+        self._tfidf_analyzer = self.tfidf_vectorizer.build_analyzer()
+        # Cascade du metric "llm" : marge autour du seuil hors de laquelle on évite le LLM
+        self.cascade_margin = Config.LLM_CASCADE_MARGIN
+        self.cascade_stats = {"evaluated": 0, "avoided": 0, "llm_calls": 0}
+        self._stats_lock = threading.Lock()
+        Config.subscribe(self.reconfigure)
+    
+    def reconfigure(self, config: ConfigSnapshot) -> None:
+        """Apply settings from a reloaded config snapshot (fitted state is kept)"""
+        self.cascade_margin = config.LLM_CASCADE_MARGIN
+    
+    def compute(self, metric: str, text1: str, text2: str, threshold: Optional[float] = None) -> float:
+        """Dispatch to the similarity method matching ``metric``"""
+        return self.evaluate(metric, text1, text2, threshold)[0]
+    
+    def evaluate(self, metric: str, text1: str, text2: str, threshold: Optional[float] = None,
+                 deadline: Optional[Deadline] = None) -> Tuple[float, str]:
+        """Return (score, decided_by) where decided_by names the tier that produced the score.
+        
+        With a ``deadline``, LLM tiers that cannot fit in the remaining budget
+        are skipped or cut off and the cosine score is returned ("deadline").
+        """
+        spec = metric_registry.get(metric)
+        try:
+            return spec.scorer(self, text1, text2, threshold, deadline)
+        except Exception as e:
+            if spec.fallback is None:
+                raise
+            logger.error(f"Error in {metric} similarity, falling back to {spec.fallback}: {str(e)}")
+            return self.evaluate(spec.fallback, text1, text2, threshold)[0], "fallback"
+    
+    def evaluate_batch(self, metric: str, pairs: List[Tuple[str, str]],
+                       threshold: Optional[float] = None) -> List[Tuple[float, str]]:
+        """Score many pairs, through the metric's batch kernel when it has one"""
+        spec = metric_registry.get(metric)
+        if spec.batchable:
+            return spec.batch_kernel(self, pairs, threshold)
+        return [self.evaluate(metric, text1, text2, threshold) for text1, text2 in pairs]
     
     def cosine_sim(self, text1: str, text2: str) -> float:
         """Cosine similarity using TF-IDF - retourne un float Python"""
@@ -28,7 +85,8 @@ class SimilarityCalculator:
             if text1.strip() == text2.strip():
                 return 1.0
                 
-            vectors = self.tfidf_vectorizer.fit_transform([text1, text2])
+            # Vectorizer dédié à l'appel : fit_transform n'est pas thread-safe
+            vectors = TfidfVectorizer(**TFIDF_PARAMS).fit_transform([text1, text2])
             similarity_matrix = cosine_similarity(vectors[0:1], vectors[1:2])
             
             # Extraction et conversion explicite en float Python
@@ -44,11 +102,46 @@ class SimilarityCalculator:
             logger.error(f"Error in cosine similarity: {str(e)}")
             return 0.0
     
+    def cosine_sim_batch(self, pairs: List[Tuple[str, str]]) -> List[float]:
+        """Same scores as cosine_sim for many pairs, without fitting a vectorizer per pair.
+        
+        With only two documents the smoothed IDF of a term takes two values
+        (term in both texts or in one), so the TF-IDF vectors follow directly
+        from the term counts of the shared analyzer.
+        """
+        scores = []
+        for text1, text2 in pairs:
+            if not text1.strip() or not text2.strip():
+                scores.append(0.0)
+                continue
+            if text1.strip() == text2.strip():
+                scores.append(1.0)
+                continue
+            
+            counts1 = Counter(self._tfidf_analyzer(text1))
+            counts2 = Counter(self._tfidf_analyzer(text2))
+            if len(counts1.keys() | counts2.keys()) > TFIDF_PARAMS["max_features"]:
+                # Vocabulaire tronqué par max_features : on laisse sklearn choisir les termes
+                scores.append(self.cosine_sim(text1, text2))
+                continue
+            
+            norm1 = math.sqrt(sum((count * (IDF_IN_BOTH if term in counts2 else IDF_IN_ONE)) ** 2
+                                  for term, count in counts1.items()))
+            norm2 = math.sqrt(sum((count * (IDF_IN_BOTH if term in counts1 else IDF_IN_ONE)) ** 2
+                                  for term, count in counts2.items()))
+            if norm1 == 0.0 or norm2 == 0.0:
+                scores.append(0.0)
+                continue
+            
+            dot = sum(count * counts2[term] for term, count in counts1.items() if term in counts2)
+            scores.append(float(dot / (norm1 * norm2)))
+        return scores
+    
     def jaccard_sim(self, text1: str, text2: str) -> float:
         """Jaccard similarity coefficient - retourne un float Python"""
         try:
-            words1 = set(word_tokenize(text1.lower()))
-            words2 = set(word_tokenize(text2.lower()))
+            words1 = set(word_tokens(text1))
+            words2 = set(word_tokens(text2))
             intersection = words1 & words2
             union = words1 | words2
             
@@ -65,28 +158,127 @@ class SimilarityCalculator:
             logger.error(f"Error in jaccard similarity: {str(e)}")
             return 0.0
     
-    def llm_based_sim(self, text1: str, text2: str) -> float:
-        """LLM-enhanced similarity (fallback to cosine if LLM unavailable)"""
+    def levenshtein_sim(self, text1: str, text2: str, min_similarity: Optional[float] = None) -> float:
+        """Normalized Levenshtein similarity (case-insensitive) - bit-parallel, see edit_distance"""
         try:
-            # Essayer d'abord avec LLM
-            if hasattr(self.llm_client, 'client') and self.llm_client.client:
-                return self.direct_llm_sim(text1, text2)
-            else:
-                # Fallback vers cosine
-                return self.cosine_sim(text1, text2)
+            text1, text2 = text1.strip().lower(), text2.strip().lower()
+            if not text1 or not text2:
+                return 0.0
+            return float(levenshtein_similarity(text1, text2, min_similarity))
         except Exception as e:
-            logger.error(f"Error in llm_based similarity: {str(e)}")
-            # Fallback vers cosine en cas d'erreur
-            return self.cosine_sim(text1, text2)
+            logger.error(f"Error in levenshtein similarity: {str(e)}")
+            return 0.0
+    
+    def jaro_winkler_sim(self, text1: str, text2: str) -> float:
+        """Jaro-Winkler similarity (case-insensitive), suited to short strings like names"""
+        try:
+            text1, text2 = text1.strip().lower(), text2.strip().lower()
+            if not text1 or not text2:
+                return 0.0
+            return float(jaro_winkler_similarity(text1, text2))
+        except Exception as e:
+            logger.error(f"Error in jaro-winkler similarity: {str(e)}")
+            return 0.0
+    
+    def embedding_sim(self, text1: str, text2: str) -> float:
+        """Cosine of the EMBEDDING_MODEL vectors, clipped to [0, 1]"""
+        return self.embeddings.similarity(text1, text2)
+    
+    def embedding_sim_batch(self, pairs: List[Tuple[str, str]]) -> List[float]:
+        """Same scores as embedding_sim, with all the texts encoded in one call"""
+        return self.embeddings.similarity_batch(pairs)
+    
+    def llm_based_sim(self, text1: str, text2: str, threshold: Optional[float] = None) -> float:
+        """LLM-enhanced similarity - see llm_cascade_sim"""
+        return self.llm_cascade_sim(text1, text2, threshold)[0]
+    
+    def llm_cascade_sim(self, text1: str, text2: str, threshold: Optional[float] = None,
+                        deadline: Optional[Deadline] = None) -> Tuple[float, str]:
+        """Cheap lexical scores first, LLM only for pairs close to the threshold.
+        
+        If both cosine and jaccard are at least ``threshold + cascade_margin`` the
+        pair is clearly similar; if both are at most ``threshold - cascade_margin``
+        it is clearly dissimilar. In both cases the cosine score is returned
+        without calling the LLM (tier "lexical"). Otherwise the LLM decides
+        (tier "llm"), falling back to cosine if it is unavailable ("fallback")
+        or if the ``deadline`` leaves no time for the call ("deadline").
+        """
+        if threshold is None:
+            threshold = Config.snapshot.SIMILARITY_THRESHOLD
+        
+        cosine = self.cosine_sim(text1, text2)
+        jaccard = self.jaccard_sim(text1, text2)
+        
+        clearly_above = min(cosine, jaccard) >= threshold + self.cascade_margin
+        clearly_below = max(cosine, jaccard) <= threshold - self.cascade_margin
+        if clearly_above or clearly_below:
+            self._record_cascade(avoided=True)
+            return cosine, "lexical"
+        
+        self._record_cascade(avoided=False)
+        try:
+            score = self._llm_score(text1, text2, deadline)
+        except DeadlineExceeded as e:
+            logger.warning("LLM tier skipped: %s", str(e))
+            return cosine, "deadline"
+        if score is None:
+            return cosine, "fallback"
+        return score, "llm"
+    
+    def _record_cascade(self, avoided: bool) -> None:
+        with self._stats_lock:
+            self.cascade_stats["evaluated"] += 1
+            if avoided:
+                self.cascade_stats["avoided"] += 1
+    
+    def cascade_summary(self) -> dict:
+        """Cascade counters with the LLM-call avoidance rate"""
+        with self._stats_lock:
+            stats = dict(self.cascade_stats)
+        stats["avoidance_rate"] = round(stats["avoided"] / stats["evaluated"], 4) if stats["evaluated"] else 0.0
+        return stats
+    
+    def memory_usage(self) -> dict:
+        """State kept between requests: the unfitted analyzer vectorizer (cosine_sim fits
+        a new one per call) and the cascade / LLM usage counters; embeddings are reported apart"""
+        return {
+            "bytes": sizeof((self.tfidf_vectorizer, self.cascade_stats, self.llm_client.usage))
+        }
     
     def direct_llm_sim(self, text1: str, text2: str) -> float:
         """Direct similarity assessment using LLM - retourne un float Python"""
+        return self.direct_llm_result(text1, text2)[0]
+    
+    def direct_llm_result(self, text1: str, text2: str,
+                          deadline: Optional[Deadline] = None) -> Tuple[float, str]:
+        """(score, decided_by) for direct_llm - "fallback" when cosine replaced the LLM,
+        "deadline" when the remaining budget could not cover the call"""
+        try:
+            score = self._llm_score(text1, text2, deadline)
+        except DeadlineExceeded as e:
+            logger.warning("LLM call skipped: %s", str(e))
+            return self.cosine_sim(text1, text2), "deadline"
+        if score is None:
+            # Fallback vers cosine
+            return self.cosine_sim(text1, text2), "fallback"
+        return score, "llm"
+    
+    def _llm_score(self, text1: str, text2: str, deadline: Optional[Deadline] = None) -> Optional[float]:
+        """LLM similarity clamped to [0, 1], or None if the LLM is unavailable or failed.
+        
+        Raises DeadlineExceeded when the deadline leaves too little time for the call.
+        """
         try:
             if not hasattr(self.llm_client, 'client') or not self.llm_client.client:
                 logger.warning("LLM client not available, falling back to cosine")
-                return self.cosine_sim(text1, text2)
+                return None
+            if deadline is not None:
+                # Vérifié avant de compter l'appel : un appel non tenté n'est pas un appel LLM
+                deadline.check(self.llm_client.min_budget, "an LLM call")
             
-            result = self.llm_client.similarity(text1, text2)
+            with self._stats_lock:
+                self.cascade_stats["llm_calls"] += 1
+            result = self.llm_client.similarity(text1, text2, deadline)
             
             # S'assurer que c'est un float Python dans la plage [0, 1]
             if isinstance(result, (np.floating, np.integer)):
@@ -97,7 +289,8 @@ class SimilarityCalculator:
             # Clamp à [0, 1]
             return max(0.0, min(1.0, result))
             
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             logger.error(f"Error in direct LLM similarity: {str(e)}")
-            # Fallback vers cosine
-            return self.cosine_sim(text1, text2)
\ No newline at end of file
+            return None
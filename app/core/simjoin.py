@@ -0,0 +1,135 @@
+import math
+from collections import Counter, defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import logging
+from app.core.tokenization import word_tokens
+
+logger = logging.getLogger(__name__)
+
+SIMJOIN_METRICS = ("jaccard", "set_cosine")
+
+# Tolérance des bornes : les filtres ne doivent jamais écarter une paire que
+# le score flottant final (inter / union) placerait au-dessus du seuil
+EPSILON = 1e-9
+
+def default_tokenizer(text: str) -> Iterable[str]:
+    """Same tokens as SimilarityCalculator.jaccard_sim"""
+    return word_tokens(text)
+
+def _ceil(value: float) -> int:
+    return math.ceil(value - EPSILON)
+
+class SimilarityJoin:
+    """Exact all-pairs threshold join over token sets (PPJoin).
+
+    Tokens are ranked by ascending global frequency and each set is sorted by
+    rank, so set prefixes hold the rarest tokens. Records are processed by
+    increasing size; each one probes an inverted index of the shorter records'
+    prefixes, and a pair becomes a candidate only if:
+
+    - prefix filter: their prefixes share a token (otherwise the overlap
+      cannot reach the threshold),
+    - length filter: the shorter set is large enough,
+    - positional filter: the overlap counted so far plus what remains after
+      the matching positions can still reach the required overlap.
+
+    Candidates are then verified with the exact score, so the result equals
+    brute force over all n(n-1)/2 pairs.
+
+    ``jaccard`` is |A ∩ B| / |A ∪ B| (as ``jaccard_sim``); ``set_cosine`` is
+    |A ∩ B| / sqrt(|A| |B|) on the same token sets, not the TF-IDF cosine.
+    """
+
+    def __init__(self, texts: List[str], metric: str = "jaccard",
+                 tokenizer: Optional[Callable[[str], Iterable[str]]] = None):
+        if metric not in SIMJOIN_METRICS:
+            raise ValueError(f"Unsupported join metric: {metric}. Valid options: {', '.join(SIMJOIN_METRICS)}")
+        self.metric = metric
+        self.size = len(texts)
+        tokenize = tokenizer or default_tokenizer
+        token_sets = [set(tokenize(text)) for text in texts]
+
+        # Ordre global : tokens rares d'abord (départage par le token pour rester déterministe)
+        frequencies = Counter(token for tokens in token_sets for token in tokens)
+        ranks = {token: rank for rank, token in
+                 enumerate(sorted(frequencies, key=lambda token: (frequencies[token], token)))}
+        self.records = [sorted(ranks[token] for token in tokens) for tokens in token_sets]
+        self.stats = {"texts": self.size, "tokens": len(ranks), "candidates": 0, "pairs": 0}
+
+    def _probe_prefix(self, size: int, threshold: float) -> int:
+        """Prefix length probed for a set of ``size`` against shorter-or-equal sets"""
+        if self.metric == "jaccard":
+            return size - _ceil(threshold * size) + 1
+        return size - _ceil(threshold * threshold * size) + 1
+
+    def _index_prefix(self, size: int, threshold: float) -> int:
+        """Prefix length indexed for a set of ``size`` (probed later by larger-or-equal sets)"""
+        if self.metric == "jaccard":
+            return size - _ceil(2 * threshold / (1 + threshold) * size) + 1
+        return size - _ceil(threshold * size) + 1
+
+    def _min_size(self, size: int, threshold: float) -> float:
+        """Smallest partner size that can reach the threshold (length filter)"""
+        if self.metric == "jaccard":
+            return threshold * size - EPSILON
+        return threshold * threshold * size - EPSILON
+
+    def _required_overlap(self, size_x: int, size_y: int, threshold: float) -> int:
+        if self.metric == "jaccard":
+            return _ceil(threshold / (1 + threshold) * (size_x + size_y))
+        return _ceil(threshold * math.sqrt(size_x * size_y))
+
+    def _score(self, overlap: int, size_x: int, size_y: int) -> float:
+        if self.metric == "jaccard":
+            return overlap / (size_x + size_y - overlap)
+        return overlap / math.sqrt(size_x * size_y)
+
+    def join(self, threshold: float) -> List[Tuple[int, int, float]]:
+        """All pairs i < j with score >= threshold, sorted by (i, j) (threshold must be > 0)"""
+        if not 0 < threshold <= 1:
+            raise ValueError("threshold must be in (0, 1]")
+
+        records, sets = self.records, [set(record) for record in self.records]
+        order = sorted((i for i in range(self.size) if records[i]), key=lambda i: len(records[i]))
+        index: Dict[int, List[Tuple[int, int]]] = defaultdict(list)  # token -> [(record, position)]
+        candidates = 0
+        pairs = []
+
+        for x in order:
+            tokens = records[x]
+            size_x = len(tokens)
+            min_size = self._min_size(size_x, threshold)
+            overlaps: Dict[int, int] = {}  # candidat -> recouvrement compté (-1 = écarté)
+
+            for i, token in enumerate(tokens[:self._probe_prefix(size_x, threshold)]):
+                for y, j in index.get(token, ()):
+                    size_y = len(records[y])
+                    if size_y < min_size:
+                        continue
+                    seen = overlaps.get(y, 0)
+                    if seen < 0:
+                        continue
+                    bound = seen + 1 + min(size_x - i - 1, size_y - j - 1)
+                    overlaps[y] = seen + 1 if bound >= self._required_overlap(size_x, size_y, threshold) else -1
+
+            for i, token in enumerate(tokens[:self._index_prefix(size_x, threshold)]):
+                index[token].append((x, i))
+
+            for y, seen in overlaps.items():
+                if seen <= 0:
+                    continue
+                candidates += 1
+                overlap = len(sets[x] & sets[y])
+                score = self._score(overlap, size_x, len(records[y]))
+                if score >= threshold:
+                    pairs.append((min(x, y), max(x, y), float(score)))
+
+        pairs.sort()
+        self.stats.update(candidates=candidates, pairs=len(pairs))
+        logger.debug("Similarity join: %d texts, %d candidates, %d pairs", self.size, candidates, len(pairs))
+        return pairs
+
+def similarity_join(texts: List[str], threshold: float, metric: str = "jaccard",
+                    tokenizer: Optional[Callable[[str], Iterable[str]]] = None) -> List[Tuple[int, int, float]]:
+    """Pairs (i, j, score), i < j, whose ``metric`` score is >= ``threshold``"""
+    return SimilarityJoin(texts, metric, tokenizer).join(threshold)
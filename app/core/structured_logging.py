@@ -0,0 +1,202 @@
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+REQUEST_ID_HEADER = "X-Request-ID"
+
+# Contexte de la requête en cours (propagé aux threads de run_in_threadpool)
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+sampled_var: ContextVar[bool] = ContextVar("log_sampled", default=True)
+stages_var: ContextVar[Optional[Dict[str, float]]] = ContextVar("log_stages", default=None)
+
+# Attributs standard d'un LogRecord : le reste vient de ``extra`` et part dans le JSON
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+# Arguments sûrs à formater plus tard dans le thread d'écriture
+_IMMUTABLE_ARGS = (str, int, float, bool, type(None))
+
+@contextmanager
+def stage(name: str):
+    """Time a stage of the current request; durations (ms) end up in the request log record"""
+    stages = stages_var.get()
+    if stages is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stages[name] = round(stages.get(name, 0.0) + (time.perf_counter() - start) * 1000, 3)
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, request_id and ``extra`` fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id is not None:
+            entry["request_id"] = request_id
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and key != "request_id":
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+class RequestContextFilter(logging.Filter):
+    """Tags records with the request ID and drops unsampled info-level request logs.
+
+    Attached to the queue handler, it runs in the thread that logs, before
+    queueing, so the context variables are those of the request and dropped
+    records cost nothing more. Warnings and errors are always kept; records
+    logged outside a request are never sampled out.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return record.levelno >= logging.WARNING or sampled_var.get()
+
+class AsyncQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves formatting to the listener thread.
+
+    The stock handler formats each record before queueing it; here the
+    message is only rendered up front when its arguments could change before
+    the listener gets to it. When the queue is full, info-level records are
+    dropped (and counted) while warnings and errors wait for room.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        args = record.args
+        if args and not (isinstance(args, tuple) and all(isinstance(arg, _IMMUTABLE_ARGS) for arg in args)):
+            record.msg = record.getMessage()
+            record.args = None
+        if record.exc_info:
+            # Les traceback ne survivent pas à la sortie du bloc except
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if record.levelno >= logging.WARNING:
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+class LoggingService:
+    """Root logging through a bounded queue and one background writer thread"""
+
+    def __init__(self):
+        self.handler: Optional[AsyncQueueHandler] = None
+        self.listener: Optional[logging.handlers.QueueListener] = None
+        self._lock = threading.Lock()
+
+    def start(self, level: str = "INFO", queue_size: int = 10000, stream=None) -> None:
+        with self._lock:
+            if self.listener is not None:
+                return
+            log_queue: queue.Queue = queue.Queue(queue_size)
+            output = logging.StreamHandler(stream or sys.stdout)
+            output.setFormatter(JsonFormatter())
+            self.handler = AsyncQueueHandler(log_queue)
+            self.handler.addFilter(RequestContextFilter())
+            self.listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+
+            root = logging.getLogger()
+            root.addHandler(self.handler)
+            root.setLevel(level.upper())
+            self.listener.start()
+
+    def stop(self) -> None:
+        """Flush the queue and detach the handler"""
+        with self._lock:
+            if self.listener is None:
+                return
+            logging.getLogger().removeHandler(self.handler)
+            self.listener.stop()
+            self.listener = None
+
+    def stats(self) -> dict:
+        handler = self.handler
+        if handler is None or self.listener is None:
+            return {"running": False}
+        return {"running": True, "queued": handler.queue.qsize(), "dropped": handler.dropped}
+
+class RequestContextMiddleware:
+    """ASGI middleware: request ID, sampling decision and stage timings for each HTTP request.
+
+    The request ID comes from the ``X-Request-ID`` header (or is generated)
+    and is echoed in the response. One ``request completed`` record per
+    request carries the status, the duration and the stage timings.
+    """
+
+    def __init__(self, app, sample_rate=lambda: 1.0):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.logger = logging.getLogger("app.requests")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope.get("headers", ()):
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")[:128]
+                break
+        request_id = request_id or uuid.uuid4().hex
+        stages: Dict[str, float] = {}
+        tokens = (
+            request_id_var.set(request_id),
+            sampled_var.set(random.random() < self.sample_rate()),
+            stages_var.set(stages),
+        )
+        status = {"code": 500}
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                headers = list(message.get("headers", ()))
+                headers.append((REQUEST_ID_HEADER.lower().encode(), request_id.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            duration_ms = round((time.perf_counter() - start) * 1000, 3)
+            level = logging.ERROR if status["code"] >= 500 else logging.INFO
+            self.logger.log(level, "request completed", extra={
+                "method": scope.get("method"),
+                "path": scope.get("path"),
+                "status": status["code"],
+                "duration_ms": duration_ms,
+                "stages": dict(stages),
+            })
+            for var, token in zip((request_id_var, sampled_var, stages_var), tokens):
+                var.reset(token)
+
+logging_service = LoggingService()
@@ -0,0 +1,25 @@
+import logging
+from functools import lru_cache
+from typing import List
+from nltk.tokenize import word_tokenize
+
+logger = logging.getLogger(__name__)
+
+@lru_cache(maxsize=1)
+def punkt_available() -> bool:
+    """Whether NLTK's punkt data is installed (checked once, the lookup is slow)"""
+    try:
+        word_tokenize("a")
+        return True
+    except LookupError:
+        logger.warning("NLTK punkt data not found, texts are tokenized on whitespace")
+        return False
+
+def word_tokens(text: str) -> List[str]:
+    """Lower-cased word tokens shared by jaccard_sim, the jaccard matrix and the similarity join.
+
+    NLTK's word_tokenize when punkt is installed, a whitespace split otherwise.
+    """
+    if punkt_available():
+        return word_tokenize(text.lower())
+    return text.lower().split()
@@ -1,7 +1,10 @@
-from fastapi import FastAPI
-from fastapi.responses import HTMLResponse
-from app.api.endpoints import router as api_router
-from app.config import Config
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse, JSONResponse
+from app.api.endpoints import memory_profiler, router as api_router, shutdown_background_workers
+from app.api.websocket import router as ws_router
+from app.config import Config, ConfigWatcher
+from app.core.bulkhead import BulkheadRejected
+from app.core.structured_logging import RequestContextMiddleware, logging_service
 
 app = FastAPI(
     title="AI Similarity Service",
@@ -10,10 +13,39 @@ app = FastAPI(
 )
 
 app.include_router(api_router, prefix="/api")
+app.include_router(ws_router, prefix="/api")
+# ID de requête, échantillonnage des logs et durées par étape (LOG_SAMPLE_RATE rechargeable)
+app.add_middleware(RequestContextMiddleware, sample_rate=lambda: Config.snapshot.LOG_SAMPLE_RATE)
+
+config_watcher = ConfigWatcher()
+
+@app.exception_handler(BulkheadRejected)
+async def bulkhead_rejected(request: Request, exc: BulkheadRejected):
+    """Saturated pool: 503 with Retry-After instead of queueing without limit"""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc), "pool": exc.pool},
+        headers={"Retry-After": str(max(1, round(exc.retry_after)))}
+    )
+
+@app.on_event("startup")
+def startup():
+    # Logs JSON écrits par un thread dédié : formatage et I/O hors du chemin des requêtes
+    logging_service.start(Config.LOG_LEVEL, Config.LOG_QUEUE_SIZE)
+    # Rechargement automatique quand le fichier .env change (CONFIG_WATCH_INTERVAL)
+    config_watcher.start()
+    if Config.MEMORY_PROFILING:
+        memory_profiler.start_tracing(Config.MEMORY_TRACE_FRAMES)
+
+@app.on_event("shutdown")
+def shutdown():
+    config_watcher.stop()
+    shutdown_background_workers()
+    logging_service.stop()
 
 @app.get("/health")
 def health_check():
-    return {"status": "healthy", "port": Config.PORT}
+    return {"status": "healthy", "port": Config.snapshot.PORT}
 
 @app.get("/", response_class=HTMLResponse)
 def home():
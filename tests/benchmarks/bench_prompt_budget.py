@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark du budget de tokens des prompts LLM avec un LLM simulé.
+
+Le LLM simulé répond avec une latence proportionnelle au nombre de tokens du
+prompt (comme une API réelle), ce qui permet de comparer l'ancien prompt
+verbeux contenant les textes complets au prompt compact et budgété.
+
+Exécution : python tests/benchmarks/bench_prompt_budget.py
+"""
+
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.core.commentary import build_commentary_prompt
+from app.core.llm_proxy import LLMClient
+from app.core.prompt_budget import count_tokens
+
+BASE_LATENCY_S = 0.005
+PER_PROMPT_TOKEN_S = 0.00005
+
+class MockCompletions:
+    def create(self, model, messages, max_tokens, temperature):
+        prompt = messages[0]["content"]
+        prompt_tokens = count_tokens(prompt)
+        time.sleep(BASE_LATENCY_S + PER_PROMPT_TOKEN_S * prompt_tokens)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content='{"similarity_score": 0.5}'))],
+            usage=SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=8)
+        )
+
+def legacy_commentary_prompt(text1, text2, metric, similarity, threshold, above_threshold):
+    """Prompt d'origine : textes complets et instructions verbeuses"""
+    threshold_status = "above threshold (similar texts)" if above_threshold else "below threshold (dissimilar texts)"
+    return f"""
+            Analyze and provide commentary on this text similarity comparison:
+            
+            Text 1: "{text1}"
+            Text 2: "{text2}"
+            
+            Similarity Analysis:
+            - Method used: {metric}
+            - Similarity score: {similarity:.3f}
+            - Threshold: {threshold}
+            - Result: {threshold_status}
+            
+            Please provide a brief, insightful commentary explaining:
+            - What makes these texts similar or different
+            - Key semantic connections or differences
+            - Why the similarity score makes sense for these texts
+            
+            Keep your response concise (2-3 sentences).
+            """
+
+def run(label, build_prompt, client, text1, text2, iterations):
+    client.usage = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0}
+    start = time.perf_counter()
+    for _ in range(iterations):
+        client.generate(build_prompt(text1, text2, "cosine", 0.42, 0.7, False))
+    elapsed = time.perf_counter() - start
+    usage = client.usage_summary()
+    print(f"{label:<28} {elapsed / iterations * 1000:8.2f} ms/call   {usage['avg_prompt_tokens']:8.1f} prompt tokens")
+
+def main():
+    client = LLMClient()
+    client.client = SimpleNamespace(chat=SimpleNamespace(completions=MockCompletions()))
+
+    sentence = "Distributed systems replicate data across nodes to tolerate failures and scale reads. "
+    for length in (200, 1000, 4000):
+        text = (sentence * (length // len(sentence) + 1))[:length]
+        print(f"\n--- inputs of {length} characters ---")
+        run("legacy prompt", legacy_commentary_prompt, client, text, text, 20)
+        run("budgeted prompt", build_commentary_prompt, client, text, text, 20)
+
+if __name__ == "__main__":
+    main()
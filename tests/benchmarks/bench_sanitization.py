@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Benchmark du nettoyage par lots (Sanitizer.sanitize_inputs) contre un appel
+de Sanitizer.sanitize_input par texte, sur des textes sans balises puis avec
+balises et caractères spéciaux. Vérifie que les résultats sont identiques.
+
+Exécution : python tests/benchmarks/bench_sanitization.py [nombre_de_textes]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.config import ConfigSnapshot
+from app.core.sanitization import Sanitizer
+
+WORDS = ("model data learning deep network neural text vector score metric service "
+         "request cache token prompt language machine training inference batch").split()
+
+def make_texts(n, extra=(), seed=0):
+    rng = random.Random(seed)
+    vocabulary = WORDS + list(extra)
+    return [" ".join(rng.choice(vocabulary) for _ in range(rng.randint(6, 30))) for _ in range(n)]
+
+def one_by_one(texts, config):
+    cleaned, errors = [], []
+    for text in texts:
+        try:
+            cleaned.append(Sanitizer.sanitize_input(text, config))
+            errors.append(None)
+        except ValueError as e:
+            cleaned.append(None)
+            errors.append(str(e))
+    return cleaned, errors
+
+def best_time(fn, repeat=7):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+def main():
+    n_texts = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    config = ConfigSnapshot({"BLACKLIST": "malicious,hack,spam,exploit"})
+    print(f"{n_texts} textes, liste noire de {len(config.BLACKLIST)} mots\n")
+    print(f"{'textes':<18}{'un par un (ms)':>16}{'par lots (ms)':>16}{'gain':>8}")
+    for label, extra in (("sans balises", ()), ("balises, & et '", ("<b>hi</b>", "&", "don't", "spam"))):
+        texts = make_texts(n_texts, extra)
+        assert Sanitizer.sanitize_inputs(texts, config) == one_by_one(texts, config)
+        single_ms = best_time(lambda: one_by_one(texts, config))
+        batch_ms = best_time(lambda: Sanitizer.sanitize_inputs(texts, config))
+        print(f"{label:<18}{single_ms:>16.1f}{batch_ms:>16.1f}{single_ms / batch_ms:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la jointure par similarité (app.core.simjoin) contre la force brute.
+
+Corpus synthétique : vocabulaire à fréquences de Zipf, 10 % de quasi-doublons
+(quelques mots remplacés). Compare, pour chaque seuil, le temps de la jointure
+PPJoin, le nombre de candidats vérifiés face aux n(n-1)/2 paires, et le temps
+d'un produit creux d'incidence par blocs de lignes (même calcul que
+/api/similarity-matrix en mode threshold). Vérifie que les paires sont identiques.
+
+Exécution : python tests/benchmarks/bench_simjoin.py [nombre_de_textes]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import numpy as np
+from sklearn.feature_extraction.text import CountVectorizer
+
+from app.core.simjoin import SimilarityJoin
+
+def make_corpus(n, seed=0):
+    rng = random.Random(seed)
+    vocabulary = [f"w{i}" for i in range(5000)]
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+    texts = [" ".join(rng.choices(vocabulary, weights, k=rng.randint(8, 30))) for _ in range(n)]
+    for i in range(n // 10):
+        words = texts[rng.randrange(n)].split()
+        for _ in range(rng.randint(0, 2)):
+            words[rng.randrange(len(words))] = rng.choice(vocabulary)
+        texts[i] = " ".join(words)
+    return texts
+
+def sparse_jaccard_pairs(texts, threshold):
+    """Toutes les intersections par produit creux, puis filtrage (force brute vectorisée)"""
+    vectors = CountVectorizer(tokenizer=str.split, token_pattern=None, lowercase=False,
+                              binary=True).fit_transform(texts).tocsr().astype(np.float64)
+    sizes = np.asarray(vectors.sum(axis=1)).ravel()
+    vectors_t = vectors.T.tocsc()
+    pairs = []
+    for start in range(0, vectors.shape[0], 1000):
+        block = (vectors[start:start + 1000] @ vectors_t).tocoo()
+        rows = block.row + start
+        scores = block.data / (sizes[rows] + sizes[block.col] - block.data)
+        keep = (block.col > rows) & (scores >= threshold)
+        pairs.extend(zip(rows[keep].tolist(), block.col[keep].tolist()))
+    return sorted(pairs)
+
+def main():
+    n_texts = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    texts = make_corpus(n_texts)
+    total_pairs = n_texts * (n_texts - 1) // 2
+    print(f"{n_texts} textes, {total_pairs} paires\n")
+    print(f"{'seuil':>6}{'ppjoin (ms)':>14}{'candidats':>12}{'% paires':>10}{'paires':>9}{'creux (ms)':>12}")
+
+    for threshold in (0.5, 0.7, 0.8, 0.9):
+        start = time.perf_counter()
+        join = SimilarityJoin(texts, "jaccard", tokenizer=str.split)
+        pairs = join.join(threshold)
+        join_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        expected = sparse_jaccard_pairs(texts, threshold)
+        sparse_ms = (time.perf_counter() - start) * 1000
+        assert [(i, j) for i, j, _ in pairs] == expected
+
+        share = join.stats["candidates"] / total_pairs * 100
+        print(f"{threshold:>6}{join_ms:>14.0f}{join.stats['candidates']:>12}{share:>9.4f}%"
+              f"{len(pairs):>9}{sparse_ms:>12.0f}")
+
+if __name__ == "__main__":
+    main()
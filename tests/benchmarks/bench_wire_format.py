@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Benchmark des formats d'échange de /api/similarity-batch pour 10 000 paires.
+
+Compare la taille des corps de requête et de réponse et le temps CPU serveur
+en JSON, MessagePack et float32 packé :
+- "codec" : décodage + validation du corps et encodage de la réponse seuls,
+  comme FastAPI les fait (json.loads / jsonable_encoder + JSONResponse) ;
+- "requête complète" : appel de l'endpoint en processus via TestClient
+  (corps pré-encodés, le scoring cosine est inclus et identique pour tous).
+
+Exécution : python tests/benchmarks/bench_wire_format.py [nombre_de_paires]
+"""
+
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import msgpack
+import numpy as np
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+
+from app.api.endpoints import SimilarityBatchRequest
+from app.api.wire import FLOAT32, JSON, MSGPACK
+from app.main import app
+
+WORDS = ("model data learning deep network neural text vector score metric service "
+         "request cache token prompt language machine training inference batch").split()
+
+def make_pairs(n, seed=0):
+    rng = random.Random(seed)
+
+    def sentence():
+        return " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 16)))
+    return [{"prompt1": sentence(), "prompt2": sentence()} for _ in range(n)]
+
+def cpu_time(fn, repeat=5):
+    """Meilleur temps CPU (process_time) sur ``repeat`` exécutions, en ms"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.process_time()
+        fn()
+        best = min(best, time.process_time() - start)
+    return best * 1000
+
+def main():
+    n_pairs = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    payload = {"pairs": make_pairs(n_pairs), "metric": "cosine"}
+    client = TestClient(app)
+
+    bodies = {
+        JSON: json.dumps(payload).encode("utf-8"),
+        MSGPACK: msgpack.packb(payload)
+    }
+    response_json = client.post("/api/similarity-batch", content=bodies[JSON],
+                                headers={"Content-Type": JSON}).json()
+    scores = np.array([r.get("similarity_score", np.nan) for r in response_json["results"]], dtype="<f4")
+    responses = {
+        JSON: JSONResponse(response_json).body,
+        MSGPACK: msgpack.packb(response_json),
+        FLOAT32: scores.tobytes()
+    }
+
+    print(f"=== /api/similarity-batch, {n_pairs} paires (metric cosine) ===\n")
+    print(f"{'Format':<38}{'Requête':>12}{'Réponse':>12}")
+    for media_type in (JSON, MSGPACK, FLOAT32):
+        # float32 ne concerne que la réponse : requête envoyée en MessagePack
+        request_size = len(bodies.get(media_type, bodies[MSGPACK]))
+        print(f"{media_type:<38}{request_size / 1024:>10.1f}Ko{len(responses[media_type]) / 1024:>10.1f}Ko")
+
+    print(f"\n{'CPU serveur codec (ms)':<38}{'Décodage':>12}{'Encodage':>12}")
+    decode = {
+        JSON: lambda: SimilarityBatchRequest.model_validate(json.loads(bodies[JSON])),
+        MSGPACK: lambda: SimilarityBatchRequest.model_validate(msgpack.unpackb(bodies[MSGPACK])),
+    }
+    encode = {
+        JSON: lambda: JSONResponse(jsonable_encoder(response_json)),
+        MSGPACK: lambda: msgpack.packb(response_json, use_bin_type=True),
+        FLOAT32: lambda: np.array([r.get("similarity_score", np.nan) for r in response_json["results"]],
+                                  dtype="<f4").tobytes(),
+    }
+    for media_type in (JSON, MSGPACK, FLOAT32):
+        decode_ms = cpu_time(decode.get(media_type, decode[MSGPACK]))
+        print(f"{media_type:<38}{decode_ms:>12.1f}{cpu_time(encode[media_type]):>12.1f}")
+
+    print(f"\n{'Requête complète (ms CPU)':<38}{'Total':>12}")
+    for request_type, accept in ((JSON, JSON), (MSGPACK, MSGPACK), (MSGPACK, FLOAT32)):
+        headers = {"Content-Type": request_type, "Accept": accept}
+        elapsed = cpu_time(lambda: client.post("/api/similarity-batch", content=bodies[request_type],
+                                               headers=headers), repeat=3)
+        print(f"{request_type.split('/')[1] + ' -> ' + accept.split('/')[1]:<38}{elapsed:>12.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,15 @@
+import json
+import time
 from fastapi.testclient import TestClient
+from app.config import Config, ConfigSnapshot, read_environment
 from app.main import app
 
 client = TestClient(app)
 
+def use_config(monkeypatch, **overrides):
+    """Install a snapshot of the current environment with ``overrides`` (undone by monkeypatch)"""
+    monkeypatch.setattr(Config, "snapshot", ConfigSnapshot(read_environment(overrides), Config.snapshot.version))
+
 def test_similarity_endpoint():
     response = client.post(
         "/api/similarity-check",
@@ -39,4 +46,469 @@ def test_blacklisted_input():
     )
     # This test may pass if no blacklist is configured
     # We'll just check that it returns a valid response
-    assert response.status_code in [200, 400]
\ No newline at end of file
+    assert response.status_code in [200, 400]
+def test_similarity_matrix_endpoint():
+    response = client.post(
+        "/api/similarity-matrix",
+        json={
+            "texts": ["machine learning", "deep learning", "cooking pasta"],
+            "metric": "cosine"
+        }
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["size"] == 3
+    assert len(data["matrix"]) == 3
+    assert data["matrix"][0][0] == 1.0
+
+def test_similarity_matrix_top_k():
+    response = client.post(
+        "/api/similarity-matrix",
+        json={
+            "texts": ["machine learning", "deep learning", "cooking pasta"],
+            "mode": "top_k",
+            "top_k": 1
+        }
+    )
+    assert response.status_code == 200
+    neighbors = response.json()["neighbors"]
+    assert neighbors[0][0]["index"] == 1
+
+def test_pairwise_matrix_metrics_are_capped(monkeypatch):
+    use_config(monkeypatch, MATRIX_MAX_PAIRWISE_TEXTS="3")
+    texts = ["kitten", "sitting", "mitten", "bitten"]
+    response = client.post("/api/similarity-matrix",
+                           json={"texts": texts, "metric": "levenshtein", "mode": "top_k", "top_k": 1})
+    assert response.status_code == 413
+    response = client.post("/api/similarity-matrix",
+                           json={"texts": texts[:3], "metric": "levenshtein", "mode": "top_k", "top_k": 1})
+    assert response.status_code == 200
+    # Le plafond ne concerne que les metrics calculés paire par paire
+    assert client.post("/api/similarity-matrix", json={"texts": texts, "metric": "jaccard"}).status_code == 200
+
+def test_similarity_matrix_requires_mode_parameter():
+    response = client.post(
+        "/api/similarity-matrix",
+        json={"texts": ["a b", "b c"], "mode": "threshold"}
+    )
+    assert response.status_code == 400
+
+def test_similarity_bulk_streams_ndjson():
+    body = "\n".join([
+        '{"id": 1, "prompt1": "machine learning", "prompt2": "machine learning", "metric": "cosine"}',
+        '{"id": 2, "prompt1": "cats", "prompt2": "stock markets", "metric": "cosine"}',
+        'not json',
+    ]) + "\n"
+    response = client.post(
+        "/api/similarity-bulk",
+        content=body,
+        headers={"Content-Type": "application/x-ndjson"}
+    )
+    assert response.status_code == 200
+    results = [json.loads(line) for line in response.text.splitlines()]
+    assert [r["line"] for r in results] == [1, 2, 3]
+    assert results[0]["similarity_score"] == 1.0
+    assert "error" in results[2]
+
+def test_similarity_bulk_runs_on_the_metric_bulkheads(monkeypatch):
+    from app.api import endpoints
+    from app.core.bulkhead import Bulkhead
+    saturated = Bulkhead("llm", max_concurrency=1, max_queue=0, queue_timeout=0.01)
+    saturated.active = 1
+    monkeypatch.setitem(endpoints.bulkheads.bulkheads, "llm", saturated)
+    admitted = endpoints.bulkheads["cpu"].snapshot()["admitted"]
+    body = "\n".join([
+        '{"id": 1, "prompt1": "machine learning", "prompt2": "machine learning", "metric": "cosine"}',
+        '{"id": 2, "prompt1": "machine learning", "prompt2": "deep learning", "metric": "direct_llm"}',
+    ]) + "\n"
+
+    response = client.post("/api/similarity-bulk", content=body, headers={"Content-Type": "application/x-ndjson"})
+    results = [json.loads(line) for line in response.text.splitlines()]
+    assert response.status_code == 200
+    assert results[0]["similarity_score"] == 1.0
+    assert results[1]["line"] == 2 and results[1]["id"] == 2
+    assert "llm pool saturated" in results[1]["error"]
+    assert endpoints.bulkheads["cpu"].snapshot()["admitted"] == admitted + 1
+    saturated.shutdown()
+
+def test_job_lifecycle(tmp_path, monkeypatch):
+    from app.api import endpoints
+    monkeypatch.setattr(Config, "JOBS_DIR", str(tmp_path))
+    monkeypatch.setattr(endpoints, "_job_manager", None)
+
+    response = client.post(
+        "/api/jobs",
+        json={
+            "pairs": [{"prompt1": "deep learning", "prompt2": "deep learning"}] * 3,
+            "metric": "cosine"
+        }
+    )
+    assert response.status_code == 202
+    job_id = response.json()["id"]
+
+    for _ in range(200):
+        job = client.get(f"/api/jobs/{job_id}").json()
+        if job["status"] == "completed":
+            break
+        time.sleep(0.01)
+    assert job["progress"] == 1.0
+
+    page = client.get(f"/api/jobs/{job_id}/results", params={"page": 1, "page_size": 2}).json()
+    assert [r["index"] for r in page["results"]] == [0, 1]
+    assert page["results"][0]["similarity_score"] == 1.0
+
+    assert client.get("/api/jobs/unknown").status_code == 404
+    endpoints.get_job_manager().shutdown()
+
+def test_commentary_none_skips_llm():
+    response = client.post(
+        "/api/similarity-check",
+        json={"prompt1": "AI", "prompt2": "ML", "metric": "cosine", "commentary": "none"}
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["llm_response"] is None
+    assert data["commentary_id"] is None
+
+def test_commentary_deferred_returns_result_id():
+    response = client.post(
+        "/api/similarity-check",
+        json={"prompt1": "AI", "prompt2": "ML", "metric": "cosine", "commentary": "deferred"}
+    )
+    assert response.status_code == 200
+    commentary_id = response.json()["commentary_id"]
+    assert commentary_id
+
+    result = client.get(f"/api/commentary/{commentary_id}")
+    assert result.status_code == 200
+    assert result.json()["status"] in ("pending", "ready", "failed")
+    assert client.get("/api/commentary/unknown").status_code == 404
+
+def test_invalid_commentary_mode():
+    response = client.post(
+        "/api/similarity-check",
+        json={"prompt1": "AI", "prompt2": "ML", "commentary": "sometimes"}
+    )
+    assert response.status_code == 400
+
+def test_edit_distance_metric_endpoint():
+    response = client.post(
+        "/api/similarity-check",
+        json={"prompt1": "kitten", "prompt2": "sitting", "metric": "levenshtein", "commentary": "none"}
+    )
+    assert response.status_code == 200
+    assert response.json()["similarity_score"] == round(1 - 3 / 7, 4)
+
+def test_admin_reload_config(tmp_path, monkeypatch):
+    from app import config as config_module
+    env_file = tmp_path / ".env"
+    env_file.write_text("SIMILARITY_THRESHOLD=0.25\n")
+    use_config(monkeypatch, ADMIN_TOKEN="secret")
+    monkeypatch.setattr(config_module, "ENV_FILE", str(env_file))
+
+    assert client.post("/api/admin/reload-config").status_code == 403
+    try:
+        response = client.post("/api/admin/reload-config", headers={"X-Admin-Token": "secret"})
+        assert response.status_code == 200
+        assert response.json()["status"] == "reloaded"
+
+        assert "SIMILARITY_THRESHOLD" in response.json()["changed"]
+
+        # Les requêtes sans threshold prennent la nouvelle valeur par défaut
+        response = client.post(
+            "/api/similarity-check",
+            json={"prompt1": "AI", "prompt2": "ML", "commentary": "none"}
+        )
+        assert response.json()["threshold"] == 0.25
+    finally:
+        monkeypatch.undo()
+        Config.reload()
+
+def test_admin_memory_report_and_diff(monkeypatch):
+    use_config(monkeypatch, ADMIN_TOKEN="secret")
+    admin = {"X-Admin-Token": "secret"}
+    assert client.get("/api/admin/memory").status_code == 403
+    response = client.get("/api/admin/memory", headers=admin)
+    assert response.status_code == 200
+    assert {"similarity", "commentary", "jobs"} <= set(response.json()["components"])
+
+    assert client.post("/api/admin/memory/snapshots", params={"name": "start"}, headers=admin).status_code == 200
+    diff = client.get("/api/admin/memory/diff", params={"start": "start"}, headers=admin)
+    assert diff.status_code == 200
+    assert "components" in diff.json()
+    assert client.get("/api/admin/memory/diff", params={"start": "missing"}, headers=admin).status_code == 404
+
+def test_health_detailed_reuses_the_shared_calculator():
+    listeners = len(Config._listeners)
+    for _ in range(3):
+        assert client.get("/api/health-detailed").json()["status"] == "healthy"
+    assert len(Config._listeners) == listeners
+
+def test_admin_endpoints_disabled_without_token(monkeypatch):
+    use_config(monkeypatch, ADMIN_TOKEN="")
+    response = client.post("/api/admin/reload-config", headers={"X-Admin-Token": ""})
+    assert response.status_code == 403
+    assert "disabled" in response.json()["detail"]
+    assert client.get("/api/admin/memory").status_code == 403
+
+def test_score_store_serves_repeated_pairs(tmp_path, monkeypatch):
+    from app.api import endpoints
+    from app.core.score_store import ScoreStore
+    monkeypatch.setattr(endpoints, "score_store", ScoreStore(str(tmp_path / "scores.bin")))
+    payload = {"prompt1": "kitten", "prompt2": "sitting", "metric": "levenshtein", "commentary": "none"}
+
+    first = client.post("/api/similarity-check", json=payload).json()
+    second = client.post("/api/similarity-check", json=payload).json()
+    assert first["decided_by"] == "levenshtein"
+    assert second["decided_by"] == "score_store"
+    assert second["similarity_score"] == first["similarity_score"]
+
+def test_score_store_skips_failed_llm_calls(tmp_path, monkeypatch):
+    from unittest.mock import MagicMock
+    from app.api import endpoints
+    from app.core.score_store import ScoreStore
+    store = ScoreStore(str(tmp_path / "scores.bin"))
+    monkeypatch.setattr(endpoints, "score_store", store)
+    failing = MagicMock()
+    failing.chat.completions.create.side_effect = RuntimeError("Error code: 503 - 0.9")
+    monkeypatch.setattr(endpoints.sim_calculator.llm_client, "client", failing)
+    payload = {"prompt1": "deep learning", "prompt2": "neural networks", "metric": "direct_llm", "commentary": "none"}
+
+    for _ in range(2):
+        assert client.post("/api/similarity-check", json=payload).json()["decided_by"] == "fallback"
+    assert store.stats()["entries"] == 0
+
+def test_similarity_batch_wire_formats(monkeypatch):
+    import msgpack
+    import numpy as np
+    use_config(monkeypatch, BLACKLIST="malicious")
+    payload = {
+        "pairs": [
+            {"prompt1": "deep learning", "prompt2": "deep learning"},
+            {"prompt1": "this is malicious", "prompt2": "safe"}
+        ],
+        "metric": "cosine"
+    }
+
+    data = client.post("/api/similarity-batch", json=payload).json()
+    assert data["count"] == 2 and data["errors"] == 1
+    assert data["results"][0]["similarity_score"] == 1.0
+    assert "error" in data["results"][1]
+
+    response = client.post(
+        "/api/similarity-batch",
+        content=msgpack.packb(payload),
+        headers={"Content-Type": "application/msgpack", "Accept": "application/msgpack"}
+    )
+    assert response.headers["content-type"] == "application/msgpack"
+    assert msgpack.unpackb(response.content) == data
+
+    response = client.post(
+        "/api/similarity-batch", json=payload,
+        headers={"Accept": "application/vnd.similarity.float32"}
+    )
+    scores = np.frombuffer(response.content, dtype="<f4")
+    assert scores[0] == 1.0 and np.isnan(scores[1])
+    assert response.headers["x-error-count"] == "1"
+
+def test_matrix_float32_and_not_acceptable():
+    import numpy as np
+    texts = ["deep learning", "machine learning", "deep learning"]
+    response = client.post(
+        "/api/similarity-matrix", json={"texts": texts},
+        headers={"Accept": "application/vnd.similarity.float32"}
+    )
+    matrix = np.frombuffer(response.content, dtype="<f4").reshape(3, 3)
+    assert response.headers["x-matrix-size"] == "3"
+    assert matrix[0, 2] == 1.0
+
+    response = client.post(
+        "/api/similarity-matrix", json={"texts": texts, "mode": "top_k", "top_k": 1},
+        headers={"Accept": "application/vnd.similarity.float32"}
+    )
+    assert response.status_code == 406
+
+def test_similarity_check_accepts_msgpack():
+    import msgpack
+    response = client.post(
+        "/api/similarity-check",
+        content=msgpack.packb({"prompt1": "AI", "prompt2": "AI", "commentary": "none"}),
+        headers={"Content-Type": "application/msgpack", "Accept": "application/msgpack"}
+    )
+    assert response.status_code == 200
+    assert msgpack.unpackb(response.content)["similarity_score"] == 1.0
+
+    response = client.post(
+        "/api/similarity-check", content=b"\xc1",
+        headers={"Content-Type": "application/msgpack"}
+    )
+    assert response.status_code == 400
+
+def test_websocket_similarity_queries(monkeypatch):
+    import msgpack
+    use_config(monkeypatch, BLACKLIST="malicious")
+    with client.websocket_connect("/api/ws/similarity") as ws:
+        ws.send_json({"id": 1, "prompt1": "deep learning", "prompt2": "deep learning", "metric": "cosine"})
+        ws.send_json([
+            {"id": "a", "prompt1": "AI", "prompt2": "malicious AI"},
+            {"id": "b", "prompt1": "AI", "prompt2": "AI", "threshold": 2},
+            {"id": "c", "prompt1": "AI", "prompt2": "AI", "metric": "unknown"}
+        ])
+        results = {}
+        for _ in range(4):
+            result = ws.receive_json()
+            results[result["id"]] = result
+
+        ws.send_bytes(msgpack.packb({"id": 2, "prompt1": "AI", "prompt2": "AI", "metric": "cosine"}))
+        binary = msgpack.unpackb(ws.receive_bytes())
+
+    assert results[1]["similarity_score"] == 1.0
+    assert results[1]["above_threshold"] is True
+    assert "Forbidden content" in results["a"]["error"]
+    assert "threshold" in results["b"]["error"]
+    assert "error" in results["c"]
+    assert binary["id"] == 2 and binary["similarity_score"] == 1.0
+
+def test_similarity_check_degrades_under_a_short_deadline(monkeypatch):
+    from unittest.mock import MagicMock
+    from app.api import endpoints
+    # Client LLM configuré (sans clé, _llm_score répondrait "fallback" avant de voir le délai)
+    llm = MagicMock()
+    monkeypatch.setattr(endpoints.sim_calculator.llm_client, "client", llm)
+    monkeypatch.setattr(endpoints.sim_calculator.llm_client, "min_budget", 0.5)
+    response = client.post(
+        "/api/similarity-check",
+        json={"prompt1": "deep learning", "prompt2": "deep learning models", "metric": "direct_llm"},
+        headers={"X-Request-Deadline-Ms": "50"}
+    )
+    data = response.json()
+    assert response.status_code == 200
+    assert data["decided_by"] == "deadline"
+    assert data["degraded"] is True
+    assert data["commentary_dropped"] is True
+    assert data["llm_response"] is None
+    assert llm.chat.completions.create.call_count == 0
+
+    response = client.post(
+        "/api/similarity-check",
+        json={"prompt1": "AI", "prompt2": "AI", "metric": "cosine", "commentary": "none"},
+        headers={"X-Request-Deadline-Ms": "soon"}
+    )
+    assert response.status_code == 400
+
+def test_request_id_is_echoed():
+    response = client.get("/health", headers={"X-Request-ID": "abc-123"})
+    assert response.headers["x-request-id"] == "abc-123"
+    assert len(client.get("/health").headers["x-request-id"]) == 32
+
+def test_saturated_bulkhead_returns_503(monkeypatch):
+    from app.api import endpoints
+    from app.core.bulkhead import Bulkhead
+    saturated = Bulkhead("cpu", max_concurrency=1, max_queue=0, queue_timeout=0.01)
+    saturated.active = 1
+    monkeypatch.setitem(endpoints.bulkheads.bulkheads, "cpu", saturated)
+
+    response = client.post("/api/similarity-matrix", json={"texts": ["a b", "b c"]})
+    assert response.status_code == 503
+    assert response.json()["pool"] == "cpu"
+    assert "retry-after" in response.headers
+
+    # Les metrics LLM ont leur propre pool, non saturé
+    stats = client.get("/api/health-detailed").json()["bulkheads"]
+    assert stats["cpu"]["rejected_full"] == 1
+    assert stats["llm"]["rejected_full"] == 0
+    saturated.shutdown()
+
+def test_saturated_llm_bulkhead_degrades_requests_with_a_deadline(monkeypatch):
+    from app.api import endpoints
+    from app.core.bulkhead import Bulkhead
+    saturated = Bulkhead("llm", max_concurrency=1, max_queue=0, queue_timeout=0.01)
+    saturated.active = 1
+    monkeypatch.setitem(endpoints.bulkheads.bulkheads, "llm", saturated)
+    payload = {"prompt1": "deep learning", "prompt2": "deep learning models", "metric": "direct_llm"}
+
+    response = client.post("/api/similarity-check", json={**payload, "deadline_ms": 3000})
+    data = response.json()
+    assert response.status_code == 200
+    assert data["decided_by"] == "deadline" and data["degraded"] is True
+    assert data["commentary_dropped"] is True and data["llm_response"] is None
+    cosine = endpoints.sim_calculator.cosine_sim("deep learning", "deep learning models")
+    assert data["similarity_score"] == round(cosine, 4)
+
+    # Sans délai, la saturation reste un 503
+    assert client.post("/api/similarity-check", json=payload).status_code == 503
+    saturated.shutdown()
+
+def test_traffic_capture_records_requests(tmp_path, monkeypatch):
+    from app.api import endpoints
+    from app.core.capture import TrafficCapture
+    capture = TrafficCapture(str(tmp_path / "capture.ndjson"))
+    monkeypatch.setattr(endpoints, "traffic_capture", capture)
+
+    client.post("/api/similarity-check", json={"prompt1": "deep learning", "prompt2": "neural networks",
+                                               "metric": "cosine", "commentary": "none"})
+    with client.websocket_connect("/api/ws/similarity") as ws:
+        ws.send_json({"id": 1, "prompt1": "deep learning", "prompt2": "AI", "metric": "jaccard"})
+        ws.receive_json()
+    assert client.get("/api/health-detailed").json()["capture"]["path"] == capture.path
+    capture.close()
+
+    lines = [json.loads(line) for line in open(capture.path, encoding="utf-8")]
+    assert [line.get("e") for line in lines[1:]] == ["check", "ws"]
+    assert lines[1]["p1"] == lines[2]["p1"]
+    assert "deep" not in open(capture.path, encoding="utf-8").read()
+
+def test_similarity_join_validation(monkeypatch):
+    use_config(monkeypatch, BLACKLIST="malicious")
+    response = client.post("/api/similarity-join", json={"texts": ["a b", "a b", "c d"], "threshold": 0.5})
+    assert response.status_code == 200
+    assert response.json()["pairs"] == [{"i": 0, "j": 1, "score": 1.0}]
+    response = client.post("/api/similarity-join", json={"texts": ["a b", "a c"], "threshold": 0.5, "metric": "cosine"})
+    assert response.status_code == 400
+    assert "set_cosine" in response.json()["detail"]
+    assert client.post("/api/similarity-join", json={"texts": ["a b"], "threshold": 0}).status_code == 422
+    assert client.post("/api/similarity-join", json={"texts": [], "threshold": 0.5}).status_code == 400
+    response = client.post("/api/similarity-join", json={"texts": ["AI", "malicious AI"], "threshold": 0.5})
+    assert response.status_code == 400
+
+def test_score_store_key_uses_the_loaded_embedding_model(tmp_path, monkeypatch):
+    from app.api import endpoints
+    from app.core.embeddings import EmbeddingService
+    from app.core.score_store import ScoreStore
+    monkeypatch.setattr(endpoints, "score_store", ScoreStore(str(tmp_path / "scores.bin")))
+    monkeypatch.setattr(endpoints.sim_calculator, "embeddings", EmbeddingService("hashing", batch_wait_ms=0))
+    payload = {"prompt1": "deep learning models", "prompt2": "deep learning model", "metric": "embedding",
+               "commentary": "none"}
+    assert client.post("/api/similarity-check", json=payload).json()["decided_by"] == "embedding"
+
+    # EMBEDDING_MODEL ne prend effet qu'au redémarrage : la clé suit le modèle chargé, pas la config
+    use_config(monkeypatch, EMBEDDING_MODEL="all-mpnet-base-v2")
+    assert client.post("/api/similarity-check", json=payload).json()["decided_by"] == "score_store"
+    # Un autre modèle chargé ne reçoit pas les scores de l'ancien
+    monkeypatch.setattr(endpoints.sim_calculator, "embeddings", EmbeddingService("hashing-128", batch_wait_ms=0))
+    assert client.post("/api/similarity-check", json=payload).json()["decided_by"] == "embedding"
+
+def test_embedding_metric_and_corpus_search(monkeypatch):
+    from app.api import endpoints
+    from app.core.embeddings import EmbeddingService
+    monkeypatch.setattr(endpoints.sim_calculator, "embeddings", EmbeddingService("hashing", batch_wait_ms=0))
+
+    response = client.post("/api/similarity-check", json={
+        "prompt1": "deep learning models", "prompt2": "deep learning model", "metric": "embedding",
+        "commentary": "none"
+    })
+    data = response.json()
+    assert response.status_code == 200
+    assert data["decided_by"] == "embedding"
+    assert 0.0 < data["similarity_score"] <= 1.0
+
+    documents = [{"id": "ml", "text": "machine learning models"}, {"id": "food", "text": "cooking fresh pasta"}]
+    response = client.post("/api/embeddings/docs/documents", json={"documents": documents})
+    assert response.json() == {"corpus": "docs", "added": 2, "size": 2}
+    results = client.post("/api/embeddings/docs/search", json={"query": "machine learning", "k": 1}).json()["results"]
+    assert [result["id"] for result in results] == ["ml"]
+
+    assert client.post("/api/embeddings/other/search", json={"query": "x"}).status_code == 404
+    assert client.delete("/api/embeddings/docs").status_code == 200
+    assert client.delete("/api/embeddings/docs").status_code == 404
+    assert "embeddings" in client.get("/api/health-detailed").json()
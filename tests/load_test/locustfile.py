@@ -1,6 +1,8 @@
-from locust import HttpUser, task, between
+from locust import HttpUser, task, between, events
+import os
 import random
 import json
+import requests
 
 class SimilarityServiceUser(HttpUser):
     wait_time = between(1, 3)
@@ -148,6 +150,48 @@ class ErrorTestUser(HttpUser):
             else:
                 response.failure(f"Expected 422 for missing field, got {response.status_code}")
 
+class MixedMetricUser(HttpUser):
+    """Cosine and LLM-backed requests side by side, to check that a slow LLM
+    does not raise cosine latency (bulkheads). Statistics are split by metric."""
+    wait_time = between(0.05, 0.2)
+    
+    def _check(self, metric):
+        payload = {
+            "prompt1": f"deep learning model {random.randint(1, 10000)}",
+            "prompt2": f"neural network training {random.randint(1, 10000)}",
+            "metric": metric,
+            "commentary": "none"
+        }
+        name = f"/api/similarity-check [{metric}]"
+        with self.client.post("/api/similarity-check", json=payload, name=name, catch_response=True) as response:
+            # 503 : pool LLM saturé, rejet volontaire et rapide
+            if response.status_code in (200, 503):
+                response.success()
+            else:
+                response.failure(f"Status code: {response.status_code}")
+    
+    @task(8)
+    def cosine(self):
+        self._check("cosine")
+    
+    @task(2)
+    def direct_llm(self):
+        self._check("direct_llm")
+
+@events.test_start.add_listener
+def schedule_llm_slowdown(environment, **kwargs):
+    """With LLM_STUB_URL set, slow the stub LLM down to LLM_SLOW_MS after LLM_SLOWDOWN_AFTER seconds"""
+    stub_url = os.getenv("LLM_STUB_URL")
+    if not stub_url:
+        return
+    import gevent
+    
+    def slow_down():
+        requests.post(f"{stub_url}/latency", json={"ms": float(os.getenv("LLM_SLOW_MS", 5000))}, timeout=5)
+        print(f"LLM stub slowed down to {os.getenv('LLM_SLOW_MS', 5000)} ms")
+    
+    gevent.spawn_later(float(os.getenv("LLM_SLOWDOWN_AFTER", 30)), slow_down)
+
 # Instructions pour utiliser le load testing:
 """
 Commandes pour effectuer le load testing:
@@ -170,4 +214,12 @@ Commandes pour effectuer le load testing:
 
 6. Test haute charge:
    locust -f tests/load_test/locustfile.py --host=http://localhost:8003 -u 50 -r 10 -t 120s HighLoadUser
+
+7. Bulkheads - cosine pendant un ralentissement du LLM (stub compatible OpenAI):
+   python tests/load_test/slow_llm_stub.py --port 8100 --latency-ms 300
+   LLM_BASE_URL=http://localhost:8100/v1 LLM_API_KEY=stub uvicorn app.main:app --port 8003
+   LLM_STUB_URL=http://localhost:8100 LLM_SLOWDOWN_AFTER=30 LLM_SLOW_MS=5000 \
+   locust -f tests/load_test/locustfile.py --host=http://localhost:8003 -u 100 -r 20 -t 60s \
+       --headless --csv-full-history --csv results/mixed MixedMetricUser
+   Comparer les percentiles de "[cosine]" avant et après le ralentissement (results/mixed_stats_history.csv)
 """
\ No newline at end of file
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Rejeu d'une capture de trafic (CAPTURE_PATH) contre l'application en processus
+ou un serveur en cours d'exécution.
+
+Les textes sont resynthétisés à partir de leur forme capturée (hash, longueur,
+nombre de mots) : même hash -> même texte, donc les répétitions (et les
+succès du cache / score store) sont reproduites, avec les longueurs réelles.
+
+    python tests/load_test/replay.py capture.ndjson                  # en processus, vitesse réelle
+    python tests/load_test/replay.py capture.ndjson --speed 10       # 10x plus vite
+    python tests/load_test/replay.py capture.ndjson --speed max --concurrency 128 \\
+        --url http://localhost:8003 --commentary none
+
+Rapporte le débit et les percentiles de latence (global et par metric).
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+# Vocabulaire des textes resynthétisés (sans mots de liste noire)
+WORDS = ("model data learning deep network neural text vector score metric service request cache "
+         "token prompt language machine training inference batch system analysis research product "
+         "customer search result quality image video review price order support account design "
+         "cloud storage security report market energy health travel music sport city").split()
+
+def load_capture(path: str) -> Tuple[dict, List[dict]]:
+    """(header, records) of a capture file, records sorted by arrival offset.
+
+    A file appended to by several sessions (or workers) holds several headers;
+    each session's offsets are kept relative to its own start.
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+    header: Optional[dict] = None
+    records = []
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            if "format" in entry:
+                header = header or entry
+                continue
+            records.append(entry)
+    if header is None:
+        raise ValueError(f"Not a capture file: {path}")
+    records.sort(key=lambda record: record["t"])
+    return header, records
+
+def synthesize_text(shape: dict) -> str:
+    """Deterministic text with the captured length and word count"""
+    length, n_words = shape["n"], max(1, shape["w"])
+    if length <= 0:
+        return ""
+    n_words = min(n_words, (length + 1) // 2)
+    rng = random.Random(shape["h"])
+    letters = length - (n_words - 1)
+    # Longueurs de mots : répartition aléatoire des lettres, au moins une par mot
+    cuts = sorted(rng.sample(range(1, letters), n_words - 1)) if n_words > 1 else []
+    sizes = [end - start for start, end in zip([0] + cuts, cuts + [letters])]
+    words = []
+    for size in sizes:
+        word = rng.choice(WORDS)
+        while len(word) < size:
+            word += rng.choice(WORDS)
+        words.append(word[:size])
+    return " ".join(words)
+
+def build_request(record: dict, commentary: Optional[str] = None) -> dict:
+    """/api/similarity-check body for a captured record"""
+    body = {
+        "prompt1": synthesize_text(record["p1"]),
+        "prompt2": synthesize_text(record["p2"]),
+        "metric": record["m"],
+        "threshold": record["th"],
+        "commentary": commentary or record.get("c") or "none"
+    }
+    if record.get("d") is not None:
+        body["deadline_ms"] = record["d"]
+    return body
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+async def replay(records: List[dict], client, speed: Optional[float] = 1.0, concurrency: int = 64,
+                 commentary: Optional[str] = None) -> Tuple[List[dict], float]:
+    """Send the records through ``client`` (httpx.AsyncClient); returns (results, duration in s).
+
+    ``speed``: 1.0 = captured pace, N = N times faster, None = as fast as
+    ``concurrency`` allows. Latency is measured from the moment a request is sent.
+    """
+    bodies = [build_request(record, commentary) for record in records]
+    slots = asyncio.Semaphore(concurrency)
+    results: List[dict] = []
+    start = time.perf_counter()
+    first_offset = records[0]["t"] if records else 0.0
+
+    async def send(record: dict, body: dict) -> None:
+        try:
+            sent = time.perf_counter()
+            try:
+                response = await client.post("/api/similarity-check", json=body)
+                status = response.status_code
+                decided_by = response.json().get("decided_by") if status == 200 else None
+            except Exception as e:
+                status, decided_by = type(e).__name__, None
+            results.append({"metric": record["m"], "status": status, "decided_by": decided_by,
+                            "latency_ms": (time.perf_counter() - sent) * 1000})
+        finally:
+            slots.release()
+
+    tasks = []
+    for record, body in zip(records, bodies):
+        if speed is not None:
+            delay = (record["t"] - first_offset) / speed - (time.perf_counter() - start)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        await slots.acquire()
+        tasks.append(asyncio.create_task(send(record, body)))
+    await asyncio.gather(*tasks)
+    return results, time.perf_counter() - start
+
+def summarize(results: List[dict], duration: float) -> dict:
+    """Throughput, status counts and latency percentiles (overall and per metric)"""
+    def latency_stats(items: List[dict]) -> Dict[str, float]:
+        latencies = sorted(item["latency_ms"] for item in items)
+        stats = {f"p{q}": round(percentile(latencies, q), 2) for q in (50, 90, 95, 99)}
+        stats["max"] = round(latencies[-1], 2) if latencies else 0.0
+        return stats
+
+    by_metric = defaultdict(list)
+    for result in results:
+        by_metric[result["metric"]].append(result)
+    return {
+        "requests": len(results),
+        "duration_s": round(duration, 3),
+        "throughput_rps": round(len(results) / duration, 1) if duration > 0 else 0.0,
+        "status": dict(Counter(str(result["status"]) for result in results)),
+        "decided_by": dict(Counter(result["decided_by"] for result in results if result["decided_by"])),
+        "latency_ms": latency_stats(results),
+        "metrics": {metric: {"requests": len(items), **latency_stats(items)} for metric, items in by_metric.items()}
+    }
+
+def print_report(summary: dict) -> None:
+    print(f"{summary['requests']} requêtes en {summary['duration_s']} s "
+          f"-> {summary['throughput_rps']} req/s")
+    print(f"Statuts : {summary['status']}   decided_by : {summary['decided_by']}")
+    print(f"\n{'':<14}{'requêtes':>10}{'p50':>10}{'p90':>10}{'p95':>10}{'p99':>10}{'max':>10}  (ms)")
+    rows = [("total", {"requests": summary["requests"], **summary["latency_ms"]})] + list(summary["metrics"].items())
+    for name, stats in rows:
+        print(f"{name:<14}{stats['requests']:>10}" + "".join(f"{stats[key]:>10.1f}" for key in
+                                                           ("p50", "p90", "p95", "p99", "max")))
+
+async def _run(args) -> dict:
+    import httpx
+
+    header, records = load_capture(args.capture)
+    if args.limit:
+        records = records[:args.limit]
+    speed = None if args.speed == "max" else float(args.speed)
+    print(f"Capture {args.capture}: {len(records)} requêtes (session du {time.ctime(header['started_at'])})")
+
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=args.timeout,
+                                   limits=httpx.Limits(max_connections=args.concurrency))
+    else:
+        from app.main import app
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://replay",
+                                   timeout=args.timeout)
+    async with client:
+        results, duration = await replay(records, client, speed, args.concurrency, args.commentary)
+    return summarize(results, duration)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("capture", help="Fichier de capture (.ndjson ou .ndjson.gz)")
+    parser.add_argument("--url", help="Serveur cible (par défaut : application en processus)")
+    parser.add_argument("--speed", default="1", help="Facteur de vitesse (1, 10, ...) ou 'max'")
+    parser.add_argument("--concurrency", type=int, default=64, help="Requêtes en vol au maximum")
+    parser.add_argument("--commentary", choices=("none", "deferred", "inline"),
+                        help="Force le mode de commentaire (par défaut : celui capturé)")
+    parser.add_argument("--limit", type=int, help="Ne rejoue que les N premières requêtes")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Timeout par requête (s)")
+    parser.add_argument("--json", action="store_true", help="Rapport en JSON")
+    args = parser.parse_args()
+
+    summary = asyncio.run(_run(args))
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print_report(summary)
+
+if __name__ == "__main__":
+    main()
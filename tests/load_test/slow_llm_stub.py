@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Faux serveur compatible OpenAI (chat completions) à latence réglable, pour
+simuler un ralentissement du LLM pendant un test de charge.
+
+    python tests/load_test/slow_llm_stub.py --port 8100 --latency-ms 300
+    # Service à tester :
+    LLM_BASE_URL=http://localhost:8100/v1 LLM_API_KEY=stub uvicorn app.main:app --port 8003
+    # Ralentissement en cours de test :
+    curl -X POST http://localhost:8100/latency -H "Content-Type: application/json" -d '{"ms": 5000}'
+"""
+
+import argparse
+import asyncio
+import time
+
+import uvicorn
+from fastapi import FastAPI
+from pydantic import BaseModel
+
+app = FastAPI(title="Slow LLM stub")
+state = {"latency_ms": 300.0, "calls": 0}
+
+class Latency(BaseModel):
+    ms: float
+
+@app.post("/v1/chat/completions")
+async def chat_completions(body: dict):
+    state["calls"] += 1
+    await asyncio.sleep(state["latency_ms"] / 1000)
+    content = '{"similarity_score": 0.5, "reasoning": "stub"}'
+    return {
+        "id": f"stub-{state['calls']}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "stub"),
+        "choices": [{"index": 0, "finish_reason": "stop",
+                     "message": {"role": "assistant", "content": content}}],
+        "usage": {"prompt_tokens": 40, "completion_tokens": 12, "total_tokens": 52}
+    }
+
+@app.post("/latency")
+async def set_latency(latency: Latency):
+    state["latency_ms"] = latency.ms
+    return state
+
+@app.get("/latency")
+async def get_latency():
+    return state
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    args = parser.parse_args()
+    state["latency_ms"] = args.latency_ms
+    uvicorn.run(app, host="0.0.0.0", port=args.port, log_level="warning")
@@ -0,0 +1,40 @@
+import asyncio
+import json
+from app.core.bulk import BulkScorer, iter_ndjson_chunks
+from app.core.similarity import SimilarityCalculator
+
+async def _stream(pieces):
+    for piece in pieces:
+        yield piece
+
+def _collect(pieces, chunk_size=2, max_line_bytes=64):
+    async def run():
+        return [chunk async for chunk in iter_ndjson_chunks(_stream(pieces), chunk_size, max_line_bytes)]
+    return asyncio.run(run())
+
+def test_lines_split_across_network_chunks():
+    chunks = _collect([b'{"a": 1}\n{"a"', b': 2}\n\n{"a": 3}'])
+    assert chunks == [[(1, b'{"a": 1}'), (2, b'{"a": 2}')], [(4, b'{"a": 3}')]]
+
+def test_oversized_line_is_reported_and_skipped():
+    chunks = _collect([b"x" * 50, b"y" * 50 + b"\n", b'{"a": 1}\n'], chunk_size=10)
+    assert chunks == [[(1, None), (2, b'{"a": 1}')]]
+
+def test_score_line_results_and_errors():
+    scorer = BulkScorer(SimilarityCalculator())
+
+    result = scorer.score_line(1, json.dumps({"id": "p1", "prompt1": "cat", "prompt2": "cat", "metric": "cosine"}).encode())
+    assert result["id"] == "p1"
+    assert result["similarity_score"] == 1.0
+    assert result["above_threshold"] is True
+
+    assert "Invalid JSON" in scorer.score_line(2, b"{not json")["error"]
+    assert "Invalid metric" in scorer.score_line(3, b'{"prompt1": "a", "prompt2": "b", "metric": "nope"}')["error"]
+    assert "exceeds" in scorer.score_line(4, None)["error"]
+
+def test_score_chunk_is_ndjson():
+    scorer = BulkScorer(SimilarityCalculator())
+    body = scorer.score_chunk([(1, b'{"prompt1": "a b", "prompt2": "a b", "metric": "cosine"}'), (2, b"[]")])
+    lines = [json.loads(line) for line in body.decode().splitlines()]
+    assert [line["line"] for line in lines] == [1, 2]
+    assert "error" in lines[1]
@@ -0,0 +1,56 @@
+import asyncio
+import threading
+import pytest
+from app.core.bulkhead import PRIORITY_BATCH, PRIORITY_BULK, PRIORITY_INTERACTIVE, Bulkhead, BulkheadRejected
+
+def test_waiters_are_served_by_priority_then_arrival():
+    bulkhead = Bulkhead("cpu", max_concurrency=1, max_queue=10, queue_timeout=5.0)
+    gate = threading.Event()
+    order = []
+
+    async def scenario():
+        blocker = asyncio.create_task(bulkhead.run(gate.wait))
+        await asyncio.sleep(0.05)
+        waiters = [
+            asyncio.create_task(bulkhead.run(order.append, "bulk", priority=PRIORITY_BULK)),
+            asyncio.create_task(bulkhead.run(order.append, "batch-1", priority=PRIORITY_BATCH)),
+            asyncio.create_task(bulkhead.run(order.append, "batch-2", priority=PRIORITY_BATCH)),
+            asyncio.create_task(bulkhead.run(order.append, "interactive", priority=PRIORITY_INTERACTIVE)),
+        ]
+        await asyncio.sleep(0.05)
+        assert bulkhead.snapshot()["queued"] == 4
+        gate.set()
+        await asyncio.gather(blocker, *waiters)
+
+    asyncio.run(scenario())
+    assert order == ["interactive", "batch-1", "batch-2", "bulk"]
+    stats = bulkhead.snapshot()
+    assert stats["active"] == 0 and stats["queued"] == 0
+    assert stats["completed"] == 5
+    bulkhead.shutdown()
+
+def test_full_queue_and_queue_timeout_are_rejected():
+    bulkhead = Bulkhead("llm", max_concurrency=1, max_queue=1, queue_timeout=5.0)
+    gate = threading.Event()
+
+    async def scenario():
+        blocker = asyncio.create_task(bulkhead.run(gate.wait))
+        await asyncio.sleep(0.05)
+        with pytest.raises(BulkheadRejected, match="no slot within"):
+            await bulkhead.run(sum, [1, 2], timeout=0.05)
+
+        waiter = asyncio.create_task(bulkhead.run(sum, [1, 2]))
+        await asyncio.sleep(0.01)
+        with pytest.raises(BulkheadRejected, match="queue full"):
+            await bulkhead.run(sum, [1, 2])
+        gate.set()
+        await blocker
+        return await waiter
+
+    assert asyncio.run(scenario()) == 3
+    stats = bulkhead.snapshot()
+    assert stats["rejected_timeout"] == 1
+    assert stats["rejected_full"] == 1
+    assert stats["active"] == 0
+    assert stats["queue_wait_ms_max"] > 0
+    bulkhead.shutdown()
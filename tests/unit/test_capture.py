@@ -0,0 +1,76 @@
+import asyncio
+import gzip
+import httpx
+from app.core.capture import CAPTURE_FORMAT, TrafficCapture
+from tests.load_test.replay import build_request, load_capture, replay, summarize, synthesize_text
+
+def test_capture_keeps_shapes_not_texts(tmp_path):
+    path = str(tmp_path / "capture.ndjson")
+    capture = TrafficCapture(path, hash_key="secret")
+    capture.record("check", "the secret plan", "another text", "cosine", 0.7, "none", 500.0)
+    capture.record("ws", "the secret plan", "other", "jaccard", 0.5)
+    capture.close()
+
+    content = open(path, encoding="utf-8").read()
+    assert "secret" not in content and "plan" not in content
+    header, records = load_capture(path)
+    assert header["format"] == CAPTURE_FORMAT
+    assert len(records) == 2
+    first, second = records
+    assert first["p1"] == second["p1"]
+    assert first["p1"]["n"] == len("the secret plan") and first["p1"]["w"] == 3
+    assert first["c"] == "none" and first["d"] == 500.0
+    assert "c" not in second and "d" not in second
+    assert capture.stats()["recorded"] == 2
+
+def test_capture_hash_key_changes_hashes(tmp_path):
+    shapes = []
+    for key in ("a", "b"):
+        path = str(tmp_path / f"{key}.ndjson.gz")
+        capture = TrafficCapture(path, hash_key=key)
+        capture.record("check", "same text", "same text", "cosine", 0.5)
+        capture.close()
+        with gzip.open(path, "rt") as f:
+            assert len(f.readlines()) == 2
+        shapes.append(load_capture(path)[1][0]["p1"]["h"])
+    assert shapes[0] != shapes[1]
+
+def test_capture_stops_at_max_bytes(tmp_path):
+    capture = TrafficCapture(str(tmp_path / "capture.ndjson"), max_bytes=300)
+    for _ in range(50):
+        capture.record("check", "text one", "text two", "cosine", 0.5)
+    capture.close()
+    stats = capture.stats()
+    assert stats["stopped"]
+    assert 0 < stats["recorded"] < 50
+
+def test_synthesized_text_matches_shape():
+    shape = {"h": "0123456789abcdef", "n": 57, "w": 9}
+    text = synthesize_text(shape)
+    assert len(text) == 57 and len(text.split()) == 9
+    assert synthesize_text(shape) == text
+    assert synthesize_text({**shape, "h": "fedcba9876543210"}) != text
+    assert synthesize_text({"h": "x", "n": 3, "w": 10}) != ""
+
+def test_replay_in_process_at_max_speed(tmp_path):
+    from app.main import app
+
+    path = str(tmp_path / "capture.ndjson")
+    capture = TrafficCapture(path)
+    for i in range(20):
+        capture.record("check", f"first text number {i % 5}", "second text", "cosine", 0.5, "none")
+    capture.close()
+    _, records = load_capture(path)
+    assert build_request(records[0])["commentary"] == "none"
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://replay") as client:
+            return await replay(records, client, speed=None, concurrency=8)
+
+    results, duration = asyncio.run(run())
+    summary = summarize(results, duration)
+    assert summary["requests"] == 20
+    assert summary["status"] == {"200": 20}
+    assert summary["metrics"]["cosine"]["requests"] == 20
+    assert summary["latency_ms"]["p50"] <= summary["latency_ms"]["p99"] <= summary["latency_ms"]["max"]
@@ -0,0 +1,47 @@
+import time
+from unittest.mock import MagicMock
+from app.core.commentary import CommentaryService, build_commentary_prompt
+
+def _wait_ready(service, result_id, timeout=5.0):
+    deadline = time.time() + timeout
+    while service.get(result_id)["status"] == "pending" and time.time() < deadline:
+        time.sleep(0.01)
+    return service.get(result_id)
+
+def test_prompt_contains_texts_and_score():
+    prompt = build_commentary_prompt("cats", "dogs", "cosine", 0.25, 0.7, False)
+    assert '"cats"' in prompt and '"dogs"' in prompt
+    assert "0.250" in prompt
+    assert "below threshold" in prompt
+
+def test_deferred_commentary_is_cached_by_score_bucket():
+    llm = MagicMock()
+    llm.complete.return_value = "Both texts are about pets."
+    service = CommentaryService(llm, max_workers=1)
+
+    first = service.submit("cats", "dogs", "cosine", 0.41, 0.7, False)
+    assert _wait_ready(service, first)["commentary"] == "Both texts are about pets."
+
+    # Same bucket: reused without a new LLM call
+    second = service.submit("cats", "dogs", "cosine", 0.42, 0.7, False)
+    assert second != first
+    assert service.get(second)["status"] == "ready"
+    assert llm.complete.call_count == 1
+
+    # Other metric: new call
+    third = service.submit("cats", "dogs", "jaccard", 0.42, 0.7, False)
+    _wait_ready(service, third)
+    assert llm.complete.call_count == 2
+    service.shutdown()
+
+def test_deferred_commentary_failure_and_unknown_id():
+    llm = MagicMock()
+    llm.complete.side_effect = RuntimeError("LLM service not configured")
+    service = CommentaryService(llm, max_workers=1)
+
+    result_id = service.submit("a", "b", "cosine", 0.1, 0.7, False)
+    result = _wait_ready(service, result_id)
+    assert result["status"] == "failed"
+    assert "not configured" in result["error"]
+    assert service.get("unknown") is None
+    service.shutdown()
@@ -0,0 +1,85 @@
+import pytest
+from app import config as config_module
+from app.config import BlacklistMatcher, Config, ConfigWatcher
+from app.core.llm_proxy import LLMClient
+from app.core.sanitization import Sanitizer
+
+@pytest.fixture
+def restore_config():
+    yield
+    Config.reload()
+
+def test_blacklist_matcher_reports_first_word_in_list_order():
+    matcher = BlacklistMatcher(["spam", "scam", "spa"])
+    assert matcher.find("a scam and some spam") == "spam"
+    assert matcher.find("a day at the spa") == "spa"
+    assert matcher.find("nothing to see") is None
+    assert BlacklistMatcher([]).find("spam") is None
+
+def test_blacklist_matcher_matches_substrings_like_before():
+    words = ["bad", "w.rd", "x+"]
+    matcher = BlacklistMatcher(words)
+    for text in ["badly", "w.rd", "word", "x+y", "xx", ""]:
+        expected = next((word for word in words if word in text), None)
+        assert matcher.find(text) == expected
+
+def test_snapshot_is_immutable():
+    with pytest.raises(AttributeError):
+        Config.snapshot.SIMILARITY_THRESHOLD = 0.1
+
+def test_reload_swaps_snapshot_and_class_attributes(restore_config):
+    previous = Config.snapshot
+    snapshot = Config.reload({"SIMILARITY_THRESHOLD": "0.42", "BLACKLIST": "foo,bar"})
+
+    assert Config.snapshot is snapshot
+    assert snapshot.version == previous.version + 1
+    assert Config.SIMILARITY_THRESHOLD == 0.42
+    assert Config.BLACKLIST == ("foo", "bar")
+    # L'ancien snapshot n'est pas modifié
+    assert previous.SIMILARITY_THRESHOLD != 0.42
+
+def test_invalid_reload_keeps_current_snapshot(restore_config):
+    previous = Config.snapshot
+    with pytest.raises(ValueError, match="Invalid configuration"):
+        Config.reload({"SIMILARITY_THRESHOLD": "not-a-number"})
+    with pytest.raises(ValueError, match="SIMILARITY_THRESHOLD"):
+        Config.reload({"SIMILARITY_THRESHOLD": "3"})
+    assert Config.snapshot is previous
+
+def test_in_flight_snapshot_keeps_old_blacklist(restore_config):
+    in_flight = Config.reload({"BLACKLIST": ""})
+    Config.reload({"BLACKLIST": "forbidden"})
+
+    assert Sanitizer.sanitize_input("forbidden fruit", in_flight) == "forbidden fruit"
+    with pytest.raises(ValueError, match="Forbidden content detected: forbidden"):
+        Sanitizer.sanitize_input("forbidden fruit")
+
+def test_llm_client_follows_reload(restore_config):
+    Config.reload({"LLM_API_KEY": "sk-first"})
+    client = LLMClient()
+    openai_client = client.client
+
+    Config.reload({"LLM_API_KEY": "sk-first", "LLM_MODEL": "gpt-4o-mini"})
+    assert client.model == "gpt-4o-mini"
+    assert client.client is openai_client
+
+    Config.reload({"LLM_API_KEY": "sk-second"})
+    assert client.client is not openai_client
+
+def test_watcher_reloads_when_env_file_changes(restore_config, tmp_path, monkeypatch):
+    env_file = tmp_path / ".env"
+    env_file.write_text("SIMILARITY_THRESHOLD=0.6\n")
+    monkeypatch.setattr(config_module, "ENV_FILE", str(env_file))
+    watcher = ConfigWatcher(str(env_file), interval=0)
+
+    assert watcher.check() is False
+    env_file.write_text("SIMILARITY_THRESHOLD=0.55\n")
+    watcher._mtime = None  # mtime à la seconde près sur certains systèmes de fichiers
+    assert watcher.check() is True
+    assert Config.SIMILARITY_THRESHOLD == 0.55
+
+    # Valeur invalide : rejetée, la configuration précédente reste active
+    env_file.write_text("SIMILARITY_THRESHOLD=2\n")
+    watcher._mtime = None
+    assert watcher.check() is False
+    assert Config.SIMILARITY_THRESHOLD == 0.55
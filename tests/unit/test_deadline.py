@@ -0,0 +1,36 @@
+import pytest
+from app.core.deadline import Deadline, DeadlineExceeded
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+def test_remaining_budget_follows_the_clock():
+    clock = FakeClock()
+    deadline = Deadline(500, clock=clock)
+    assert deadline.remaining() == pytest.approx(0.5)
+    assert deadline.allows(0.4)
+
+    clock.now += 0.3
+    assert deadline.remaining_ms() == pytest.approx(200)
+    assert not deadline.allows(0.4)
+    with pytest.raises(DeadlineExceeded):
+        deadline.check(0.4)
+
+    clock.now += 1.0
+    assert deadline.expired
+    assert deadline.remaining() == 0.0
+
+def test_from_request_keeps_the_tighter_budget():
+    assert Deadline.from_request(None, None) is None
+    assert Deadline.from_request("250", None).budget_ms == 250
+    assert Deadline.from_request("250", 100).budget_ms == 100
+    assert Deadline.from_request(None, 1000).budget_ms == 1000
+
+    with pytest.raises(ValueError):
+        Deadline.from_request("soon", None)
+    with pytest.raises(ValueError):
+        Deadline.from_request("0", None)
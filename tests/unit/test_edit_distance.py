@@ -0,0 +1,48 @@
+import random
+import pytest
+from app.core.edit_distance import (
+    jaro_similarity, jaro_winkler_similarity, levenshtein_distance, levenshtein_similarity
+)
+
+def _reference_levenshtein(a, b):
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+def test_levenshtein_matches_dynamic_programming():
+    rng = random.Random(42)
+    for _ in range(500):
+        a = "".join(rng.choices("abcd", k=rng.randint(0, 80)))
+        b = "".join(rng.choices("abcd", k=rng.randint(0, 80)))
+        assert levenshtein_distance(a, b) == _reference_levenshtein(a, b)
+
+def test_levenshtein_early_termination():
+    rng = random.Random(7)
+    for _ in range(500):
+        a = "".join(rng.choices("ab", k=rng.randint(0, 40)))
+        b = "".join(rng.choices("ab", k=rng.randint(0, 40)))
+        k = rng.randint(0, 10)
+        exact = _reference_levenshtein(a, b)
+        assert levenshtein_distance(a, b, k) == (exact if exact <= k else k + 1)
+
+def test_levenshtein_known_values():
+    assert levenshtein_distance("kitten", "sitting") == 3
+    assert levenshtein_distance("", "abc") == 3
+    assert levenshtein_similarity("kitten", "sitting") == pytest.approx(1 - 3 / 7)
+    assert levenshtein_similarity("", "") == 0.0
+    # Long inputs (beyond a machine word) work too
+    assert levenshtein_distance("x" * 1000, "y" + "x" * 999) == 1
+
+def test_levenshtein_similarity_below_minimum_stays_below():
+    assert levenshtein_similarity("abcdef", "uvwxyz", min_similarity=0.8) < 0.8
+
+def test_jaro_winkler_known_values():
+    assert jaro_similarity("DIXON", "DICKSONX") == pytest.approx(0.7667, abs=1e-4)
+    assert jaro_winkler_similarity("MARTHA", "MARHTA") == pytest.approx(0.9611, abs=1e-4)
+    assert jaro_winkler_similarity("DWAYNE", "DUANE") == pytest.approx(0.84, abs=1e-4)
+    assert jaro_winkler_similarity("abc", "xyz") == 0.0
+    assert jaro_winkler_similarity("same", "same") == 1.0
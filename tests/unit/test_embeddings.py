@@ -0,0 +1,104 @@
+import threading
+import numpy as np
+import pytest
+from app.core.embeddings import BatchingEncoder, EmbeddingService, Encoder, HashingEncoder, VectorCache, VectorIndex
+
+def test_hashing_encoder_is_deterministic_and_normalized():
+    encoder = HashingEncoder(128)
+    vectors = encoder.encode(["deep learning models", "deep learning model", "cooking pasta", ""])
+    assert vectors.dtype == np.float32 and vectors.shape == (4, 128)
+    assert np.allclose(np.linalg.norm(vectors[:3], axis=1), 1.0)
+    assert not vectors[3].any()
+    assert np.array_equal(vectors, HashingEncoder(128).encode(["deep learning models", "deep learning model",
+                                                               "cooking pasta", ""]))
+    assert vectors[0] @ vectors[1] > vectors[0] @ vectors[2]
+
+def test_encoders_must_implement_encode():
+    class Incomplete(Encoder):
+        name = "incomplete"
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+def test_service_scores_and_caches_vectors():
+    service = EmbeddingService("hashing", cache_size=3, batch_size=8, batch_wait_ms=0)
+    assert service.similarity("deep learning", "deep learning") == 1.0
+    score = service.similarity("deep learning models", "deep learning model")
+    assert 0.0 < score < 1.0
+    assert service.similarity_batch([("deep learning models", "deep learning model"), ("", "x")]) == [score, 0.0]
+
+    stats = service.stats()
+    assert stats["encoder"] == "hashing-256"
+    assert stats["cache"]["entries"] == 3
+    assert stats["cache"]["hits"] >= 2
+    service.shutdown()
+
+def test_corpora_are_bounded_in_number_and_size():
+    service = EmbeddingService("hashing", batch_wait_ms=0, index_max_docs=2, max_corpora=2)
+    assert service.index("a", ["1", "2"], ["deep learning", "cooking pasta"]) == (2, 2)
+    assert service.index("a", ["1"], ["machine learning"]) == (0, 2)
+    with pytest.raises(ValueError, match="limited to 2 documents"):
+        service.index("a", ["3"], ["stock markets"])
+    service.index("b", ["1"], ["deep learning"])
+    with pytest.raises(ValueError, match="2 corpora"):
+        service.index("c", ["1"], ["deep learning"])
+    # Un corpus supprimé libère sa place
+    assert service.drop("b")
+    assert service.index("c", ["1"], ["deep learning"]) == (1, 1)
+    service.shutdown()
+
+def test_vector_cache_is_bounded():
+    cache = VectorCache(2)
+    cache.put_many([b"a", b"b", b"c"], np.eye(3, dtype=np.float32))
+    assert cache.get_many([b"a", b"b", b"c"])[0] is None
+    assert cache.stats()["entries"] == 2
+    with pytest.raises(ValueError):
+        cache.get_many([b"b"])[0][0] = 2.0
+
+def test_batching_encoder_coalesces_concurrent_calls():
+    calls = []
+
+    class RecordingEncoder(HashingEncoder):
+        def encode(self, texts):
+            calls.append(len(texts))
+            return super().encode(texts)
+
+    batcher = BatchingEncoder(RecordingEncoder(64), max_batch=64, max_wait=0.05)
+    results = {}
+    barrier = threading.Barrier(8)
+
+    def worker(i):
+        barrier.wait()
+        results[i] = batcher.encode([f"text {i}", f"other {i}"])
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sum(calls) == 16 and len(calls) < 8
+    for i, vectors in results.items():
+        assert np.array_equal(vectors, HashingEncoder(64).encode([f"text {i}", f"other {i}"]))
+    assert batcher.snapshot()["avg_batch_texts"] > 2
+    batcher.shutdown()
+
+def test_vector_index_recall_against_exact_search():
+    rng = np.random.default_rng(1)
+    centers = rng.normal(size=(50, 32))
+    vectors = (centers[rng.integers(0, 50, 5000)] + 0.3 * rng.normal(size=(5000, 32))).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    index = VectorIndex(32, max_size=10000, exact_max=1000)
+    index.add([str(i) for i in range(5000)], vectors)
+    assert index.stats()["clusters"] > 1
+
+    found = 0
+    for query in vectors[:50]:
+        exact = set(np.argsort(-(vectors @ query))[:10].astype(str))
+        found += len(exact & {doc_id for doc_id, _ in index.search(query, 10)})
+    assert found / 500 >= 0.9
+
+    assert index.add(["0"], vectors[1:2]) == 0
+    assert index.search(vectors[1], 2)[0][1] == pytest.approx(1.0)
+    with pytest.raises(ValueError):
+        VectorIndex(32, max_size=1).add(["a", "b"], vectors[:2])
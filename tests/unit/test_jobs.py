@@ -0,0 +1,98 @@
+import threading
+import time
+from unittest.mock import patch
+from app.config import Config
+from app.core.jobs import JobManager
+from app.core.similarity import SimilarityCalculator
+
+def _wait(manager, job_id, timeout=10.0):
+    deadline = time.time() + timeout
+    while manager.get(job_id).status in ("queued", "running") and time.time() < deadline:
+        time.sleep(0.01)
+    return manager.get(job_id)
+
+PAIRS = [{"prompt1": f"machine learning {i}", "prompt2": "machine learning"} for i in range(7)]
+
+def test_job_completes_and_pages_results(tmp_path):
+    manager = JobManager(SimilarityCalculator(), storage_dir=str(tmp_path), max_workers=2, chunk_size=3)
+    job = manager.submit(PAIRS + [{"prompt1": "x" * 5000, "prompt2": "y"}], "cosine", 0.5)
+
+    job = _wait(manager, job.id)
+    assert job.status == "completed"
+    assert job.processed == 8
+    assert job.errors == 1
+
+    first = manager.results(job.id, 0, 5)
+    rest = manager.results(job.id, 5, 5)
+    assert [r["index"] for r in first + rest] == list(range(8))
+    assert "exceeds maximum length" in rest[-1]["error"]
+    manager.shutdown()
+
+def test_finished_jobs_survive_restart(tmp_path):
+    manager = JobManager(SimilarityCalculator(), storage_dir=str(tmp_path))
+    job = _wait(manager, manager.submit(PAIRS, "cosine", 0.5).id)
+    manager.shutdown()
+
+    reloaded = JobManager(SimilarityCalculator(), storage_dir=str(tmp_path))
+    assert reloaded.get(job.id).status == "completed"
+    assert len(reloaded.results(job.id, 0, 100)) == len(PAIRS)
+    reloaded.shutdown()
+
+def test_cancel_running_job(tmp_path):
+    manager = JobManager(SimilarityCalculator(), storage_dir=str(tmp_path), chunk_size=1)
+    first_chunk_started, cancelled = threading.Event(), threading.Event()
+
+    def blocking_cosine_batch(self, pairs):
+        first_chunk_started.set()
+        cancelled.wait(10)
+        return [0.5] * len(pairs)
+
+    with patch.object(SimilarityCalculator, "cosine_sim_batch", blocking_cosine_batch):
+        job = manager.submit(PAIRS * 10, "cosine", 0.5)
+        assert first_chunk_started.wait(10)
+        manager.cancel(job.id)
+        cancelled.set()
+        job = _wait(manager, job.id)
+
+    assert job.status == "cancelled"
+    assert job.processed == 1
+    manager.shutdown()
+
+def test_cheap_job_runs_while_llm_slots_are_full(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "JOBS_LLM_CONCURRENCY", 1)
+    calculator = SimilarityCalculator()
+    calculator.llm_client.client = None  # LLM non configuré : les jobs llm finissent sur le fallback
+    manager = JobManager(calculator, storage_dir=str(tmp_path), max_workers=2)
+    release = threading.Event()
+    evaluate_batch = SimilarityCalculator.evaluate_batch
+
+    def blocking_evaluate_batch(self, metric, pairs, threshold):
+        if metric == "llm":
+            release.wait(10)
+        return evaluate_batch(self, metric, pairs, threshold)
+
+    with patch.object(SimilarityCalculator, "evaluate_batch", blocking_evaluate_batch):
+        llm_jobs = [manager.submit(PAIRS, "llm", 0.5) for _ in range(3)]
+        cheap = _wait(manager, manager.submit(PAIRS, "cosine", 0.5).id)
+        assert cheap.status == "completed"
+        # Un seul job LLM admis, les autres attendent sans occuper de worker
+        assert [job.status for job in llm_jobs] == ["running", "queued", "queued"]
+
+        release.set()
+        assert [_wait(manager, job.id).status for job in llm_jobs] == ["completed"] * 3
+    manager.shutdown()
+
+def test_finished_jobs_are_evicted_by_count_and_age(tmp_path):
+    manager = JobManager(SimilarityCalculator(), storage_dir=str(tmp_path), max_finished=2, result_ttl=60)
+    jobs = [_wait(manager, manager.submit(PAIRS, "cosine", 0.5).id) for _ in range(3)]
+    assert all(job.status == "completed" for job in jobs)
+
+    # Le plus ancien dépasse max_finished au poll suivant
+    assert manager.get(jobs[0].id) is None
+    assert not (tmp_path / jobs[0].id).exists()
+    assert manager.get(jobs[2].id) is not None
+
+    jobs[1].finished_at -= 120
+    assert manager.get(jobs[1].id) is None
+    assert [job.id for job in manager.jobs.values()] == [jobs[2].id]
+    manager.shutdown()
@@ -0,0 +1,70 @@
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+import pytest
+from app.core.deadline import Deadline, DeadlineExceeded
+from app.core.llm_proxy import LLMClient
+from app.core.prompt_budget import count_tokens
+
+def _client_returning(content, usage=None):
+    client = LLMClient()
+    client.client = MagicMock()
+    client.client.chat.completions.create.return_value = SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+        usage=usage
+    )
+    return client
+
+def test_similarity_parses_json_and_records_usage():
+    client = _client_returning(
+        '{"similarity_score": 0.8, "reasoning": "same topic"}',
+        usage=SimpleNamespace(prompt_tokens=42, completion_tokens=7)
+    )
+    assert client.similarity("cats", "dogs") == 0.8
+    usage = client.usage_summary()
+    assert usage["calls"] == 1
+    assert usage["prompt_tokens"] == 42
+    assert usage["completion_tokens"] == 7
+
+def test_usage_is_estimated_without_api_usage():
+    client = _client_returning("Both texts discuss pets.")
+    client.generate("Compare cats and dogs")
+    usage = client.usage_summary()
+    assert usage["prompt_tokens"] == count_tokens("Compare cats and dogs")
+    assert usage["completion_tokens"] == count_tokens("Both texts discuss pets.")
+
+def test_similarity_prompt_respects_token_budget():
+    client = _client_returning('{"similarity_score": 0.5}')
+    client.prompt_budget = 64
+    long_text = "Sentence about machine learning models. " * 100
+    client.similarity(long_text, long_text)
+
+    prompt = client.client.chat.completions.create.call_args.kwargs["messages"][0]["content"]
+    assert count_tokens(prompt) < 64 + 40
+
+def test_similarity_raises_instead_of_scoring_failures():
+    client = _client_returning("I cannot compare these texts.")
+    with pytest.raises(ValueError):
+        client.similarity("cats", "dogs")
+
+    client.client.chat.completions.create.side_effect = RuntimeError("Error code: 429 - retry in 0.5s")
+    with pytest.raises(RuntimeError):
+        client.similarity("cats", "dogs")
+
+def test_generate_without_client_returns_message():
+    client = LLMClient()
+    client.client = None
+    assert "not configured" in client.generate("hello")
+
+def test_complete_bounds_the_call_by_the_deadline():
+    client = _client_returning("ok")
+    client.client.with_options.return_value = client.client
+    client.min_budget = 0.1
+
+    assert client.complete("hello", Deadline(5000)) == "ok"
+    options = client.client.with_options.call_args.kwargs
+    assert 4.0 < options["timeout"] <= 5.0
+    assert options["max_retries"] == 0
+
+    with pytest.raises(DeadlineExceeded):
+        client.similarity("cats", "dogs", Deadline(50))
+    assert client.client.chat.completions.create.call_count == 1
@@ -0,0 +1,78 @@
+import pytest
+import numpy as np
+from app.core.matrix import SimilarityMatrix
+from app.core.similarity import SimilarityCalculator
+
+TEXTS = [
+    "machine learning models",
+    "deep learning models",
+    "cooking pasta at home",
+    "machine learning models",
+    "the and of",
+]
+
+def test_cosine_matrix_matches_pairwise_identity_rules():
+    matrix = SimilarityMatrix(TEXTS, metric="cosine", block_size=2).dense()
+    assert matrix.shape == (5, 5)
+    assert np.allclose(matrix, matrix.T)
+    # Identical non-empty texts always score 1.0, like cosine_sim
+    assert matrix[0, 3] == pytest.approx(1.0)
+    assert matrix[4, 4] == pytest.approx(1.0)
+    assert matrix[0, 1] > matrix[0, 2]
+    assert ((matrix >= 0.0) & (matrix <= 1.0)).all()
+
+def test_jaccard_matrix_matches_pairwise():
+    calc = SimilarityCalculator()
+    matrix = SimilarityMatrix(TEXTS, metric="jaccard", block_size=3).dense()
+    for i, a in enumerate(TEXTS):
+        for j, b in enumerate(TEXTS):
+            assert matrix[i, j] == pytest.approx(calc.jaccard_sim(a, b))
+
+def test_jaccard_matrix_without_punkt(monkeypatch):
+    from app.core import tokenization
+
+    def missing_punkt(text):
+        raise LookupError("Resource punkt not found.")
+
+    monkeypatch.setattr(tokenization, "word_tokenize", missing_punkt)
+    tokenization.punkt_available.cache_clear()
+    try:
+        matrix = SimilarityMatrix(["Deep learning", "deep Learning models"], metric="jaccard").dense()
+        assert matrix[0, 1] == pytest.approx(2 / 3)
+    finally:
+        tokenization.punkt_available.cache_clear()
+
+def test_block_size_does_not_change_result():
+    full = SimilarityMatrix(TEXTS, metric="cosine", block_size=100).dense()
+    blocked = SimilarityMatrix(TEXTS, metric="cosine", block_size=1).dense()
+    assert np.allclose(full, blocked)
+
+def test_top_k_and_threshold_views():
+    matrix = SimilarityMatrix(TEXTS, metric="cosine", block_size=2)
+    dense = matrix.dense()
+
+    neighbors = matrix.top_k(1)
+    assert neighbors[0] == [(3, pytest.approx(1.0))]
+    assert all(j != i for i, row in enumerate(neighbors) for j, _ in row)
+
+    pairs = matrix.above_threshold(0.2)
+    expected = {(i, j) for i in range(5) for j in range(i + 1, 5) if dense[i, j] >= 0.2}
+    assert {(i, j) for i, j, _ in pairs} == expected
+
+def test_unsupported_metric():
+    with pytest.raises(ValueError):
+        SimilarityMatrix(TEXTS, metric="direct_llm")
+
+def test_edit_distance_matrix_matches_pairwise():
+    calc = SimilarityCalculator()
+    names = ["iPhone 15 Pro", "iphone 15 pro max", "Galaxy S24", "", "Pixel 8"]
+    for metric, pairwise in (("levenshtein", calc.levenshtein_sim), ("jaro_winkler", calc.jaro_winkler_sim)):
+        matrix = SimilarityMatrix(names, metric=metric, block_size=2)
+        dense = matrix.dense()
+        for i, a in enumerate(names):
+            for j, b in enumerate(names):
+                assert dense[i, j] == pytest.approx(pairwise(a, b))
+
+        pairs = matrix.above_threshold(0.7)
+        expected = {(i, j) for i in range(5) for j in range(i + 1, 5) if dense[i, j] >= 0.7}
+        assert {(i, j) for i, j, _ in pairs} == expected
@@ -0,0 +1,61 @@
+import os
+import tracemalloc
+import numpy as np
+import pytest
+from app.core.memory import MemoryProfiler, module_of, rss_bytes, sizeof
+
+@pytest.fixture
+def profiler():
+    profiler = MemoryProfiler(max_snapshots=2)
+    yield profiler
+    profiler.stop_tracing()
+
+def test_sizeof_follows_containers_and_counts_shared_objects_once():
+    payload = "x" * 10000
+    assert sizeof([payload]) > 10000
+    assert sizeof([payload, payload]) < 2 * 10000
+    assert sizeof({"vectors": np.zeros(1000)}) >= 8000
+
+def test_module_of_maps_app_files_to_module_names():
+    import app.core.similarity as similarity
+    assert module_of(similarity.__file__) == "app.core.similarity"
+    assert module_of(os.path.join("venv", "lib", "site-packages", "sklearn", "base.py")) == "sklearn"
+
+def test_report_without_tracing_has_no_allocation_data(profiler):
+    profiler.register("cache", lambda: {"entries": 3, "bytes": 120})
+    report = profiler.report()
+
+    assert not tracemalloc.is_tracing()
+    assert report["tracing"] is False
+    assert "top_modules" not in report
+    assert report["components"]["cache"] == {"entries": 3, "bytes": 120}
+    if rss_bytes() is not None:
+        assert report["rss_bytes"] > 0
+
+def test_failing_component_is_reported_not_raised(profiler):
+    profiler.register("broken", lambda: 1 / 0)
+    assert "error" in profiler.report()["components"]["broken"]
+
+def test_diff_groups_growth_by_module(profiler):
+    from app.core.similarity import SimilarityCalculator
+    calc = SimilarityCalculator()
+    profiler.start_tracing(frames=25)
+    profiler.take_snapshot("before")
+
+    # Listes de scores allouées dans app.core.similarity et conservées ici
+    kept = [calc.cosine_sim_batch([(f"growing text number {i}", "growing text")]) for i in range(500)]
+    diff = profiler.diff("before", top_n=5)
+
+    assert diff["end"] == "now"
+    modules = {row["module"]: row for row in diff["top_modules"]}
+    assert modules["app.core.similarity"]["size_diff"] > 0
+    assert "app.core.memory" not in modules
+    assert len(kept) == 500
+
+def test_snapshots_are_bounded_and_unknown_names_raise(profiler):
+    for name in ("a", "b", "c"):
+        profiler.take_snapshot(name)
+    assert list(profiler.snapshots) == ["b", "c"]
+    assert "rss_diff_bytes" in profiler.diff("b", "c")
+    with pytest.raises(KeyError):
+        profiler.diff("a")
@@ -0,0 +1,45 @@
+import random
+import pytest
+from app.core.metrics import CPU_BOUND, IO_BOUND, MetricRegistry, MetricSpec, metric_registry
+from app.core.similarity import SimilarityCalculator
+
+def test_default_registry_capabilities():
+    assert metric_registry.names()[:4] == ["cosine", "jaccard", "llm", "direct_llm"]
+    assert metric_registry.get("cosine").batchable
+    assert metric_registry.get("llm").kind == IO_BOUND
+    assert metric_registry.get("llm").fallback == "cosine"
+    assert metric_registry.get("levenshtein").kind == CPU_BOUND
+    assert "llm" not in metric_registry.matrix_names()
+    with pytest.raises(ValueError, match="Invalid metric"):
+        metric_registry.get("unknown")
+
+def test_registered_metric_is_dispatched_without_other_changes():
+    registry = MetricRegistry()
+    registry.register(MetricSpec(
+        name="length_ratio",
+        description="Length ratio",
+        scorer=lambda calc, a, b, threshold=None: (min(len(a), len(b)) / max(len(a), len(b)), "length_ratio")
+    ))
+    spec = registry.get("length_ratio")
+    assert spec.scorer(None, "ab", "abcd") == (0.5, "length_ratio")
+    with pytest.raises(ValueError):
+        registry.register(MetricSpec(name="bad", description="", scorer=spec.scorer, kind="gpu"))
+
+def test_failing_metric_uses_fallback():
+    calc = SimilarityCalculator()
+    calc.llm_cascade_sim = lambda *args: (_ for _ in ()).throw(RuntimeError("boom"))
+    score, decided_by = calc.evaluate("llm", "machine learning", "machine learning")
+    assert (score, decided_by) == (1.0, "fallback")
+
+def test_cosine_batch_kernel_matches_pairwise():
+    calc = SimilarityCalculator()
+    rng = random.Random(3)
+    words = "the cat sat on a mat dog ran fast machine learning deep models data big".split()
+    pairs = [
+        (" ".join(rng.choices(words, k=rng.randint(0, 10))), " ".join(rng.choices(words, k=rng.randint(0, 10))))
+        for _ in range(300)
+    ]
+    batch = calc.evaluate_batch("cosine", pairs)
+    for (text1, text2), (score, decided_by) in zip(pairs, batch):
+        assert decided_by == "cosine"
+        assert score == pytest.approx(calc.cosine_sim(text1, text2), abs=1e-9)
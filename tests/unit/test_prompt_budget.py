@@ -0,0 +1,35 @@
+from app.core.prompt_budget import count_tokens, fit_pair, fit_to_budget
+
+LONG_TEXT = (
+    "Machine learning models learn patterns from data. "
+    "The weather was pleasant yesterday. "
+    "Training machine learning models requires data and compute. "
+    "Models that learn from data generalize to new data. "
+) * 5
+
+def test_count_tokens_approximation():
+    assert count_tokens("") == 0
+    assert count_tokens("cat sat") == 2
+    assert count_tokens("internationalization") == 5
+    assert count_tokens("Hi, you!") == 4
+
+def test_fit_to_budget_keeps_short_text():
+    assert fit_to_budget("short text.", 50) == "short text."
+
+def test_fit_to_budget_extracts_sentences_within_budget():
+    fitted = fit_to_budget(LONG_TEXT, 40)
+    assert count_tokens(fitted) <= 40
+    assert fitted.startswith("Machine learning models learn patterns from data.")
+    # Les phrases conservées sont des phrases entières du texte d'origine
+    assert all(sentence in LONG_TEXT for sentence in fitted.split(". ") if sentence)
+
+def test_fit_to_budget_truncates_single_sentence():
+    fitted = fit_to_budget("word " * 200, 20)
+    assert fitted.endswith(" ...")
+    assert count_tokens(fitted) <= 20 + 3
+
+def test_fit_pair_gives_unused_share_to_longer_text():
+    short, long = fit_pair("tiny", LONG_TEXT, 60)
+    assert short == "tiny"
+    assert count_tokens(long) <= 59
+    assert count_tokens(long) > 30
@@ -32,4 +32,36 @@ def test_output_sanitization():
     text_with_control = "Hello\x00World\x1F"
     cleaned = Sanitizer.sanitize_output(text_with_control)
     assert "\x00" not in cleaned
-    assert "\x1F" not in cleaned
\ No newline at end of file
+    assert "\x1F" not in cleaned
+
+def single(text, config):
+    try:
+        return Sanitizer.sanitize_input(text, config), None
+    except ValueError as e:
+        return None, str(e)
+
+def test_batch_sanitization_matches_single_item():
+    import random
+    from app.config import ConfigSnapshot
+    config = ConfigSnapshot({"BLACKLIST": "malicious,hack,drop table,evil", "MAX_INPUT_LENGTH": "40"})
+    rng = random.Random(3)
+    fragments = ["hello", " ", "<b>", "</b>", "&", "'", '"', "<", ">", "MALICIOUS", "Hack", "drop",
+                 "table", "ev", "il", "İ", "Σ", "\x00", "\t", "é", "<script>alert(1)</script>"]
+    texts = ["".join(rng.choice(fragments) for _ in range(rng.randint(0, 12))) for _ in range(2000)]
+    texts += ["", "   ", "x" * 41, "ok <i>evil</i>"]
+
+    cleaned, errors = Sanitizer.sanitize_inputs(texts, config)
+    assert list(zip(cleaned, errors)) == [single(text, config) for text in texts]
+    assert any(errors) and any(text is not None for text in cleaned)
+    assert Sanitizer.sanitize_inputs([], config) == ([], [])
+
+def test_blacklist_find_many_matches_find():
+    from app.config import BlacklistMatcher
+    matcher = BlacklistMatcher(("evil", "hack", "hacker"))
+    texts = ["a hacker", "", "nothing", "evil and hack", "ev", "il", "hac", "k"]
+    assert matcher.find_many(texts) == [matcher.find(text) for text in texts]
+    assert BlacklistMatcher(()).find_many(texts) == [None] * len(texts)
+
+def test_batch_output_sanitization_matches_single_item():
+    texts = ["Hello\x00World\x1F", "a" * (Config.MAX_INPUT_LENGTH * 3), "", "plain"]
+    assert Sanitizer.sanitize_outputs(texts) == [Sanitizer.sanitize_output(text) for text in texts]
@@ -0,0 +1,74 @@
+import time
+import pytest
+from app.core.score_store import MIN_SLOTS, ScoreStore, pair_key
+
+@pytest.fixture
+def store_path(tmp_path):
+    return str(tmp_path / "scores.bin")
+
+def test_put_and_get_round_trip(store_path):
+    store = ScoreStore(store_path)
+    key = pair_key("cosine", "deep learning", "machine learning")
+    assert store.get(key) is None
+
+    assert store.put(key, 0.4213)
+    assert store.get(key) == 0.4213
+    # Mise à jour en place, sans nouvelle entrée
+    assert store.put(key, 0.5)
+    assert store.get(key) == 0.5
+    assert store.stats()["entries"] == 1
+
+def test_key_depends_on_metric_order_and_threshold():
+    base = pair_key("cosine", "a", "b")
+    assert base != pair_key("jaccard", "a", "b")
+    assert base != pair_key("cosine", "b", "a")
+    assert pair_key("llm", "a", "b", 0.7) != pair_key("llm", "a", "b", 0.8)
+
+def test_key_parts_cannot_collide_and_include_the_model():
+    assert pair_key("cosine", "a\x00b", "c") != pair_key("cosine", "a", "b\x00c")
+    assert pair_key("cosine", "a", "b", 0.7) != pair_key("cosine", "a", "b", model="0.7")
+    assert pair_key("direct_llm", "a", "b", model="gpt-3.5-turbo") != pair_key("direct_llm", "a", "b", model="gpt-4o")
+
+def test_scores_survive_reopen_and_are_shared(store_path):
+    writer = ScoreStore(store_path)
+    reader = ScoreStore(store_path)
+    key = pair_key("llm", "a", "b", 0.7)
+    writer.put(key, 0.9)
+
+    assert reader.get(key) == 0.9
+    assert ScoreStore(store_path).get(key) == 0.9
+
+def test_grows_in_background_and_readers_remap(store_path):
+    store = ScoreStore(store_path)
+    reader = ScoreStore(store_path)
+    keys = [pair_key("cosine", f"text {i}", "other") for i in range(MIN_SLOTS)]
+
+    stored = []
+    for i, key in enumerate(keys):
+        if store.put(key, i / len(keys)):
+            stored.append(i)
+        while store._growing:
+            time.sleep(0.001)
+
+    assert store.stats()["slots"] > MIN_SLOTS
+    assert all(reader.get(keys[i]) == i / len(keys) for i in stored)
+    assert reader.stats()["slots"] == store.stats()["slots"]
+
+def test_compaction_keeps_entries_and_resizes(store_path):
+    store = ScoreStore(store_path)
+    keys = [pair_key("jaccard", str(i), "x") for i in range(100)]
+    for i, key in enumerate(keys):
+        store.put(key, i / 100)
+
+    stats = store.compact(slots=8 * MIN_SLOTS)
+    assert stats["slots"] == 8 * MIN_SLOTS
+    stats = store.compact()
+    assert stats["slots"] == MIN_SLOTS and stats["entries"] == 100
+    assert [store.get(key) for key in keys] == [i / 100 for i in range(100)]
+
+def test_full_store_drops_new_pairs(store_path):
+    store = ScoreStore(store_path, max_entries=10)
+    capacity = int(MIN_SLOTS * 0.7)
+    results = [store.put(pair_key("cosine", str(i), "x"), 0.1) for i in range(capacity + 5)]
+    assert sum(results) == capacity
+    assert not store._growing
@@ -1,6 +1,7 @@
 import pytest
+from app.core.deadline import Deadline
 from app.core.similarity import SimilarityCalculator
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 
 def test_cosine_similarity():
     calc = SimilarityCalculator()
@@ -19,6 +20,7 @@ def test_jaccard_similarity():
 @patch("app.core.llm_proxy.LLMClient.similarity")  
 def test_llm_based_similarity(mock_similarity):
     calc = SimilarityCalculator()
+    calc.cascade_margin = 1.0  # Every pair is in the uncertain band
     
     # Test valid response
     mock_similarity.return_value = 0.75
@@ -35,4 +37,67 @@ def test_direct_llm_similarity(mock_similarity):
     calc = SimilarityCalculator()
     mock_similarity.return_value = 0.8
     score = calc.direct_llm_sim("future", "prediction")
-    assert score == 0.8
\ No newline at end of file
+    assert score == 0.8
+
+@patch("app.core.llm_proxy.LLMClient.similarity")
+def test_llm_cascade_skips_llm_outside_uncertain_band(mock_similarity):
+    calc = SimilarityCalculator()
+    calc.llm_client.client = object()
+    calc.cascade_margin = 0.2
+    mock_similarity.return_value = 0.9
+
+    # Clearly below the threshold: decided by the lexical tier
+    score, tier = calc.llm_cascade_sim("apple banana", "stock market", threshold=0.5)
+    assert (score, tier) == (0.0, "lexical")
+
+    # Clearly above the threshold: identical texts
+    score, tier = calc.llm_cascade_sim("apple banana", "apple banana", threshold=0.5)
+    assert (score, tier) == (1.0, "lexical")
+    assert mock_similarity.call_count == 0
+
+    # Uncertain band: the LLM decides
+    score, tier = calc.llm_cascade_sim("apple banana", "apple banana", threshold=0.9)
+    assert (score, tier) == (0.9, "llm")
+    assert mock_similarity.call_count == 1
+
+    summary = calc.cascade_summary()
+    assert summary["evaluated"] == 3
+    assert summary["avoided"] == 2
+    assert summary["avoidance_rate"] == pytest.approx(2 / 3, 0.01)
+
+def test_llm_cascade_falls_back_to_cosine():
+    calc = SimilarityCalculator()
+    calc.llm_client.client = MagicMock()
+    calc.llm_client.client.chat.completions.create.side_effect = RuntimeError("Error code: 503 - 0.95 overloaded")
+    calc.cascade_margin = 1.0
+    cosine = calc.cosine_sim("deep learning", "deep learning models")
+
+    score, tier = calc.llm_cascade_sim("deep learning", "deep learning models", threshold=0.5)
+    assert tier == "fallback"
+    assert score == pytest.approx(cosine)
+    assert calc.evaluate("direct_llm", "deep learning", "deep learning models") == (pytest.approx(cosine), "fallback")
+    assert calc.llm_client.client.chat.completions.create.call_count == 2
+
+@patch("app.core.llm_proxy.LLMClient.similarity", return_value=0.9)
+def test_llm_metrics_degrade_when_deadline_is_too_short(mock_similarity):
+    calc = SimilarityCalculator()
+    calc.llm_client.client = object()
+    calc.llm_client.min_budget = 0.5
+    cosine = calc.cosine_sim("deep learning", "deep learning models")
+
+    assert calc.evaluate("direct_llm", "deep learning", "deep learning models",
+                         deadline=Deadline(100)) == (pytest.approx(cosine), "deadline")
+    calc.cascade_margin = 1.0
+    assert calc.evaluate("llm", "deep learning", "deep learning models", 0.5,
+                         deadline=Deadline(100)) == (pytest.approx(cosine), "deadline")
+    assert mock_similarity.call_count == 0
+
+    assert calc.evaluate("direct_llm", "deep learning", "deep learning models",
+                         deadline=Deadline(5000)) == (0.9, "llm")
+
+def test_edit_distance_metrics():
+    calc = SimilarityCalculator()
+    assert calc.levenshtein_sim("iPhone 15", "iphone 15") == 1.0
+    assert calc.compute("levenshtein", "kitten", "sitting") == pytest.approx(1 - 3 / 7)
+    assert calc.evaluate("jaro_winkler", "MARTHA", "MARHTA") == (pytest.approx(0.9611, abs=1e-4), "jaro_winkler")
+    assert calc.jaro_winkler_sim("", "abc") == 0.0
@@ -0,0 +1,61 @@
+import itertools
+import math
+import random
+import pytest
+from app.core.simjoin import SimilarityJoin, similarity_join
+
+def brute_force(texts, threshold, metric):
+    sets = [set(text.split()) for text in texts]
+    pairs = []
+    for i, j in itertools.combinations(range(len(texts)), 2):
+        a, b = sets[i], sets[j]
+        if not a or not b:
+            continue
+        overlap = len(a & b)
+        score = overlap / len(a | b) if metric == "jaccard" else overlap / math.sqrt(len(a) * len(b))
+        if score >= threshold:
+            pairs.append((i, j, score))
+    return pairs
+
+@pytest.mark.parametrize("metric", ["jaccard", "set_cosine"])
+def test_join_matches_brute_force(metric):
+    rng = random.Random(7)
+    for _ in range(100):
+        vocabulary = rng.randint(3, 30)
+        texts = [" ".join(f"w{rng.randint(0, vocabulary)}" for _ in range(rng.randint(0, 12)))
+                 for _ in range(rng.randint(1, 50))]
+        for threshold in (0.1, 0.3, 0.5, 0.6, 0.7, 0.75, 0.8, 0.9, 1.0, rng.uniform(0.05, 1.0)):
+            assert similarity_join(texts, threshold, metric, str.split) == brute_force(texts, threshold, metric)
+
+def test_join_prunes_most_pairs():
+    rng = random.Random(0)
+    vocabulary = [f"w{i}" for i in range(2000)]
+    texts = [" ".join(rng.choices(vocabulary, k=rng.randint(8, 20))) for _ in range(500)]
+    texts += [text + " extra" for text in texts[:50]]
+    join = SimilarityJoin(texts, "jaccard", tokenizer=str.split)
+    pairs = join.join(0.8)
+
+    assert [(i, j) for i, j, _ in pairs] == [(i, j) for i, j, _ in brute_force(texts, 0.8, "jaccard")]
+    assert len(pairs) >= 50
+    assert join.stats["candidates"] < len(texts) * (len(texts) - 1) // 2 / 100
+
+def test_join_rejects_bad_arguments():
+    with pytest.raises(ValueError):
+        SimilarityJoin(["a b"], "cosine", tokenizer=str.split)
+    with pytest.raises(ValueError):
+        similarity_join(["a b"], 0.0, tokenizer=str.split)
+    assert similarity_join(["", "a", "a"], 1.0, tokenizer=str.split) == [(1, 2, 1.0)]
+
+def test_default_tokenizer_without_punkt(monkeypatch):
+    from app.core import simjoin, tokenization
+
+    def missing_punkt(text):
+        raise LookupError("Resource punkt not found.")
+
+    monkeypatch.setattr(tokenization, "word_tokenize", missing_punkt)
+    tokenization.punkt_available.cache_clear()
+    try:
+        assert list(simjoin.default_tokenizer("Deep Learning models")) == ["deep", "learning", "models"]
+        assert similarity_join(["a b c", "a b c d", "x y"], 0.7) == [(0, 1, 0.75)]
+    finally:
+        tokenization.punkt_available.cache_clear()
@@ -0,0 +1,78 @@
+import io
+import json
+import logging
+import queue
+from app.core.structured_logging import (
+    AsyncQueueHandler, LoggingService, request_id_var, sampled_var, stage, stages_var
+)
+
+logger = logging.getLogger("app.tests.logging")
+
+def _records(stream):
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+def test_records_are_json_with_request_context_and_sampling():
+    stream = io.StringIO()
+    service = LoggingService()
+    service.start("INFO", stream=stream)
+    try:
+        request_id = request_id_var.set("req-1")
+        sampled = sampled_var.set(False)
+        try:
+            logger.info("dropped for unsampled requests")
+            try:
+                raise RuntimeError("boom")
+            except RuntimeError:
+                logger.exception("scoring failed for %s", "cosine")
+        finally:
+            sampled_var.reset(sampled)
+        logger.info("Similarity calculated", extra={"metric": "cosine", "score": 0.5})
+        request_id_var.reset(request_id)
+        logger.info("outside a request")
+    finally:
+        service.stop()
+
+    records = _records(stream)
+    assert [record["message"] for record in records] == [
+        "scoring failed for cosine", "Similarity calculated", "outside a request"
+    ]
+    assert records[0]["level"] == "ERROR"
+    assert records[0]["request_id"] == "req-1"
+    assert "RuntimeError: boom" in records[0]["exc_info"]
+    assert records[1]["metric"] == "cosine" and records[1]["score"] == 0.5
+    assert "request_id" not in records[2]
+
+def test_mutable_arguments_are_rendered_before_queueing():
+    handler = AsyncQueueHandler(queue.Queue())
+    items = ["a"]
+    record = logging.LogRecord("app", logging.INFO, __file__, 1, "items: %s", (items,), None)
+    items.append("b")
+    prepared = handler.prepare(record)
+    items.append("c")
+    assert prepared.getMessage() == "items: ['a', 'b']"
+
+    lazy = handler.prepare(logging.LogRecord("app", logging.INFO, __file__, 1, "%s pairs", (3,), None))
+    assert lazy.args == (3,)
+
+def test_full_queue_drops_info_but_not_errors():
+    handler = AsyncQueueHandler(queue.Queue(1))
+    handler.handle(logging.LogRecord("app", logging.INFO, __file__, 1, "first", None, None))
+    handler.handle(logging.LogRecord("app", logging.INFO, __file__, 1, "second", None, None))
+    assert handler.dropped == 1
+    handler.queue.get_nowait()
+    handler.handle(logging.LogRecord("app", logging.ERROR, __file__, 1, "error", None, None))
+    assert handler.queue.get_nowait().msg == "error"
+
+def test_stage_accumulates_durations():
+    stages = {}
+    token = stages_var.set(stages)
+    try:
+        with stage("score"):
+            pass
+        with stage("score"):
+            pass
+    finally:
+        stages_var.reset(token)
+    assert set(stages) == {"score"} and stages["score"] >= 0.0
+    with stage("ignored"):
+        pass
@@ -0,0 +1,21 @@
+import pytest
+from fastapi import HTTPException
+from app.api.wire import FLOAT32, JSON, MSGPACK, negotiate
+
+def test_json_is_the_default():
+    assert negotiate(None, (JSON, MSGPACK)) == JSON
+    assert negotiate("*/*", (JSON, MSGPACK)) == JSON
+    assert negotiate("text/html", (JSON, MSGPACK)) == JSON
+
+def test_preferred_supported_type_wins():
+    assert negotiate("application/msgpack", (JSON, MSGPACK)) == MSGPACK
+    assert negotiate("application/x-msgpack", (JSON, MSGPACK)) == MSGPACK
+    assert negotiate(f"application/json;q=0.5, {FLOAT32}", (JSON, MSGPACK, FLOAT32)) == FLOAT32
+    assert negotiate(f"{FLOAT32};q=0.2, application/msgpack", (JSON, MSGPACK, FLOAT32)) == MSGPACK
+
+def test_binary_type_not_available_is_rejected():
+    with pytest.raises(HTTPException) as error:
+        negotiate(FLOAT32, (JSON, MSGPACK))
+    assert error.value.status_code == 406
+    # Une alternative acceptable plus loin dans la liste est utilisée
+    assert negotiate(f"{FLOAT32}, application/json;q=0.1", (JSON, MSGPACK)) == JSON